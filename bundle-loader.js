@@ -0,0 +1,278 @@
+// San Diego Government Chart - precomputed data bundle loader
+// Loads the delta-synced dataset or the hashed bundle written by
+// scripts/build_data_bundle.py; callers fall back to parsing the raw CSVs when
+// neither is available (returns null)
+
+// Fetch the hashed artifact registered under key in data/bundle/manifest.json
+async function fetchGovArtifact(key) {
+    // The manifest is tiny and revalidated; the hashed files it names are immutable
+    const manifestResponse = await fetch('data/bundle/manifest.json', { cache: 'no-cache' });
+    if (!manifestResponse.ok) return null;
+    const manifest = await manifestResponse.json();
+    if (!manifest[key]) return null;
+
+    const response = await fetch(`data/bundle/${manifest[key]}`);
+    if (!response.ok) return null;
+    return response.json();
+}
+
+async function loadGovBundle() {
+    // Served by server.py: patch the IndexedDB copy instead of downloading everything
+    const dataset = await loadGovDataset();
+    if (dataset) return dataset;
+    try {
+        const bundle = await fetchGovArtifact('bundle');
+        return bundle ? decodeGovBundle(bundle) : null;
+    } catch (error) {
+        console.warn('Data bundle unavailable, falling back to CSV:', error);
+        return null;
+    }
+}
+
+function decodeGovBundle(bundle) {
+    const strings = bundle.strings;
+    const entityColumns = bundle.entities.columns;
+    const relColumns = bundle.relationships.columns;
+
+    // Integer columns become typed arrays; string columns index the shared table
+    const jurisdictionCodes = Int8Array.from(entityColumns.jurisdiction_code);
+    const entityTypeCodes = Int8Array.from(entityColumns.entity_type_code);
+    const sourceIndex = Int32Array.from(relColumns.source);
+    const targetIndex = Int32Array.from(relColumns.target);
+
+    const entityFields = Object.keys(entityColumns)
+        .filter(field => field !== 'jurisdiction_code' && field !== 'entity_type_code');
+    const entities = new Array(bundle.entities.count);
+    for (let i = 0; i < entities.length; i++) {
+        const row = {};
+        entityFields.forEach(field => { row[field] = strings[entityColumns[field][i]]; });
+        row.jurisdictionBucket = bundle.jurisdictions[jurisdictionCodes[i]];
+        row.entityTypeBucket = bundle.entity_types[entityTypeCodes[i]];
+        entities[i] = row;
+    }
+
+    const relFields = Object.keys(relColumns)
+        .filter(field => field !== 'source' && field !== 'target');
+    const relationships = new Array(bundle.relationships.count);
+    for (let i = 0; i < relationships.length; i++) {
+        const row = {};
+        relFields.forEach(field => { row[field] = strings[relColumns[field][i]]; });
+        row.source_entity_id = sourceIndex[i] >= 0 ? entities[sourceIndex[i]].id : '';
+        row.target_entity_id = targetIndex[i] >= 0 ? entities[targetIndex[i]].id : '';
+        relationships[i] = row;
+    }
+
+    return { version: bundle.version, entities, relationships, sourceIndex, targetIndex };
+}
+
+// Row-level sync against server.py's /data/delta (scripts/data_versions.py): the
+// dataset is cached in IndexedDB and patched with the rows changed since its
+// version. Returns null when the endpoint (static hosting) or IndexedDB is missing
+async function loadGovDataset() {
+    if (typeof indexedDB === 'undefined') return null;
+    try {
+        const db = await openGovCache();
+        const cached = await govCacheRequest(db, 'readonly', store => store.get('dataset'));
+        const since = cached ? cached.version : '';
+        const response = await fetch(`data/delta?since=${encodeURIComponent(since)}`, { cache: 'no-cache' });
+        if (!response.ok) return null;
+        const payload = await response.json();
+
+        let dataset;
+        if (payload.format === 'sd_gov_snapshot') {
+            dataset = { version: payload.version, tables: payload.tables };
+        } else if (payload.format === 'sd_gov_delta' && cached && cached.version === payload.from) {
+            dataset = applyGovDelta(cached, payload);
+        } else {
+            return null;
+        }
+        if (dataset.version !== since) {
+            await govCacheRequest(db, 'readwrite', store => store.put(dataset, 'dataset'));
+        }
+        return {
+            version: dataset.version,
+            entities: govTableRows(dataset.tables.entities),
+            relationships: govTableRows(dataset.tables.relationships)
+        };
+    } catch (error) {
+        console.warn('Delta sync unavailable, using the bundle:', error);
+        return null;
+    }
+}
+
+// Watch mode (server.py --watch): onChange(change) runs after each rebuild that
+// changed the data or an artifact; reloading then fetches only what changed.
+// Without watch mode /events is a 404 and EventSource gives up for good
+function watchGovData(onChange) {
+    if (typeof EventSource === 'undefined') return null;
+    const source = new EventSource('events');
+    source.addEventListener('rebuild', event => {
+        const change = JSON.parse(event.data);
+        if (change.data_changed) onChange(change);
+    });
+    return source;
+}
+
+function openGovCache() {
+    return new Promise((resolve, reject) => {
+        const request = indexedDB.open('sd-gov', 1);
+        request.onupgradeneeded = () => request.result.createObjectStore('data');
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+function govCacheRequest(db, mode, operation) {
+    return new Promise((resolve, reject) => {
+        const request = operation(db.transaction('data', mode).objectStore('data'));
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+// Changed rows replace theirs in place, removed keys are dropped, added rows go last
+function applyGovDelta(cached, delta) {
+    const tables = {};
+    Object.entries(cached.tables).forEach(([name, table]) => {
+        const change = delta.tables[name];
+        if (!change) {
+            tables[name] = table;
+            return;
+        }
+        const keyIndex = table.fields.indexOf(table.key);
+        const changed = new Map(change.changed.map(row => [row[keyIndex], row]));
+        const removed = new Set(change.removed);
+        const rows = table.rows
+            .filter(row => !removed.has(row[keyIndex]))
+            .map(row => changed.get(row[keyIndex]) || row)
+            .concat(change.added);
+        tables[name] = { key: table.key, fields: table.fields, rows };
+    });
+    return { version: delta.to, tables };
+}
+
+function govTableRows(table) {
+    return table.rows.map(values => {
+        const row = {};
+        table.fields.forEach((field, i) => { row[field] = values[i]; });
+        return row;
+    });
+}
+
+// Precomputed search index written by scripts/build_search_index.py; mirrors
+// SearchIndex.search there (exact, then prefix, else trigram fuzzy matches)
+async function loadGovSearchIndex() {
+    try {
+        const artifact = await fetchGovArtifact('search_index');
+        return artifact ? new GovSearchIndex(artifact) : null;
+    } catch (error) {
+        console.warn('Search index unavailable, using linear search:', error);
+        return null;
+    }
+}
+
+// Graph analytics written by scripts/gov_graph.py: CSR adjacency per category,
+// degree rankings, components and per-entity appointer/oversight chains
+async function loadGovGraph() {
+    try {
+        return await fetchGovArtifact('graph');
+    } catch (error) {
+        console.warn('Graph analytics unavailable:', error);
+        return null;
+    }
+}
+
+// Network coordinates written by scripts/build_network_layout.py: one layout per
+// "jurisdiction|entityType" filter key, each { nodes: [...], xy: [x0, y0, ...] }
+// in [-1, 1] with node indices into ids
+async function loadGovLayout() {
+    try {
+        return await fetchGovArtifact('layout');
+    } catch (error) {
+        console.warn('Precomputed layout unavailable, using live simulation:', error);
+        return null;
+    }
+}
+
+// Precomputed org chart trees written by scripts/build_org_hierarchy.py:
+// { jurisdictions: { city: [{ id, children: [...] }], ... }, cycles: [...] }
+async function loadGovHierarchy() {
+    try {
+        return await fetchGovArtifact('hierarchy');
+    } catch (error) {
+        console.warn('Hierarchy unavailable, building it client-side:', error);
+        return null;
+    }
+}
+
+class GovSearchIndex {
+    constructor(artifact) {
+        this.docs = artifact.docs;
+        this.terms = artifact.terms;
+        this.postings = artifact.postings.map(flat => Int32Array.from(flat));
+        this.trigrams = artifact.trigrams;
+    }
+
+    static tokenize(text) {
+        return text.toLowerCase().match(/[a-z0-9]+/g) || [];
+    }
+
+    static trigramsOf(term) {
+        const padded = ` ${term} `;
+        const grams = new Set();
+        for (let i = 0; i < padded.length - 2; i++) grams.add(padded.slice(i, i + 3));
+        return grams;
+    }
+
+    lowerBound(value) {
+        let lo = 0, hi = this.terms.length;
+        while (lo < hi) {
+            const mid = (lo + hi) >> 1;
+            if (this.terms[mid] < value) lo = mid + 1; else hi = mid;
+        }
+        return lo;
+    }
+
+    matchingTerms(token) {
+        const matches = [];
+        for (let id = this.lowerBound(token); id < this.terms.length && matches.length < 50; id++) {
+            if (!this.terms[id].startsWith(token)) break;
+            matches.push([id, this.terms[id] === token ? 1.0 : 0.6]);
+        }
+        if (matches.length > 0) return matches;
+
+        // Fuzzy fallback: Dice similarity over shared trigrams
+        const grams = GovSearchIndex.trigramsOf(token);
+        const shared = new Map();
+        grams.forEach(gram => (this.trigrams[gram] || []).forEach(id => shared.set(id, (shared.get(id) || 0) + 1)));
+        const fuzzy = [];
+        shared.forEach((count, id) => {
+            const similarity = 2 * count / (grams.size + GovSearchIndex.trigramsOf(this.terms[id]).size);
+            if (similarity >= 0.4) fuzzy.push([id, 0.4 * similarity]);
+        });
+        return fuzzy.sort((a, b) => b[1] - a[1]).slice(0, 5);
+    }
+
+    search(query, k = 10) {
+        const scores = new Map();
+        const matched = new Map();
+        new Set(GovSearchIndex.tokenize(query)).forEach(token => {
+            const tokenScores = new Map();
+            this.matchingTerms(token).forEach(([id, factor]) => {
+                const postings = this.postings[id];
+                for (let i = 0; i < postings.length; i += 2) {
+                    const score = postings[i + 1] * factor;
+                    if (score > (tokenScores.get(postings[i]) || 0)) tokenScores.set(postings[i], score);
+                }
+            });
+            tokenScores.forEach((score, doc) => {
+                scores.set(doc, (scores.get(doc) || 0) + score);
+                matched.set(doc, (matched.get(doc) || 0) + 1);
+            });
+        });
+        return [...scores.keys()]
+            .sort((a, b) => (matched.get(b) - matched.get(a)) || (scores.get(b) - scores.get(a)) || (a - b))
+            .slice(0, k)
+            .map(doc => ({ ...this.docs[doc], score: scores.get(doc) }));
+    }
+}
@@ -3,6 +3,8 @@ class SanDiegoOrgChart {
     constructor() {
         this.governmentData = null;
         this.relationships = null;
+        this.bundle = null;
+        this.precomputedHierarchy = null;
         this.treeData = null;
         this.currentJurisdiction = 'all';
         this.svg = null;
@@ -35,8 +37,9 @@ class SanDiegoOrgChart {
         // Load and build government data
         await this.loadGovernmentData();
 
-        // Load relationship data
+        // Load relationship data and the precomputed hierarchy
         await this.loadRelationshipData();
+        this.precomputedHierarchy = await loadGovHierarchy();
 
         // Build hierarchical structure
         this.buildHierarchy();
@@ -47,9 +50,33 @@ class SanDiegoOrgChart {
         // Create initial visualization
         this.createVisualization();
         
+        // Redraw when server.py --watch rebuilds the data
+        watchGovData(change => this.reloadData(change));
+        
         console.log('Organizational Chart initialized successfully');
     }
     
+    async reloadData(change) {
+        console.log(`Data rebuilt (${change.stages.join(', ')}), reloading...`);
+        // Keep the branches the user had open
+        const expanded = new Set(this.root.descendants().filter(d => d.children).map(d => d.data.id));
+        
+        await this.loadGovernmentData();
+        await this.loadRelationshipData();
+        this.precomputedHierarchy = await loadGovHierarchy();
+        this.buildHierarchy();
+        
+        const reopen = d => {
+            if (d._children && expanded.has(d.data.id)) {
+                d.children = d._children;
+                d._children = null;
+            }
+            (d.children || []).forEach(reopen);
+        };
+        reopen(this.root);
+        this.createVisualization();
+    }
+    
     updateDimensions() {
         const container = document.querySelector('.chart-container');
         this.width = container.clientWidth - this.margin.left - this.margin.right;
@@ -69,10 +96,16 @@ class SanDiegoOrgChart {
     
     async loadGovernmentData() {
         try {
-            // Load the complete government data
-            const response = await fetch('data/sd_gov_entities_complete.csv');
-            const csvText = await response.text();
-            const entities = d3.csvParse(csvText);
+            // Prefer the precomputed bundle; fall back to parsing the CSV
+            this.bundle = await loadGovBundle();
+            let entities;
+            if (this.bundle) {
+                entities = this.bundle.entities;
+            } else {
+                const response = await fetch('data/sd_gov_entities_complete.csv');
+                const csvText = await response.text();
+                entities = d3.csvParse(csvText);
+            }
 
             // Process entities with leadership names
             this.governmentData = this.processEntitiesWithLeadership(entities);
@@ -87,9 +120,13 @@ class SanDiegoOrgChart {
 
     async loadRelationshipData() {
         try {
-            const response = await fetch('data/sd_gov_relationships_complete.csv');
-            const csvText = await response.text();
-            this.relationships = d3.csvParse(csvText);
+            if (this.bundle) {
+                this.relationships = this.bundle.relationships;
+            } else {
+                const response = await fetch('data/sd_gov_relationships_complete.csv');
+                const csvText = await response.text();
+                this.relationships = d3.csvParse(csvText);
+            }
 
             console.log(`Loaded ${this.relationships.length} government relationships`);
 
@@ -141,7 +178,7 @@ class SanDiegoOrgChart {
                 ...entity,
                 personName: leadership.personName || null,
                 displayTitle: leadership.title || entity.type,
-                jurisdiction: this.getJurisdiction(entity.jurisdiction),
+                jurisdiction: entity.jurisdictionBucket || this.getJurisdiction(entity.jurisdiction),
                 entityType: this.getEntityType(entity.type),
                 level: 0, // Will be calculated during hierarchy building
                 children: []
@@ -167,59 +204,60 @@ class SanDiegoOrgChart {
         return 'departments';
     }
 
+    hydrateHierarchy(nodes, entityById, level) {
+        // Attach entity data to the precomputed {id, children} trees
+        return nodes
+            .filter(node => entityById.has(node.id))
+            .map(node => {
+                const entity = entityById.get(node.id);
+                return {
+                    ...entity,
+                    personName: entity.personName || entity.current_members || null,
+                    displayTitle: entity.displayTitle || entity.type,
+                    level: level,
+                    children: this.hydrateHierarchy(node.children, entityById, level + 1)
+                };
+            });
+    }
+
     buildHierarchyFromData(jurisdiction) {
+        // Client-side fallback for scripts/build_org_hierarchy.py
         if (!this.relationships || !this.governmentData) {
             console.warn('Missing data for hierarchy building');
             return [];
         }
 
-        // Filter relationships to hierarchical ones only
-        const hierarchicalRels = this.relationships.filter(r =>
-            r.relationship_type === 'oversees' || r.relationship_type === 'reports_to'
-        );
-
-        // Get entities for this jurisdiction
-        const jurisdictionEntities = this.governmentData.filter(e =>
-            e.jurisdiction === jurisdiction
-        );
-
-        // Find root entities (entities that are not targets of 'oversees' relationships)
-        const rootEntities = jurisdictionEntities.filter(entity => {
-            // An entity is a root if no other entity oversees it
-            return !hierarchicalRels.some(rel =>
-                rel.relationship_type === 'oversees' && rel.target_entity_id === entity.id
-            );
+        // Index children once; oversees and reports_to rows both point parent -> child
+        const childIds = new Map();
+        const overseen = new Set();
+        this.relationships.forEach(rel => {
+            if (rel.relationship_type !== 'oversees' && rel.relationship_type !== 'reports_to') return;
+            if (!childIds.has(rel.source_entity_id)) childIds.set(rel.source_entity_id, []);
+            childIds.get(rel.source_entity_id).push(rel.target_entity_id);
+            overseen.add(rel.target_entity_id);
         });
+        const entityById = new Map(this.governmentData.map(e => [e.id, e]));
 
-        // Recursive function to build node tree
-        const buildNode = (entity, level = 0) => {
-            // Find children - entities that this entity oversees or that report to it
-            const childRelationships = hierarchicalRels.filter(rel => {
-                return (
-                    (rel.relationship_type === 'oversees' && rel.source_entity_id === entity.id) ||
-                    (rel.relationship_type === 'reports_to' && rel.target_entity_id === entity.id)
-                );
-            });
-
-            const children = childRelationships
-                .map(rel => {
-                    const childId = rel.relationship_type === 'oversees' ? rel.target_entity_id : rel.source_entity_id;
-                    const childEntity = this.governmentData.find(e => e.id === childId);
-                    return childEntity ? buildNode(childEntity, level + 1) : null;
-                })
-                .filter(Boolean);
+        // Root entities: in this jurisdiction and nobody's child
+        const rootEntities = this.governmentData.filter(e =>
+            e.jurisdiction === jurisdiction && !overseen.has(e.id)
+        );
 
-            return {
-                ...entity,
-                name: entity.name,
-                personName: entity.personName || entity.current_members || null,
-                displayTitle: entity.displayTitle || entity.type,
-                level: level,
-                children: children.length > 0 ? children : []
+        // Skip any child already on the current path so a bad loop can't recurse forever
+        const onPath = new Set();
+        const buildNode = (id) => {
+            onPath.add(id);
+            const node = {
+                id: id,
+                children: (childIds.get(id) || [])
+                    .filter(childId => entityById.has(childId) && !onPath.has(childId))
+                    .map(childId => buildNode(childId))
             };
+            onPath.delete(id);
+            return node;
         };
 
-        return rootEntities.map(entity => buildNode(entity));
+        return this.hydrateHierarchy(rootEntities.map(entity => buildNode(entity.id)), entityById, 2);
     }
     
     buildHierarchy() {
@@ -237,10 +275,23 @@ class SanDiegoOrgChart {
             return;
         }
 
-        // Build data-driven hierarchies for each jurisdiction
-        const cityEntities = this.buildHierarchyFromData('City of San Diego');
-        const countyEntities = this.buildHierarchyFromData('County of San Diego');
-        const regionalEntities = this.buildHierarchyFromData('Regional');
+        // Per-jurisdiction trees: precomputed when available, else built here
+        const trees = {};
+        if (this.precomputedHierarchy) {
+            const entityById = new Map(this.governmentData.map(e => [e.id, e]));
+            ['city', 'county', 'regional'].forEach(jurisdiction => {
+                trees[jurisdiction] = this.hydrateHierarchy(
+                    this.precomputedHierarchy.jurisdictions[jurisdiction] || [], entityById, 2
+                );
+            });
+        } else {
+            ['city', 'county', 'regional'].forEach(jurisdiction => {
+                trees[jurisdiction] = this.buildHierarchyFromData(jurisdiction);
+            });
+        }
+        const cityEntities = trees.city;
+        const countyEntities = trees.county;
+        const regionalEntities = trees.regional;
 
         // Create jurisdiction containers
         const jurisdictions = [];
@@ -251,7 +302,7 @@ class SanDiegoOrgChart {
                 id: 'city-root',
                 jurisdiction: 'city',
                 level: 1,
-                children: cityEntities.map(entity => ({ ...entity, level: entity.level + 2 }))
+                children: cityEntities
             });
         }
 
@@ -261,7 +312,7 @@ class SanDiegoOrgChart {
                 id: 'county-root',
                 jurisdiction: 'county',
                 level: 1,
-                children: countyEntities.map(entity => ({ ...entity, level: entity.level + 2 }))
+                children: countyEntities
             });
         }
 
@@ -271,7 +322,7 @@ class SanDiegoOrgChart {
                 id: 'regional-root',
                 jurisdiction: 'regional',
                 level: 1,
-                children: regionalEntities.map(entity => ({ ...entity, level: entity.level + 2 }))
+                children: regionalEntities
             });
         }
 
@@ -322,7 +373,8 @@ class SanDiegoOrgChart {
     createVisualization() {
         if (!this.root) return;
         
-        // Clear existing content
+        // Clear existing content, including the snapshot from scripts/render_snapshots.py
+        this.svg.selectAll('.snapshot').remove();
         this.g.selectAll('*').remove();
         
         // Create tree layout
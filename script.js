@@ -1,12 +1,25 @@
 // San Diego Government Chart - D3.js Network Visualization
 // Following SF CivLab approach with D3.js force-directed graph
 
+// Columns the network view reads from the CSV fallback
+const ENTITY_CSV_FIELDS = ['id', 'name', 'type', 'jurisdiction', 'description',
+    'website_url', 'legal_source', 'parent_entity'];
+const RELATIONSHIP_CSV_FIELDS = ['relationship_id', 'source_entity_id', 'target_entity_id',
+    'relationship_type', 'relationship_category', 'description', 'authority_source'];
+
 class SanDiegoGovChart {
     constructor() {
         this.entities = [];
         this.relationships = [];
         this.filteredEntities = [];
         this.filteredRelationships = [];
+        this.visibleRelationships = new Set();
+        this.entityById = new Map();
+        this.relationshipsByEntity = new Map();
+        this.searchIndex = null;
+        this.graph = null;
+        this.layout = null;
+        this.staticLayout = false;
         this.currentFilters = {
             jurisdiction: 'all',
             entityType: 'all-types',
@@ -66,15 +79,27 @@ class SanDiegoGovChart {
         // Create visualization
         this.createVisualization();
         
+        // Redraw when server.py --watch rebuilds the data
+        watchGovData(change => this.reloadData(change));
+        
         console.log('Visualization initialized successfully');
     }
     
+    async reloadData(change) {
+        console.log(`Data rebuilt (${change.stages.join(', ')}), reloading...`);
+        await this.loadData();
+        this.updateVisualization();
+    }
+    
     updateDimensions() {
         const rect = this.svg.node().getBoundingClientRect();
         this.width = rect.width;
         this.height = rect.height;
         
-        if (this.simulation) {
+        if (this.staticLayout) {
+            // Precomputed coordinates are relative; just re-place them
+            this.updateVisualization();
+        } else if (this.simulation) {
             this.simulation
                 .force("center", d3.forceCenter(this.width / 2, this.height / 2))
                 .alpha(0.3)
@@ -86,19 +111,23 @@ class SanDiegoGovChart {
         try {
             console.log('Loading government data...');
             
-            // Load entities and relationships
-            const [entitiesData, relationshipsData] = await Promise.all([
-                d3.csv("data/sd_gov_entities_complete.csv"),
-                d3.csv("data/sd_gov_relationships_complete.csv")
-            ]);
+            // Prefer the precomputed bundle; fall back to parsing the CSVs
+            const bundle = await loadGovBundle();
+            const [entitiesData, relationshipsData] = bundle
+                ? [bundle.entities, bundle.relationships]
+                : await Promise.all([
+                    // server.py projects ?fields=; static hosts ignore it and send the whole file
+                    d3.csv("data/sd_gov_entities_complete.csv?fields=" + ENTITY_CSV_FIELDS.join(',')),
+                    d3.csv("data/sd_gov_relationships_complete.csv?fields=" + RELATIONSHIP_CSV_FIELDS.join(','))
+                ]);
             
-            // Process entities
+            // Process entities (bundle rows carry pre-bucketed codes)
             this.entities = entitiesData.map(d => ({
                 id: d.id,
                 name: d.name,
                 type: d.type,
-                jurisdiction: this.getJurisdiction(d.jurisdiction),
-                entityType: this.getEntityType(d.type),
+                jurisdiction: d.jurisdictionBucket || this.getJurisdiction(d.jurisdiction),
+                entityType: d.entityTypeBucket || this.getEntityType(d.type),
                 description: d.description,
                 website_url: d.website_url,
                 legal_source: d.legal_source,
@@ -118,6 +147,12 @@ class SanDiegoGovChart {
                 authority_source: d.authority_source
             }));
             
+            this.entityById = new Map(this.entities.map(entity => [entity.id, entity]));
+            this.indexRelationships();
+            [this.searchIndex, this.graph, this.layout] = await Promise.all([
+                loadGovSearchIndex(), loadGovGraph(), loadGovLayout()
+            ]);
+            
             console.log(`Loaded ${this.entities.length} entities and ${this.relationships.length} relationships`);
             
             // Initialize filtered data
@@ -210,9 +245,14 @@ class SanDiegoGovChart {
     }
     
     showSearchResults(query) {
-        const results = this.entities.filter(entity => 
-            entity.name.toLowerCase().includes(query)
-        ).slice(0, 10);
+        // Ranked index lookup when the precomputed index loaded, linear scan otherwise
+        const results = this.searchIndex
+            ? this.searchIndex.search(query, 10)
+                .map(doc => this.entityById.get(doc.id))
+                .filter(Boolean)
+            : this.entities.filter(entity =>
+                entity.name.toLowerCase().includes(query)
+            ).slice(0, 10);
         
         const searchResults = document.getElementById('search-results');
         
@@ -268,6 +308,8 @@ class SanDiegoGovChart {
             return entityMatch && relationshipTypeMatch;
         });
         
+        this.visibleRelationships = new Set(this.filteredRelationships);
+        
         // Update stats
         this.updateStats();
     }
@@ -286,8 +328,76 @@ class SanDiegoGovChart {
         
         console.log(`Creating visualization with ${this.filteredEntities.length} entities and ${this.filteredRelationships.length} relationships`);
         
+        // Take over from the static snapshot inlined by scripts/render_snapshots.py
+        this.svg.selectAll(".snapshot").remove();
+        
+        const layout = this.layout &&
+            this.layout.layouts[`${this.currentFilters.jurisdiction}|${this.currentFilters.entityType}`];
+        if (layout) {
+            this.renderPrecomputedLayout(layout);
+            return;
+        }
+        this.staticLayout = false;
+        
+        this.simulation = this.createSimulation();
+        
+        this.createLinks();
+        this.createNodes();
+        
+        // Start simulation
+        this.simulation.on("tick", () => this.tick());
+    }
+    
+    renderPrecomputedLayout(layout) {
+        // Coordinates from scripts/build_network_layout.py; no live simulation
+        this.staticLayout = true;
+        const previous = new Map();
+        this.filteredEntities.forEach(d => {
+            if (d.x !== undefined) previous.set(d.id, [d.x, d.y]);
+        });
+        
+        const padX = 60;
+        const padY = 40;
+        const targets = new Map();
+        layout.nodes.forEach((node, i) => {
+            targets.set(this.layout.ids[node], [
+                this.width / 2 + layout.xy[2 * i] * (this.width / 2 - padX),
+                this.height / 2 + layout.xy[2 * i + 1] * (this.height / 2 - padY)
+            ]);
+        });
+        this.filteredEntities.forEach(d => {
+            [d.x, d.y] = targets.get(d.id) || [this.width / 2, this.height / 2];
+        });
+        
+        // Stopped simulation: resolves link endpoints and backs dragging, never ticks on its own
+        this.simulation = this.createSimulation().stop();
+        
+        this.createLinks();
+        this.createNodes();
+        
+        // Animate from where each node was last drawn to its precomputed spot
+        const from = d => previous.get(d.id) || [d.x, d.y];
+        this.nodeElements
+            .attr("transform", d => `translate(${from(d)[0]},${from(d)[1]})`)
+            .transition()
+            .duration(600)
+            .attr("transform", d => `translate(${d.x},${d.y})`);
+        this.linkElements
+            .attr("x1", d => from(d.source)[0])
+            .attr("y1", d => from(d.source)[1])
+            .attr("x2", d => from(d.target)[0])
+            .attr("y2", d => from(d.target)[1])
+            .transition()
+            .duration(600)
+            .attr("x1", d => d.source.x)
+            .attr("y1", d => d.source.y)
+            .attr("x2", d => d.target.x)
+            .attr("y2", d => d.target.y);
+    }
+    
+    createSimulation() {
         // Create force simulation - optimized settings
-        this.simulation = d3.forceSimulation(this.filteredEntities)
+        return d3.forceSimulation(this.filteredEntities)
             .force("link", d3.forceLink(this.filteredRelationships)
                 .id(d => d.id)
                 .distance(90)
@@ -300,12 +410,6 @@ class SanDiegoGovChart {
                 .radius(d => this.getNodeRadius(d) + 5))
             .alphaDecay(0.02)  // Control simulation cooling
             .velocityDecay(0.4);  // Damping factor for stability
-        
-        this.createLinks();
-        this.createNodes();
-        
-        // Start simulation
-        this.simulation.on("tick", () => this.tick());
     }
     
     createLinks() {
@@ -374,15 +478,24 @@ class SanDiegoGovChart {
     drag() {
         return d3.drag()
             .on("start", (event, d) => {
+                if (this.staticLayout) return;
                 if (!event.active) this.simulation.alphaTarget(0.3).restart();
                 d.fx = d.x;
                 d.fy = d.y;
             })
             .on("drag", (event, d) => {
+                if (this.staticLayout) {
+                    // Move just this node over the precomputed layout
+                    d.x = event.x;
+                    d.y = event.y;
+                    this.tick();
+                    return;
+                }
                 d.fx = event.x;
                 d.fy = event.y;
             })
             .on("end", (event, d) => {
+                if (this.staticLayout) return;
                 if (!event.active) this.simulation.alphaTarget(0);
                 d.fx = null;
                 d.fy = null;
@@ -415,7 +528,7 @@ class SanDiegoGovChart {
     }
     
     selectEntity(entityId) {
-        const entity = this.entities.find(e => e.id === entityId);
+        const entity = this.entityById.get(entityId);
         if (entity) {
             this.showEntityDetails(entity);
             this.highlightEntity(entityId);
@@ -438,8 +551,7 @@ class SanDiegoGovChart {
             .attr("stroke-width", 3);
         
         // Highlight connected nodes and links
-        this.filteredRelationships
-            .filter(rel => rel.source.id === entityId || rel.target.id === entityId)
+        this.getVisibleRelationships(entityId)
             .forEach(rel => {
                 // Highlight connected nodes
                 this.nodeElements.filter(d => d.id === rel.source.id || d.id === rel.target.id)
@@ -458,6 +570,7 @@ class SanDiegoGovChart {
         
         // Get relationships for this entity
         const relationships = this.getEntityRelationships(entity.id);
+        const chains = this.renderAuthorityChains(entity.id);
         
         content.innerHTML = `
             <div class="entity-info">
@@ -479,15 +592,72 @@ class SanDiegoGovChart {
                     ${this.renderRelationships(relationships, entity.id)}
                 </div>
             ` : ''}
+            
+            ${chains ? `
+                <div class="relationships-section">
+                    <h4>Chain of Authority</h4>
+                    ${chains}
+                </div>
+            ` : ''}
         `;
         
         sidebar.classList.add('open');
     }
     
+    indexRelationships() {
+        // Relationships touching each entity, built once instead of filtered per click
+        this.relationshipsByEntity = new Map();
+        this.relationships.forEach(rel => {
+            [rel.sourceId, rel.targetId].forEach(entityId => {
+                if (!this.relationshipsByEntity.has(entityId)) this.relationshipsByEntity.set(entityId, []);
+                const list = this.relationshipsByEntity.get(entityId);
+                if (list[list.length - 1] !== rel) list.push(rel);
+            });
+        });
+    }
+
     getEntityRelationships(entityId) {
-        return this.relationships.filter(rel =>
-            rel.sourceId === entityId || rel.targetId === entityId
-        );
+        return this.relationshipsByEntity.get(entityId) || [];
+    }
+
+    getVisibleRelationships(entityId) {
+        return this.getEntityRelationships(entityId).filter(rel => this.visibleRelationships.has(rel));
+    }
+
+    renderAuthorityChains(entityId) {
+        // Transitive chains precomputed by scripts/gov_graph.py
+        if (!this.graph) return '';
+        const nodes = this.graph.nodes;
+        const nameOf = index => this.entityById.get(nodes[index])?.name || nodes[index];
+        const oversight = this.graph.oversight_chains[entityId] || [];
+        const appointers = this.graph.appointer_chains[entityId];
+
+        let html = '';
+        if (oversight.length > 0) {
+            html += `
+                <div class="relationship-group">
+                    <div class="relationship-type">Oversight Chain</div>
+                    ${oversight.map(([index, depth]) => `
+                        <div class="relationship-item hierarchical" data-entity-id="${nodes[index]}">
+                            <div class="relationship-entity">${'↑'.repeat(depth)} ${nameOf(index)}</div>
+                        </div>
+                    `).join('')}
+                </div>
+            `;
+        }
+        if (appointers && appointers.ultimate.length > 0) {
+            html += `
+                <div class="relationship-group">
+                    <div class="relationship-type">Ultimately Appointed By</div>
+                    ${appointers.ultimate.map(index => `
+                        <div class="relationship-item appointment" data-entity-id="${nodes[index]}">
+                            <div class="relationship-entity">${nameOf(index)}</div>
+                        </div>
+                    `).join('')}
+                </div>
+            `;
+        }
+        return html;
     }
     
     renderRelationships(relationships, currentEntityId) {
@@ -501,8 +671,8 @@ class SanDiegoGovChart {
                 <div class="relationship-group">
                     <div class="relationship-type">Hierarchical (${hierarchical.length})</div>
                     ${hierarchical.map(rel => {
-                        const otherEntity = this.entities.find(e =>
-                            e.id === (rel.sourceId === currentEntityId ? rel.targetId : rel.sourceId)
+                        const otherEntity = this.entityById.get(
+                            rel.sourceId === currentEntityId ? rel.targetId : rel.sourceId
                         );
                         const isParent = rel.targetId === currentEntityId;
                         return `
@@ -523,8 +693,8 @@ class SanDiegoGovChart {
                 <div class="relationship-group">
                     <div class="relationship-type">Appointments (${appointment.length})</div>
                     ${appointment.map(rel => {
-                        const otherEntity = this.entities.find(e =>
-                            e.id === (rel.sourceId === currentEntityId ? rel.targetId : rel.sourceId)
+                        const otherEntity = this.entityById.get(
+                            rel.sourceId === currentEntityId ? rel.targetId : rel.sourceId
                         );
                         const isAppointer = rel.sourceId === currentEntityId;
                         return `
@@ -589,12 +759,10 @@ class SanDiegoGovChart {
         const connectedLinks = new Set();
 
         // Find all connected nodes and links
-        this.filteredRelationships.forEach(rel => {
-            if (rel.sourceId === focusNode.id || rel.targetId === focusNode.id) {
-                connectedLinks.add(`${rel.sourceId}-${rel.targetId}`);
-                connectedNodes.add(rel.sourceId);
-                connectedNodes.add(rel.targetId);
-            }
+        this.getVisibleRelationships(focusNode.id).forEach(rel => {
+            connectedLinks.add(`${rel.sourceId}-${rel.targetId}`);
+            connectedNodes.add(rel.sourceId);
+            connectedNodes.add(rel.targetId);
         });
 
         // Apply highlighting styles
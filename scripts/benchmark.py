@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Benchmark the data build and server.py on synthetic scale-up datasets
+Times every pipeline stage in a fresh process (with its peak memory), load-tests
+a local server.py with concurrent clients, and writes the results as JSON
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+try:
+    import resource
+except ImportError:  # Windows: peak memory is not reported
+    resource = None
+
+from datastore import DEFAULT_CACHE_DIR, _cache_path
+from pipeline import STAGES, execute_stage, stage_dependencies
+from synthetic_data import generate_dataset
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_OUTPUT_DIR = os.path.join(PROJECT_ROOT, '.cache', 'benchmarks')
+DEFAULT_SCALES = [10, 100, 1000]
+
+# Network checks don't measure our code, and the report needs their results
+EXCLUDED_STAGES = {'url_checks', 'quality_report'}
+# Stress majorization holds dense n x n matrices; beyond this it is skipped
+LAYOUT_MAX_ENTITIES = 2000
+
+SERVER_START_TIMEOUT = 300  # seconds; the first API request builds the index
+REGRESSION_FACTOR = 1.2
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def measure_stage(name, data_dir, upstream):
+    """Worker entry point: run one stage and report its time and memory"""
+    baseline = peak_rss_mb()
+    record = execute_stage(name, data_dir, upstream)
+    record['peak_rss_mb'] = peak_rss_mb()
+    record['baseline_rss_mb'] = baseline
+    return record
+
+
+def stage_order():
+    """Pipeline stages in a dependency-respecting order, declaration order otherwise"""
+    dependencies = stage_dependencies(list(STAGES.values()))
+    ordered = []
+    while len(ordered) < len(STAGES):
+        for name in STAGES:
+            if name not in ordered and dependencies[name] <= set(ordered):
+                ordered.append(name)
+                break
+    return ordered
+
+
+def benchmark_stages(data_dir, entity_count):
+    """Run every stage once, in its own spawned process; returns {stage: result}"""
+    results = {}
+    stage_results = {}
+    for name in stage_order():
+        if name in EXCLUDED_STAGES:
+            continue
+        if name == 'layout' and entity_count > LAYOUT_MAX_ENTITIES:
+            results[name] = {'status': 'skipped', 'reason': f"more than {LAYOUT_MAX_ENTITIES} entities"}
+            continue
+        upstream = {dep: stage_results.get(dep) for dep in STAGES[name].after}
+        # A fresh process per stage, so peak memory is the stage's own
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+            started = time.perf_counter()
+            record = pool.submit(measure_stage, name, data_dir, upstream).result()
+            wall = time.perf_counter() - started
+        stage_results[name] = record['result']
+        results[name] = {
+            'status': 'failed' if record['error'] else 'ok',
+            'seconds': record['seconds'],
+            'process_seconds': round(wall, 3),
+            'peak_rss_mb': record['peak_rss_mb'],
+            'baseline_rss_mb': record['baseline_rss_mb']
+        }
+        if record['error']:
+            results[name]['error'] = record['error'].strip().splitlines()[-1]
+        print(f"  {name}: {record['seconds']:.3f}s, peak {record['peak_rss_mb']} MB"
+              f"{' ❌ ' + results[name]['error'] if record['error'] else ''}")
+    return results
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def fetch(port, path, timeout=60):
+    """GET path from the local server; returns (status, body length)"""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    try:
+        connection.request('GET', path)
+        response = connection.getresponse()
+        return response.status, len(response.read())
+    finally:
+        connection.close()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return round(sorted_values[index] * 1000, 2)
+
+
+def load_test(root_dir, backend, clients, requests_per_client, endpoints):
+    """Start server.py on root_dir and hit endpoints from concurrent clients"""
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(PROJECT_ROOT, 'server.py'), str(port), '--backend', backend],
+        cwd=root_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        # Ready once the API answers; this first request also pays for loading the index
+        started = time.perf_counter()
+        while True:
+            try:
+                status, _ = fetch(port, '/api/entities?limit=1', timeout=SERVER_START_TIMEOUT)
+                if status == 200:
+                    break
+            except OSError:
+                pass
+            if server.poll() is not None or time.perf_counter() - started > SERVER_START_TIMEOUT:
+                raise RuntimeError(f"server.py --backend {backend} did not start")
+            time.sleep(0.1)
+        first_response = time.perf_counter() - started
+
+        latencies = {path: [] for path in endpoints}
+        errors = {path: 0 for path in endpoints}
+        lock = threading.Lock()
+
+        def client(offset):
+            for i in range(requests_per_client):
+                path = endpoints[(offset + i) % len(endpoints)]
+                request_started = time.perf_counter()
+                try:
+                    status, _ = fetch(port, path)
+                    failed = status != 200
+                except OSError:
+                    failed = True
+                elapsed = time.perf_counter() - request_started
+                with lock:
+                    if failed:
+                        errors[path] += 1
+                    else:
+                        latencies[path].append(elapsed)
+
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+        load_started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = time.perf_counter() - load_started
+    finally:
+        server.terminate()
+        server.wait()
+
+    total = clients * requests_per_client
+    result = {
+        'clients': clients,
+        'requests': total,
+        'errors': sum(errors.values()),
+        'seconds': round(duration, 3),
+        'requests_per_second': round(total / duration, 1) if duration else None,
+        'first_response_seconds': round(first_response, 3),
+        'endpoints': {}
+    }
+    for path in endpoints:
+        values = sorted(latencies[path])
+        result['endpoints'][path] = {
+            'ok': len(values),
+            'errors': errors[path],
+            'mean_ms': round(sum(values) / len(values) * 1000, 2) if values else None,
+            'p50_ms': percentile(values, 0.5),
+            'p95_ms': percentile(values, 0.95),
+            'p99_ms': percentile(values, 0.99)
+        }
+    print(f"  server ({backend}): {result['requests_per_second']} req/s over {total} requests, "
+          f"{result['errors']} errors, first response {result['first_response_seconds']}s")
+    return result
+
+
+def server_endpoints():
+    """Request mix for the load test: API queries plus a static data file"""
+    return [
+        '/api/entities?jurisdiction=city&type=boards&limit=100',
+        '/api/relationships?category=appointment&limit=100',
+        '/api/subgraph?root=mayor-001&depth=2&direction=both',
+        '/api/search?q=planning%20commission&limit=10',
+        '/data/sd_gov_relationships_hierarchical.csv'
+    ]
+
+
+def benchmark_scale(scale, clients, requests_per_client, backends, keep=False):
+    """Generate one synthetic dataset, benchmark it and clean up"""
+    root_dir = tempfile.mkdtemp(prefix=f'sd_gov_bench_{scale}x_')
+    data_dir = os.path.join(root_dir, 'data')
+    try:
+        started = time.perf_counter()
+        counts = generate_dataset(data_dir, scale)
+        generate_seconds = time.perf_counter() - started
+        entity_count = sum(rows for filename, rows in counts.items()
+                           if filename in ('sd_gov_elected.csv', 'sd_gov_city_departments.csv',
+                                           'sd_gov_county_departments.csv', 'sd_gov_regional_authorities.csv',
+                                           'sd_gov_boards_commissions.csv'))
+        print(f"\n{scale}x: {entity_count} entities (generated in {generate_seconds:.2f}s) in {root_dir}")
+
+        result = {
+            'entities': entity_count,
+            'rows': counts,
+            'generate_seconds': round(generate_seconds, 3),
+            'stages': benchmark_stages(data_dir, entity_count),
+            'server': {}
+        }
+        for backend in backends:
+            result['server'][backend] = load_test(root_dir, backend, clients, requests_per_client,
+                                                  server_endpoints())
+        return result
+    finally:
+        if keep:
+            print(f"  kept {root_dir}")
+        else:
+            for path in os.listdir(data_dir) if os.path.isdir(data_dir) else []:
+                cache_path = _cache_path(DEFAULT_CACHE_DIR, os.path.join(data_dir, path))
+                if os.path.exists(cache_path):
+                    os.remove(cache_path)
+            shutil.rmtree(root_dir, ignore_errors=True)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(previous, current):
+    """Print stage time and throughput changes against an earlier results file"""
+    print(f"\n=== Compared with {previous.get('commit') or 'previous run'} ===")
+    for scale, result in current['scales'].items():
+        old = previous.get('scales', {}).get(scale)
+        if not old:
+            continue
+        print(f"{scale}x:")
+        for name, stage in result['stages'].items():
+            old_stage = old['stages'].get(name, {})
+            if stage.get('seconds') and old_stage.get('seconds'):
+                ratio = stage['seconds'] / old_stage['seconds']
+                flag = ' ⚠️  slower' if ratio > REGRESSION_FACTOR else ''
+                print(f"  {name}: {old_stage['seconds']:.3f}s -> {stage['seconds']:.3f}s ({ratio:.2f}x){flag}")
+        for backend, server in result['server'].items():
+            old_server = old.get('server', {}).get(backend)
+            if old_server and old_server.get('requests_per_second') and server.get('requests_per_second'):
+                ratio = server['requests_per_second'] / old_server['requests_per_second']
+                flag = ' ⚠️  slower' if ratio < 1 / REGRESSION_FACTOR else ''
+                print(f"  server ({backend}): {old_server['requests_per_second']} -> "
+                      f"{server['requests_per_second']} req/s ({ratio:.2f}x){flag}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the data build and server on synthetic data")
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES,
+                        help="dataset sizes as multiples of the real data (default: 10 100 1000)")
+    parser.add_argument('--clients', type=int, default=8, help="concurrent load-test clients (default: 8)")
+    parser.add_argument('--requests', type=int, default=50, help="requests per client (default: 50)")
+    parser.add_argument('--backends', nargs='*', choices=['memory', 'sqlite'], default=['memory', 'sqlite'],
+                        help="server.py API backends to load-test; none to skip the server")
+    parser.add_argument('--output', help="results file (default: .cache/benchmarks/benchmark-<time>.json)")
+    parser.add_argument('--compare', help="earlier results file to compare against")
+    parser.add_argument('--keep', action='store_true', help="keep the generated datasets")
+    args = parser.parse_args()
+
+    results = {
+        'commit': git_commit(),
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'scales': {}
+    }
+    for scale in args.scales:
+        results['scales'][str(scale)] = benchmark_scale(scale, args.clients, args.requests,
+                                                        args.backends, keep=args.keep)
+
+    output = args.output or os.path.join(DEFAULT_OUTPUT_DIR, f"benchmark-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+        f.write('\n')
+    print(f"\nResults: {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare_results(json.load(f), results)
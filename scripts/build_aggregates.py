@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Precompute the dashboard's aggregate tables (NumPy)
+Budget and seat totals by jurisdiction and entity type, boards per appointer,
+topic coverage and budgets rolled up the oversight hierarchy, computed over
+whole columns and written as one small artifact that server.py serves
+"""
+
+import json
+import os
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from build_data_bundle import (ENTITY_TYPES, JURISDICTIONS, get_entity_type, get_jurisdiction,
+                               read_rows, update_manifest, write_hashed_artifact)
+from build_org_hierarchy import compile_hierarchy
+from datastore import CATEGORY, INT, INT_MISSING, load_table
+
+AGGREGATES_FORMAT_VERSION = 1
+AGGREGATES_PREFIX = 'sd_gov_aggregates'
+
+TOPIC_SEPARATOR = ';'
+
+
+def int_values(table, name):
+    """(values, present) int64 arrays for a column; unparseable or empty cells are absent"""
+    column = table.column(name)
+    if column.kind == INT:
+        values = np.array(column.values, dtype=np.int64)  # Copy: cached columns are read-only views
+    else:
+        # Declared INT but stored as text (a cell did not parse): keep the clean cells
+        values = np.full(len(table), INT_MISSING, dtype=np.int64)
+        for i in range(len(table)):
+            text = column.text(i).strip()
+            if text.lstrip('-').isdigit():
+                values[i] = int(text)
+    present = values != INT_MISSING
+    values[~present] = 0
+    return values, present
+
+
+def bucket_codes(table, name, bucket, buckets):
+    """Bucket index per row, mapping each distinct value once rather than every cell"""
+    column = table.column(name)
+    if column.kind == CATEGORY:
+        lookup = np.array([buckets.index(bucket(value)) for value in column.categories], dtype=np.int64)
+        return lookup[np.asarray(column.codes)]
+    return np.array([buckets.index(bucket(value)) for value in column], dtype=np.int64)
+
+
+def grouped_sum(groups, values, size):
+    totals = np.zeros(size, dtype=np.int64)
+    np.add.at(totals, groups, values)
+    return totals
+
+
+def table(columns, rows):
+    return {'columns': columns, 'rows': rows}
+
+
+def primary_parents(entity_ids, hierarchy):
+    """Parent index per entity (-1 for roots): its first parent in the cycle-free org chart trees
+
+    An entity overseen by several parents is counted under the first only, so
+    every budget is rolled up along exactly one path.
+    """
+    position = {entity_id: i for i, entity_id in enumerate(entity_ids)}
+    parents = np.full(len(entity_ids), -1, dtype=np.int64)
+    seen = set()
+    for roots in hierarchy['jurisdictions'].values():
+        stack = [(root, -1) for root in reversed(roots)]
+        while stack:
+            node, parent = stack.pop()
+            if node['id'] in seen:
+                continue
+            seen.add(node['id'])
+            parents[position[node['id']]] = parent
+            stack.extend((child, position[node['id']]) for child in reversed(node['children']))
+    return parents
+
+
+def depths(parents):
+    """Distance to the root per entity, by pointer jumping over the whole array"""
+    depth = np.zeros(len(parents), dtype=np.int64)
+    ancestor = parents.copy()
+    while True:
+        active = ancestor >= 0
+        if not active.any():
+            return depth
+        depth[active] += 1
+        ancestor[active] = parents[ancestor[active]]
+
+
+def rollup(parents, values):
+    """Subtree totals: each level, deepest first, adds its totals into its parents"""
+    totals = values.copy()
+    depth = depths(parents)
+    for level in range(int(depth.max(initial=0)), 0, -1):
+        nodes = np.flatnonzero(depth == level)
+        np.add.at(totals, parents[nodes], totals[nodes])
+    return totals
+
+
+def compile_aggregates(entities, relationships, appointments):
+    """Aggregates artifact dictionary from the master entities, relationships and appointments tables"""
+    entity_ids = entities.values('id')
+    names = entities.values('name')
+    jurisdiction = bucket_codes(entities, 'jurisdiction', get_jurisdiction, JURISDICTIONS)
+    entity_type = bucket_codes(entities, 'type', get_entity_type, ENTITY_TYPES)
+    budget, has_budget = int_values(entities, 'budget')
+    seats, has_seats = int_values(entities, 'seat_count')
+
+    # Jurisdiction x entity type cells, row-major
+    group = jurisdiction * len(ENTITY_TYPES) + entity_type
+    cells = len(JURISDICTIONS) * len(ENTITY_TYPES)
+    entity_counts = np.bincount(group, minlength=cells)
+    budget_totals = grouped_sum(group, budget, cells)
+    budget_counts = np.bincount(group[has_budget], minlength=cells)
+    seat_totals = grouped_sum(group, seats, cells)
+    seat_counts = np.bincount(group[has_seats], minlength=cells)
+    by_group = [(cell, JURISDICTIONS[cell // len(ENTITY_TYPES)], ENTITY_TYPES[cell % len(ENTITY_TYPES)])
+                for cell in range(cells) if entity_counts[cell]]
+
+    # Distinct appointer -> board pairs; appointees outside the master list are ignored
+    position = {entity_id: i for i, entity_id in enumerate(entity_ids)}
+    appointer_column = appointments.column('appointer_id')
+    appointers = appointments.values('appointer_id')
+    appointees = np.array([position.get(value, -1) for value in appointments.values('appointee_entity_id')],
+                          dtype=np.int64)
+    if appointer_column.kind == CATEGORY:
+        appointer_names = list(appointer_column.categories)
+        appointer_codes = np.asarray(appointer_column.codes).astype(np.int64)
+    else:
+        appointer_names = sorted(set(appointers))
+        appointer_codes = np.array([appointer_names.index(value) for value in appointers], dtype=np.int64)
+    known = appointees >= 0
+    board = np.zeros(len(appointees), dtype=bool)
+    board[known] = entity_type[appointees[known]] == ENTITY_TYPES.index('boards')
+    appointment_counts = np.bincount(appointer_codes, minlength=len(appointer_names))
+    pairs = np.unique(appointer_codes[board] * len(entity_ids) + appointees[board])
+    board_counts = np.bincount(pairs // len(entity_ids), minlength=len(appointer_names))
+    appointer_order = sorted(range(len(appointer_names)),
+                             key=lambda code: (-board_counts[code], -appointment_counts[code],
+                                               appointer_names[code]))
+
+    # Entity x topic incidence pairs, then counts over the pairs
+    topic_names = []
+    topic_code = {}
+    pair_entities, pair_topics = [], []
+    for i, tags in enumerate(entities.values('topic_tags')):
+        for tag in dict.fromkeys(tag.strip() for tag in tags.split(TOPIC_SEPARATOR)):
+            if tag:
+                if tag not in topic_code:
+                    topic_code[tag] = len(topic_names)
+                    topic_names.append(tag)
+                pair_entities.append(i)
+                pair_topics.append(topic_code[tag])
+    pair_entities = np.array(pair_entities, dtype=np.int64)
+    pair_topics = np.array(pair_topics, dtype=np.int64)
+    topic_counts = np.bincount(pair_topics, minlength=len(topic_names))
+    topic_by_jurisdiction = np.bincount(pair_topics * len(JURISDICTIONS) + jurisdiction[pair_entities],
+                                        minlength=len(topic_names) * len(JURISDICTIONS))
+    topic_budgets = grouped_sum(pair_topics, budget[pair_entities], len(topic_names))
+    topic_order = sorted(range(len(topic_names)), key=lambda code: (-topic_counts[code], topic_names[code]))
+
+    # Oversight rollup along the org chart hierarchy
+    hierarchy = compile_hierarchy(list(entities.rows()), relationships)
+    parents = primary_parents(entity_ids, hierarchy)
+    rolled_budget = rollup(parents, budget)
+    budgeted_units = rollup(parents, has_budget.astype(np.int64))
+    descendants = rollup(parents, np.ones(len(entity_ids), dtype=np.int64)) - 1
+    # Every entity heading a branch or holding budget, biggest first
+    rollup_order = sorted(np.flatnonzero((rolled_budget > 0) | (descendants > 0)).tolist(),
+                          key=lambda i: (-rolled_budget[i], -descendants[i], entity_ids[i]))
+
+    tables = {
+        'budget_by_jurisdiction_type': table(
+            ['jurisdiction', 'entity_type', 'entities', 'budgeted_entities', 'budget_total'],
+            [[j, t, int(entity_counts[cell]), int(budget_counts[cell]), int(budget_totals[cell])]
+             for cell, j, t in by_group]),
+        'seats_by_jurisdiction_type': table(
+            ['jurisdiction', 'entity_type', 'entities', 'entities_with_seats', 'seat_total'],
+            [[j, t, int(entity_counts[cell]), int(seat_counts[cell]), int(seat_totals[cell])]
+             for cell, j, t in by_group]),
+        'boards_per_appointer': table(
+            ['appointer_id', 'name', 'boards', 'appointments'],
+            [[appointer_names[code], names[position[appointer_names[code]]]
+              if appointer_names[code] in position else '',
+              int(board_counts[code]), int(appointment_counts[code])]
+             for code in appointer_order]),
+        'topic_coverage': table(
+            ['topic', 'entities'] + JURISDICTIONS + ['budget_total'],
+            [[topic_names[code], int(topic_counts[code])]
+             + [int(topic_by_jurisdiction[code * len(JURISDICTIONS) + j]) for j in range(len(JURISDICTIONS))]
+             + [int(topic_budgets[code])]
+             for code in topic_order]),
+        'budget_rollup': table(
+            ['id', 'name', 'jurisdiction', 'parent_id', 'budget', 'rolled_budget',
+             'budgeted_units', 'descendants'],
+            [[entity_ids[i], names[i], JURISDICTIONS[jurisdiction[i]],
+              entity_ids[parents[i]] if parents[i] >= 0 else '',
+              int(budget[i]) if has_budget[i] else None, int(rolled_budget[i]),
+              int(budgeted_units[i]), int(descendants[i])]
+             for i in rollup_order]),
+    }
+
+    return {
+        'format': AGGREGATES_PREFIX,
+        'version': AGGREGATES_FORMAT_VERSION,
+        'totals': {
+            'entities': len(entity_ids),
+            'budget': int(budget.sum()),
+            'budgeted_entities': int(has_budget.sum()),
+            'seats': int(seats.sum()),
+            'appointments': len(appointers),
+            'topics': len(topic_names)
+        },
+        'tables': tables
+    }
+
+
+def load_aggregates(data_dir=None):
+    """The aggregates artifact named in data/bundle/manifest.json, else computed from the CSVs
+
+    Returns None when neither is possible (no artifact and no NumPy).
+    """
+    if data_dir is None:
+        data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
+    manifest_path = os.path.join(data_dir, 'bundle', 'manifest.json')
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            artifact_name = json.load(f).get('aggregates')
+        artifact_path = os.path.join(data_dir, 'bundle', artifact_name or '')
+        if artifact_name and os.path.exists(artifact_path):
+            with open(artifact_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+    if np is None:
+        return None
+    return compile_aggregates(
+        load_table(os.path.join(data_dir, 'sd_gov_entities_complete.csv')),
+        read_rows(os.path.join(data_dir, 'sd_gov_relationships_complete.csv'))[1],
+        load_table(os.path.join(data_dir, 'sd_gov_appointments.csv')))
+
+
+def build_aggregates(data_dir=None):
+    """Write data/bundle/sd_gov_aggregates.<hash>.json and register it in the manifest"""
+
+    if data_dir is None:
+        data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
+    bundle_dir = os.path.join(data_dir, 'bundle')
+
+    entities = load_table(os.path.join(data_dir, 'sd_gov_entities_complete.csv'))
+    _, relationships = read_rows(os.path.join(data_dir, 'sd_gov_relationships_complete.csv'))
+    appointments = load_table(os.path.join(data_dir, 'sd_gov_appointments.csv'))
+
+    aggregates = compile_aggregates(entities, relationships, appointments)
+    payload = json.dumps(aggregates, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    aggregates_path = write_hashed_artifact(bundle_dir, AGGREGATES_PREFIX, payload)
+    update_manifest(bundle_dir, 'aggregates', aggregates_path)
+
+    print(f"Generated aggregates: {aggregates_path}")
+    for name, rows in aggregates['tables'].items():
+        print(f"  {name}: {len(rows['rows'])} rows")
+    print(f"Size: {len(payload) / 1024:.1f} KB")
+
+    return aggregates_path
+
+
+def build_aggregates_if_available(data_dir=None):
+    """Rebuild the aggregates as part of a data build, skipping them when NumPy is missing"""
+    if np is None:
+        print("⚠️  NumPy not installed - skipping dashboard aggregates")
+        return None
+    return build_aggregates(data_dir)
+
+
+if __name__ == "__main__":
+    if np is None:
+        raise SystemExit("build_aggregates.py requires NumPy: pip install numpy")
+    build_aggregates()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Compile the master entity and relationship files into a compact,
+precomputed JSON bundle for the frontends
+"""
+
+import glob
+import hashlib
+import json
+import os
+
+from build_manifest import file_lock
+from datastore import load_table
+
+BUNDLE_FORMAT_VERSION = 1
+BUNDLE_PREFIX = 'sd_gov_bundle'
+
+# Bucket codes shared with script.js / orgchart-script.js
+JURISDICTIONS = ['city', 'county', 'regional']
+ENTITY_TYPES = ['elected', 'departments', 'boards']
+
+# Relationship columns replaced by integer node indices in the bundle
+EDGE_ENDPOINTS = ('source_entity_id', 'target_entity_id')
+
+
+def get_jurisdiction(jurisdiction):
+    """Bucket a raw jurisdiction string the same way the frontends do"""
+    if 'City' in jurisdiction:
+        return 'city'
+    if 'County' in jurisdiction:
+        return 'county'
+    if 'Regional' in jurisdiction:
+        return 'regional'
+    return 'regional'  # Default for unclear cases
+
+
+def get_entity_type(entity_type):
+    """Bucket a raw entity type the same way the network view does"""
+    lower_type = entity_type.lower()
+    if 'mayor' in lower_type or 'council' in lower_type or 'supervisor' in lower_type:
+        return 'elected'
+    if 'department' in lower_type or 'office' in lower_type or 'agency' in lower_type:
+        return 'departments'
+    if 'board' in lower_type or 'commission' in lower_type or 'committee' in lower_type:
+        return 'boards'
+    return 'departments'  # Default
+
+
+class StringTable:
+    """Intern strings into a shared table, returning stable integer codes"""
+
+    def __init__(self):
+        self.strings = []
+        self._index = {}
+
+    def code(self, value):
+        if value not in self._index:
+            self._index[value] = len(self.strings)
+            self.strings.append(value)
+        return self._index[value]
+
+
+def read_rows(csv_file):
+    """Return (headers, rows) for a CSV file, loaded through the column store"""
+    table = load_table(csv_file)
+    return table.fieldnames, list(table.rows())
+
+
+def compile_bundle(entity_headers, entities, relationship_headers, relationships):
+    """Build the bundle dictionary from parsed master rows"""
+    strings = StringTable()
+
+    node_index = {row['id']: i for i, row in enumerate(entities)}
+
+    entity_columns = {
+        field: [strings.code(row.get(field) or '') for row in entities]
+        for field in entity_headers
+    }
+    entity_columns['jurisdiction_code'] = [
+        JURISDICTIONS.index(get_jurisdiction(row.get('jurisdiction') or '')) for row in entities
+    ]
+    entity_columns['entity_type_code'] = [
+        ENTITY_TYPES.index(get_entity_type(row.get('type') or '')) for row in entities
+    ]
+
+    # Edges reference nodes by position; -1 marks an endpoint missing from the entity list
+    relationship_columns = {
+        'source': [node_index.get(row['source_entity_id'], -1) for row in relationships],
+        'target': [node_index.get(row['target_entity_id'], -1) for row in relationships]
+    }
+    for field in relationship_headers:
+        if field not in EDGE_ENDPOINTS:
+            relationship_columns[field] = [strings.code(row.get(field) or '') for row in relationships]
+
+    return {
+        'format': BUNDLE_PREFIX,
+        'version': BUNDLE_FORMAT_VERSION,
+        'jurisdictions': JURISDICTIONS,
+        'entity_types': ENTITY_TYPES,
+        'strings': strings.strings,
+        'entities': {'count': len(entities), 'columns': entity_columns},
+        'relationships': {'count': len(relationships), 'columns': relationship_columns}
+    }
+
+
+def write_hashed_artifact(bundle_dir, prefix, payload):
+    """Write payload as <prefix>.<content hash>.json, pruning all but the previous version
+
+    The version data/bundle/manifest.json still names is kept: a page loaded
+    before this build fetches its artifacts by that name.
+    """
+    content_hash = hashlib.sha256(payload).hexdigest()[:12]
+    artifact_name = f"{prefix}.{content_hash}.json"
+
+    os.makedirs(bundle_dir, exist_ok=True)
+    artifact_path = os.path.join(bundle_dir, artifact_name)
+    if not os.path.exists(artifact_path):
+        # Written aside and renamed in, so the hashed name is never served half-written
+        tmp_path = f"{artifact_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, artifact_path)
+
+    manifest_path = os.path.join(bundle_dir, 'manifest.json')
+    keep = {artifact_name}
+    with file_lock(manifest_path):
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                keep.update(name for name in json.load(f).values() if isinstance(name, str))
+        for old_path in glob.glob(os.path.join(bundle_dir, f"{prefix}.*.json")):
+            if os.path.basename(old_path) not in keep:
+                for path in [old_path] + glob.glob(f"{old_path}.*"):
+                    os.remove(path)  # With its .gz/.br siblings
+
+    return artifact_path
+
+
+def update_manifest(bundle_dir, key, artifact_path):
+    """Point manifest.json's entry for key at a freshly written artifact"""
+    manifest_path = os.path.join(bundle_dir, 'manifest.json')
+    # Artifacts may be built in parallel; serialize updates and swap the file in
+    # whole so the server never reads a half-written manifest
+    with file_lock(manifest_path):
+        manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        manifest['version'] = BUNDLE_FORMAT_VERSION
+        manifest[key] = os.path.basename(artifact_path)
+        tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+            f.write('\n')
+        os.replace(tmp_path, manifest_path)
+
+
+def build_data_bundle(data_dir=None):
+    """Write data/bundle/sd_gov_bundle.<hash>.json and point manifest.json at it"""
+
+    if data_dir is None:
+        data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
+    bundle_dir = os.path.join(data_dir, 'bundle')
+
+    entity_headers, entities = read_rows(os.path.join(data_dir, 'sd_gov_entities_complete.csv'))
+    relationship_headers, relationships = read_rows(
+        os.path.join(data_dir, 'sd_gov_relationships_complete.csv'))
+
+    bundle = compile_bundle(entity_headers, entities, relationship_headers, relationships)
+    payload = json.dumps(bundle, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    bundle_path = write_hashed_artifact(bundle_dir, BUNDLE_PREFIX, payload)
+    update_manifest(bundle_dir, 'bundle', bundle_path)
+
+    print(f"Generated data bundle: {bundle_path}")
+    print(f"Entities: {len(entities)}, relationships: {len(relationships)}")
+    print(f"Interned strings: {len(bundle['strings'])}, size: {len(payload) / 1024:.1f} KB")
+
+    return bundle_path
+
+
+if __name__ == "__main__":
+    build_data_bundle()
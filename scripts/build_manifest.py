@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Content-hash build manifest for incremental regeneration of the master files
+Tracks per-source file hashes and per-row hashes so unchanged inputs are skipped
+"""
+
+import csv
+import hashlib
+import io
+import json
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, concurrent builds are not supported
+    fcntl = None
+
+from datastore import load_table
+
+DEFAULT_MANIFEST_FILE = os.path.join(os.path.dirname(__file__), '..', '.cache', 'build_manifest.json')
+
+
+def file_hash(path):
+    """sha256 of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def row_hash(row, fields):
+    """Stable hash of a row's values for the given fields"""
+    joined = '\x1f'.join(row.get(field) or '' for field in fields)
+    return hashlib.sha256(joined.encode('utf-8')).hexdigest()[:16]
+
+
+def write_if_changed(path, data):
+    """Write bytes to path unless it already holds exactly those bytes; returns True if written"""
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive advisory lock on path + '.lock' (a no-op without fcntl)
+
+    Used around read-modify-write of shared JSON state, since the pipeline runs
+    stages in several processes at once.
+    """
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(f"{path}.lock", 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def read_records(csv_file):
+    """Parse a CSV keeping each record's raw text, so unchanged rows can be
+    written back byte-for-byte; returns (header_text, fieldnames, [(row, raw_text)])"""
+    with open(csv_file, 'r', newline='', encoding='utf-8') as f:
+        lines = f.read().splitlines(keepends=True)
+    reader = csv.DictReader(iter(lines))
+    fieldnames = reader.fieldnames or []
+    header_text = ''.join(lines[:reader.line_num])
+    records = []
+    consumed = reader.line_num
+    for row in reader:
+        records.append((row, ''.join(lines[consumed:reader.line_num])))
+        consumed = reader.line_num
+    return header_text, fieldnames, records
+
+
+def render_csv(fieldnames, records, header_text=None, min_fields=None):
+    """Serialize records the way the data files are stored (LF line endings)
+
+    Each record is either a row dict or the raw text of an untouched row. Trailing
+    empty values past min_fields are dropped, matching the ragged rows of the
+    hand-enriched master files.
+    """
+    if min_fields is None:
+        min_fields = len(fieldnames)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    if header_text is None:
+        writer.writerow(fieldnames)
+    else:
+        buffer.write(header_text)
+    for record in records:
+        if isinstance(record, str):
+            buffer.write(record if record.endswith('\n') else record + '\n')
+            continue
+        writer.writerow(record_values(fieldnames, record, min_fields))
+    return buffer.getvalue().encode('utf-8')
+
+
+def record_values(fieldnames, record, min_fields):
+    """A row dict's values in fieldnames order, trailing empties past min_fields dropped"""
+    values = [record.get(field) or '' for field in fieldnames]
+    while len(values) > min_fields and not values[-1]:
+        values.pop()
+    return values
+
+
+def upsert_csv(output_path, rows, key_field, fieldnames):
+    """Insert or update rows of a CSV keyed on key_field, touching only what changed
+
+    Existing rows are indexed by key; a row whose values differ is replaced in
+    place (columns the new row doesn't carry are kept), new keys are appended,
+    and every other row is written back from its raw text. Later copies of an
+    upserted key left behind by earlier appends are dropped. The file is
+    replaced atomically, and only when its bytes change.
+
+    Returns {'inserted', 'updated', 'unchanged', 'deduplicated', 'total', 'written'}.
+    """
+    header_text = None
+    if os.path.exists(output_path):
+        header_text, existing_headers, records = read_records(output_path)
+        if existing_headers:
+            fieldnames = existing_headers
+    else:
+        records = []
+
+    current = [row for row, _ in records]
+    merged = [raw_text for _, raw_text in records]
+    index = {}
+    duplicates = {}
+    for position, row in enumerate(current):
+        if row[key_field] in index:
+            duplicates.setdefault(row[key_field], []).append(position)
+        else:
+            index[row[key_field]] = position
+
+    stats = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'deduplicated': 0}
+    dropped = set()
+    for row in rows:
+        key = row[key_field]
+        position = index.get(key)
+        if position is None:
+            index[key] = len(merged)
+            current.append(row)
+            merged.append(row)
+            stats['inserted'] += 1
+            continue
+
+        dropped.update(duplicates.pop(key, ()))
+        updated = {field: value for field, value in current[position].items() if value is not None}
+        updated.update((field, row.get(field) or '') for field in fieldnames if field in row)
+        if row_hash(updated, fieldnames) == row_hash(current[position], fieldnames):
+            stats['unchanged'] += 1
+        else:
+            current[position] = updated
+            merged[position] = updated
+            stats['updated'] += 1
+
+    merged = [record for position, record in enumerate(merged) if position not in dropped]
+    stats['deduplicated'] = len(dropped)
+    stats['total'] = len(merged)
+    stats['written'] = write_if_changed(output_path, render_csv(fieldnames, merged, header_text))
+    return stats
+
+
+class BuildManifest:
+    """JSON record of what each build stage last consumed and produced"""
+
+    def __init__(self, path=DEFAULT_MANIFEST_FILE):
+        self.path = path
+        self.stages = self._load()
+        self._recorded = set()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def stage_key(stage, output_path):
+        # Keyed by output location so scratch data dirs don't collide with data/
+        return f"{stage}:{os.path.abspath(output_path)}"
+
+    def get(self, stage, output_path):
+        return self.stages.get(self.stage_key(stage, output_path))
+
+    def record(self, stage, output_path, entry):
+        key = self.stage_key(stage, output_path)
+        self.stages[key] = entry
+        self._recorded.add(key)
+
+    def save(self):
+        """Write this instance's records over the current file, keeping entries
+        other processes saved in the meantime"""
+        with file_lock(self.path):
+            stages = self._load()
+            stages.update({key: self.stages[key] for key in self._recorded})
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(stages, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        self.stages = stages
+
+
+def incremental_merge(stage, sources, key_field, master_headers, output_path,
+                      manifest=None, force=False):
+    """Regenerate a master CSV from its sources, touching only what changed
+
+    sources is a list of (path, normalize) pairs, where normalize maps a source
+    row to a dict of master_headers values. Rows of unchanged source files are
+    taken from the existing output; changed rows are merged over their existing
+    output row, so columns the sources don't manage (e.g. photo_url) survive.
+    The output is only rewritten when its bytes would change.
+
+    Returns (rows_by_source, changed) where rows_by_source maps each source path
+    to its row count.
+    """
+    if manifest is None:
+        manifest = BuildManifest()
+    previous = manifest.get(stage, output_path) or {}
+    previous_sources = previous.get('sources', {})
+
+    source_hashes = {path: file_hash(path) for path, _ in sources if os.path.exists(path)}
+    output_hash = file_hash(output_path) if os.path.exists(output_path) else None
+
+    # Nothing changed on either side: no reads, no writes
+    if not force and output_hash and output_hash == previous.get('output_hash') and \
+            source_hashes == {path: entry['hash'] for path, entry in previous_sources.items()}:
+        counts = {path: len(entry['rows']) for path, entry in previous_sources.items()}
+        return counts, False
+
+    header_text = None
+    existing_headers = []
+    existing_rows = {}
+    existing_raw = {}
+    if output_hash:
+        header_text, existing_headers, records = read_records(output_path)
+        for row, raw_text in records:
+            existing_rows[row[key_field]] = row
+            existing_raw[row[key_field]] = raw_text
+
+    # A hand-edited output can't be trusted to hold the sources' values
+    output_trusted = output_hash is not None and output_hash == previous.get('output_hash')
+
+    fieldnames = list(master_headers) + [h for h in existing_headers if h not in master_headers]
+    if fieldnames != existing_headers:
+        header_text = None
+    merged = []
+    counts = {}
+    source_entries = {}
+    for path, normalize in sources:
+        if path not in source_hashes:
+            print(f"Warning: {os.path.basename(path)} not found")
+            continue
+
+        old_entry = previous_sources.get(path)
+        if not force and output_trusted and old_entry and old_entry['hash'] == source_hashes[path] \
+                and all(row_id in existing_rows for row_id, _ in old_entry['rows']):
+            # Unchanged source: reuse its rows from the existing output as-is
+            merged.extend(existing_raw[row_id] for row_id, _ in old_entry['rows'])
+            source_entries[path] = old_entry
+            counts[path] = len(old_entry['rows'])
+            continue
+
+        old_row_hashes = dict(map(tuple, old_entry['rows'])) if old_entry and output_trusted else {}
+        row_entries = []
+        for source_row in load_table(path).rows():
+            row = normalize(source_row)
+            row_id = row[key_field]
+            digest = row_hash(row, master_headers)
+            row_entries.append((row_id, digest))
+
+            existing = existing_rows.get(row_id)
+            if existing is not None and old_row_hashes.get(row_id) == digest:
+                merged.append(existing_raw[row_id])
+            elif existing is not None:
+                # Changed row: take managed columns from the source, keep the rest
+                updated = {field: value for field, value in existing.items() if value is not None}
+                for field in master_headers:
+                    value = row.get(field) or ''
+                    if field == 'last_verified' and not value:
+                        value = existing.get(field) or ''
+                    updated[field] = value
+                if all((existing.get(field) or '') == updated.get(field, '') for field in fieldnames):
+                    # Same values as the output already holds: keep its raw text
+                    merged.append(existing_raw[row_id])
+                else:
+                    merged.append(updated)
+            else:
+                merged.append(row)
+
+        source_entries[path] = {'hash': source_hashes[path], 'rows': row_entries}
+        counts[path] = len(row_entries)
+
+    data = render_csv(fieldnames, merged, header_text, min_fields=len(master_headers))
+    changed = write_if_changed(output_path, data)
+
+    manifest.record(stage, output_path, {
+        'sources': source_entries,
+        'output_hash': hashlib.sha256(data).hexdigest()
+    })
+    manifest.save()
+
+    return counts, changed
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Precompute network view coordinates with stress majorization (NumPy)
+One layout for the full graph plus one per jurisdiction x entity-type filter
+combination, so script.js can render without a live force simulation
+"""
+
+import hashlib
+import json
+import os
+from collections import deque
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from build_data_bundle import (ENTITY_TYPES, JURISDICTIONS, get_entity_type,
+                               get_jurisdiction, read_rows, update_manifest,
+                               write_hashed_artifact)
+from gov_graph import CATEGORIES, GovGraph
+
+LAYOUT_FORMAT_VERSION = 1
+LAYOUT_PREFIX = 'sd_gov_layout'
+
+# Filter values as used by the buttons in index.html
+JURISDICTION_FILTERS = ['all'] + JURISDICTIONS
+ENTITY_TYPE_FILTERS = ['all-types'] + ENTITY_TYPES
+
+MAX_ITERATIONS = 500
+TOLERANCE = 1e-5
+PRECISION = 4
+
+# Structure hash of the last layout built, so edits that leave the graph alone skip the solve
+DEFAULT_CACHE_FILE = os.path.join(os.path.dirname(__file__), '..', '.cache', 'network_layout.json')
+
+
+def undirected_neighbors(graph):
+    """Neighbor lists over every relationship category, ignoring direction"""
+    neighbors = [set() for _ in graph.ids]
+    for category in CATEGORIES:
+        down = graph.down[category]
+        for node in range(len(graph.ids)):
+            for target in down.neighbors(node):
+                if target != node:
+                    neighbors[node].add(target)
+                    neighbors[target].add(node)
+    return [sorted(n) for n in neighbors]
+
+
+def graph_distances(nodes, neighbors):
+    """All-pairs hop distances within the subgraph induced by nodes
+
+    Pairs in different components are placed one hop beyond the longest
+    finite distance, which keeps components close but separate.
+    """
+    position = {node: i for i, node in enumerate(nodes)}
+    distances = np.full((len(nodes), len(nodes)), np.inf)
+    for i, start in enumerate(nodes):
+        distances[i, i] = 0
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            hops = distances[i, position[node]] + 1
+            for neighbor in neighbors[node]:
+                j = position.get(neighbor)
+                if j is not None and np.isinf(distances[i, j]):
+                    distances[i, j] = hops
+                    queue.append(neighbor)
+
+    finite = distances[np.isfinite(distances)]
+    distances[np.isinf(distances)] = (finite.max() if finite.size else 0) + 1
+    return distances
+
+
+def classical_mds(distances):
+    """Deterministic 2-D starting positions from the top eigenvectors"""
+    n = len(distances)
+    if n < 3:
+        return np.column_stack([np.arange(n, dtype=float), np.zeros(n)])
+    centering = np.eye(n) - 1.0 / n
+    gram = -0.5 * centering @ (distances ** 2) @ centering
+    values, vectors = np.linalg.eigh(gram)
+    top = vectors[:, [-1, -2]] * np.sqrt(np.maximum(values[[-1, -2]], 1e-9))
+    # eigh's sign is arbitrary; pin it so layouts don't flip between builds
+    signs = np.sign(top[np.abs(top).argmax(axis=0), [0, 1]])
+    return top * np.where(signs == 0, 1, signs)
+
+
+def stress_majorization(distances, initial):
+    """Minimize weighted stress sum w_ij (|x_i - x_j| - d_ij)^2 with w_ij = d_ij^-2
+
+    Localized majorization update, vectorized over all pairs per iteration.
+    """
+    n = len(distances)
+    if n < 2:
+        return initial.astype(float).copy()
+    # Structurally equivalent nodes (siblings, isolates) start on the same spot;
+    # a small seeded jitter lets the update pull them apart, reproducibly
+    spread = max(float(np.ptp(initial)), 1.0)
+    positions = initial + np.random.default_rng(0).normal(scale=1e-3 * spread, size=initial.shape)
+
+    weights = np.zeros_like(distances)
+    off_diagonal = ~np.eye(n, dtype=bool)
+    weights[off_diagonal] = distances[off_diagonal] ** -2.0
+    weight_sums = weights.sum(axis=1)[:, None]
+
+    def stress(pos):
+        lengths = np.linalg.norm(pos[:, None, :] - pos[None, :, :], axis=2)
+        return float((weights * (lengths - distances) ** 2).sum() / 2)
+
+    previous = stress(positions)
+    for _ in range(MAX_ITERATIONS):
+        delta = positions[:, None, :] - positions[None, :, :]
+        lengths = np.linalg.norm(delta, axis=2)
+        lengths[lengths < 1e-9] = 1e-9
+        pulls = positions[None, :, :] + (distances / lengths)[:, :, None] * delta
+        positions = (weights[:, :, None] * pulls).sum(axis=1) / weight_sums
+
+        current = stress(positions)
+        if previous - current < TOLERANCE * previous:
+            break
+        previous = current
+    return positions
+
+
+def normalize(positions):
+    """Center on the origin and scale uniformly into [-1, 1]"""
+    if len(positions) == 0:
+        return positions
+    centered = positions - positions.mean(axis=0)
+    extent = np.abs(centered).max()
+    return centered / extent if extent > 0 else centered
+
+
+def compile_layouts(entities, relationships):
+    """Layout artifact dictionary: node ids plus coordinates per filter combination"""
+    graph = GovGraph((row['id'] for row in entities), relationships)
+    neighbors = undirected_neighbors(graph)
+    jurisdictions = [get_jurisdiction(row.get('jurisdiction') or '') for row in entities]
+    entity_types = [get_entity_type(row.get('type') or '') for row in entities]
+
+    everything = list(range(len(entities)))
+    full_distances = graph_distances(everything, neighbors)
+    full = normalize(stress_majorization(full_distances, classical_mds(full_distances)))
+
+    layouts = {}
+    for jurisdiction in JURISDICTION_FILTERS:
+        for entity_type in ENTITY_TYPE_FILTERS:
+            nodes = [node for node in everything
+                     if jurisdiction in ('all', jurisdictions[node])
+                     and entity_type in ('all-types', entity_types[node])]
+            if not nodes:
+                continue
+            if len(nodes) == len(everything):
+                positions = full
+            else:
+                # Start from the full layout so transitions between filters stay coherent
+                distances = graph_distances(nodes, neighbors)
+                positions = normalize(stress_majorization(distances, full[nodes]))
+            layouts[f"{jurisdiction}|{entity_type}"] = {
+                'nodes': nodes,
+                'xy': [round(float(v), PRECISION) for v in positions.ravel()]
+            }
+
+    return {
+        'format': LAYOUT_PREFIX,
+        'version': LAYOUT_FORMAT_VERSION,
+        'ids': graph.ids,
+        'layouts': layouts
+    }
+
+
+def structure_key(entities, relationships):
+    """Hash of all the layout depends on: node order and buckets, edges, and this module"""
+    digest = hashlib.sha256()
+    with open(__file__, 'rb') as f:
+        digest.update(f.read())
+    for row in entities:
+        digest.update(f"n\t{row['id']}\t{get_jurisdiction(row.get('jurisdiction') or '')}"
+                      f"\t{get_entity_type(row.get('type') or '')}\n".encode('utf-8'))
+    for rel in relationships:
+        digest.update(f"e\t{rel['relationship_category']}\t{rel['source_entity_id']}"
+                      f"\t{rel['target_entity_id']}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def build_network_layout(data_dir=None, cache_file=DEFAULT_CACHE_FILE):
+    """Write data/bundle/sd_gov_layout.<hash>.json and register it in the manifest
+
+    When the graph structure matches the last build (e.g. only names or
+    descriptions were edited) the existing artifact is kept without re-solving.
+    """
+
+    if data_dir is None:
+        data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
+    bundle_dir = os.path.join(data_dir, 'bundle')
+
+    _, entities = read_rows(os.path.join(data_dir, 'sd_gov_entities_complete.csv'))
+    _, relationships = read_rows(os.path.join(data_dir, 'sd_gov_relationships_complete.csv'))
+
+    key = structure_key(entities, relationships)
+    cached = {}
+    if os.path.exists(cache_file):
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    cached_path = os.path.join(bundle_dir, cached.get('artifact') or '')
+    if cached.get('key') == key and cached.get('artifact') and os.path.exists(cached_path):
+        update_manifest(bundle_dir, 'layout', cached_path)
+        print(f"Network layout unchanged (same graph structure): {cached_path}")
+        return cached_path
+
+    artifact = compile_layouts(entities, relationships)
+    payload = json.dumps(artifact, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    layout_path = write_hashed_artifact(bundle_dir, LAYOUT_PREFIX, payload)
+    update_manifest(bundle_dir, 'layout', layout_path)
+
+    os.makedirs(os.path.dirname(os.path.abspath(cache_file)), exist_ok=True)
+    tmp_path = f"{cache_file}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'key': key, 'artifact': os.path.basename(layout_path)}, f)
+    os.replace(tmp_path, cache_file)
+
+    print(f"Generated network layout: {layout_path}")
+    print(f"Filter combinations: {len(artifact['layouts'])}, size: {len(payload) / 1024:.1f} KB")
+
+    return layout_path
+
+
+def build_layout_if_available(data_dir=None):
+    """Rebuild the layout as part of a data build, skipping it when NumPy is missing"""
+    if np is None:
+        print("⚠️  NumPy not installed - skipping network layout (the page falls back to a live simulation)")
+        return None
+    return build_network_layout(data_dir)
+
+
+if __name__ == "__main__":
+    if np is None:
+        raise SystemExit("build_network_layout.py requires NumPy: pip install numpy")
+    build_network_layout()
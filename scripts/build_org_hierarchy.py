@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Precompute the org chart's nested hierarchy per jurisdiction
+Builds child adjacency once, detects oversight cycles and writes a
+ready-to-render tree that orgchart-script.js loads instead of rebuilding
+"""
+
+import json
+import os
+from collections import defaultdict
+
+from build_data_bundle import (JURISDICTIONS, get_jurisdiction, read_rows,
+                               update_manifest, write_hashed_artifact)
+
+HIERARCHY_FORMAT_VERSION = 1
+HIERARCHY_PREFIX = 'sd_gov_hierarchy'
+
+# Relationship types that place one entity under another in the tree
+HIERARCHY_TYPES = ('oversees', 'reports_to')
+
+
+def build_children(relationships):
+    """Child id lists per parent id, in relationship file order
+
+    Both oversees and reports_to rows point parent -> child (they come from the
+    parent_id/child_id columns of sd_gov_relationships_hierarchical.csv).
+    """
+    children = defaultdict(list)
+    overseen = set()
+    for rel in relationships:
+        children[rel['source_entity_id']].append(rel['target_entity_id'])
+        overseen.add(rel['target_entity_id'])
+    return children, overseen
+
+
+def find_cycles(entity_ids, children):
+    """Every cycle closed by a back edge in a depth-first walk, as id lists"""
+    WHITE, GRAY, BLACK = 0, 1, 2
+    color = defaultdict(int)
+    cycles = []
+    for start in entity_ids:
+        if color[start] != WHITE:
+            continue
+        color[start] = GRAY
+        path = [start]
+        stack = [iter(children.get(start, ()))]
+        while stack:
+            child = next(stack[-1], None)
+            if child is None:
+                color[path.pop()] = BLACK
+                stack.pop()
+            elif color[child] == GRAY:
+                cycles.append(path[path.index(child):] + [child])
+            elif color[child] == WHITE:
+                color[child] = GRAY
+                path.append(child)
+                stack.append(iter(children.get(child, ())))
+    return cycles
+
+
+def build_tree(root_id, children, known_ids, reached):
+    """Nested {id, children} tree under root_id, skipping edges that would close a cycle
+
+    An entity overseen by several parents appears under each of them, as in the
+    original client-side build; only ids on the current path are refused.
+    """
+    root = {'id': root_id, 'children': []}
+    reached.add(root_id)
+    on_path = {root_id}
+    path = [root_id]
+    stack = [(root, iter(children.get(root_id, ())))]
+    while stack:
+        node, remaining = stack[-1]
+        child_id = next(remaining, None)
+        if child_id is None:
+            on_path.discard(path.pop())
+            stack.pop()
+            continue
+        if child_id not in known_ids or child_id in on_path:
+            continue
+        child = {'id': child_id, 'children': []}
+        node['children'].append(child)
+        reached.add(child_id)
+        on_path.add(child_id)
+        path.append(child_id)
+        stack.append((child, iter(children.get(child_id, ()))))
+    return root
+
+
+def compile_hierarchy(entities, relationships):
+    """Hierarchy artifact dictionary from parsed master rows"""
+    children, overseen = build_children(
+        rel for rel in relationships if rel['relationship_type'] in HIERARCHY_TYPES
+    )
+    entity_ids = [row['id'] for row in entities]
+    known_ids = set(entity_ids)
+    buckets = {row['id']: get_jurisdiction(row.get('jurisdiction') or '') for row in entities}
+
+    # Roots are entities nobody oversees, grouped by their own jurisdiction
+    trees = {jurisdiction: [] for jurisdiction in JURISDICTIONS}
+    reached = set()
+    for entity_id in entity_ids:
+        if entity_id not in overseen:
+            trees[buckets[entity_id]].append(build_tree(entity_id, children, known_ids, reached))
+
+    # Entities only reachable through a cycle would otherwise vanish from the chart
+    cycles = find_cycles(entity_ids, children)
+    for entity_id in entity_ids:
+        if entity_id not in reached:
+            trees[buckets[entity_id]].append(build_tree(entity_id, children, known_ids, reached))
+
+    return {
+        'format': HIERARCHY_PREFIX,
+        'version': HIERARCHY_FORMAT_VERSION,
+        'jurisdictions': trees,
+        'cycles': cycles
+    }
+
+
+def build_org_hierarchy(data_dir=None):
+    """Write data/bundle/sd_gov_hierarchy.<hash>.json and register it in the manifest"""
+
+    if data_dir is None:
+        data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
+    bundle_dir = os.path.join(data_dir, 'bundle')
+
+    _, entities = read_rows(os.path.join(data_dir, 'sd_gov_entities_complete.csv'))
+    _, relationships = read_rows(os.path.join(data_dir, 'sd_gov_relationships_complete.csv'))
+
+    hierarchy = compile_hierarchy(entities, relationships)
+    payload = json.dumps(hierarchy, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    hierarchy_path = write_hashed_artifact(bundle_dir, HIERARCHY_PREFIX, payload)
+    update_manifest(bundle_dir, 'hierarchy', hierarchy_path)
+
+    print(f"Generated org hierarchy: {hierarchy_path}")
+    for jurisdiction, roots in hierarchy['jurisdictions'].items():
+        print(f"  {jurisdiction}: {len(roots)} top-level entities")
+    if hierarchy['cycles']:
+        print(f"⚠️  {len(hierarchy['cycles'])} hierarchy cycles found (edges closing them were skipped):")
+        for cycle in hierarchy['cycles'][:10]:
+            print(f"  {' -> '.join(cycle)}")
+    else:
+        print("✅ No hierarchy cycles")
+
+    return hierarchy_path
+
+
+if __name__ == "__main__":
+    build_org_hierarchy()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Build a ranked full-text search index over the master entity file
+Inverted index with sorted-vocabulary prefix lookup and trigram fuzzy matching
+"""
+
+import bisect
+import heapq
+import json
+import os
+import re
+from collections import Counter, defaultdict
+
+from build_data_bundle import get_jurisdiction, read_rows, update_manifest, write_hashed_artifact
+
+SEARCH_INDEX_VERSION = 1
+SEARCH_INDEX_PREFIX = 'sd_gov_search'
+
+# Per-field term weights; a term's weight in a document is the sum over fields
+FIELD_WEIGHTS = {
+    'name': 5,
+    'current_members': 3,
+    'type': 2,
+    'topic_tags': 2,
+    'description': 1
+}
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Score multipliers for how a query token matched a term
+EXACT_FACTOR = 1.0
+PREFIX_FACTOR = 0.6
+FUZZY_FACTOR = 0.4
+
+MAX_PREFIX_TERMS = 50
+MAX_FUZZY_TERMS = 5
+FUZZY_THRESHOLD = 0.4
+
+
+def tokenize(text):
+    """Lowercase alphanumeric tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def trigrams(term):
+    """Trigrams of a space-padded term, so short terms still get some"""
+    padded = f" {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """Ranked search over entity name, description, type, topic tags and members"""
+
+    def __init__(self, docs, terms, postings, trigram_index):
+        self.docs = docs                    # [{id, name, type, jurisdiction}]
+        self.terms = terms                  # sorted vocabulary
+        self.postings = postings            # per term: [(doc, weight), ...]
+        self.trigram_index = trigram_index  # trigram -> [term ids]
+
+    @classmethod
+    def build(cls, entities):
+        """Index entity rows (dicts with the master file's columns)"""
+        docs = []
+        term_docs = defaultdict(Counter)
+        for doc_id, row in enumerate(entities):
+            docs.append({
+                'id': row.get('id', ''),
+                'name': row.get('name', ''),
+                'type': row.get('type', ''),
+                'jurisdiction': get_jurisdiction(row.get('jurisdiction') or '')
+            })
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in tokenize(row.get(field) or ''):
+                    term_docs[token][doc_id] += weight
+
+        terms = sorted(term_docs)
+        postings = [sorted(term_docs[term].items()) for term in terms]
+        trigram_index = defaultdict(list)
+        for term_id, term in enumerate(terms):
+            for gram in trigrams(term):
+                trigram_index[gram].append(term_id)
+        # Sorted so the artifact (and its content hash) is stable across runs
+        return cls(docs, terms, postings, {gram: trigram_index[gram] for gram in sorted(trigram_index)})
+
+    def to_artifact(self):
+        """JSON-ready form; postings are flattened [doc, weight, doc, weight, ...]"""
+        return {
+            'format': SEARCH_INDEX_PREFIX,
+            'version': SEARCH_INDEX_VERSION,
+            'field_weights': FIELD_WEIGHTS,
+            'docs': self.docs,
+            'terms': self.terms,
+            'postings': [[value for pair in plist for value in pair] for plist in self.postings],
+            'trigrams': self.trigram_index
+        }
+
+    @classmethod
+    def from_artifact(cls, artifact):
+        postings = [list(zip(flat[0::2], flat[1::2])) for flat in artifact['postings']]
+        return cls(artifact['docs'], artifact['terms'], postings, artifact['trigrams'])
+
+    def prefix_range(self, prefix):
+        """Term id range [lo, hi) of vocabulary entries starting with prefix"""
+        lo = bisect.bisect_left(self.terms, prefix)
+        hi = bisect.bisect_left(self.terms, prefix + '\uffff', lo)
+        return lo, hi
+
+    def fuzzy_terms(self, token):
+        """Vocabulary terms sharing enough trigrams with token, as (term_id, similarity)"""
+        grams = trigrams(token)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.trigram_index.get(gram, ()))
+        scored = []
+        for term_id, count in shared.items():
+            # Dice coefficient over trigram sets
+            similarity = 2 * count / (len(grams) + len(trigrams(self.terms[term_id])))
+            if similarity >= FUZZY_THRESHOLD:
+                scored.append((term_id, similarity))
+        return heapq.nlargest(MAX_FUZZY_TERMS, scored, key=lambda item: item[1])
+
+    def matching_terms(self, token):
+        """(term_id, factor) pairs for one query token: exact, then prefix, else fuzzy"""
+        lo, hi = self.prefix_range(token)
+        matches = []
+        for term_id in range(lo, min(hi, lo + MAX_PREFIX_TERMS)):
+            factor = EXACT_FACTOR if self.terms[term_id] == token else PREFIX_FACTOR
+            matches.append((term_id, factor))
+        if not matches:
+            matches = [(term_id, FUZZY_FACTOR * similarity)
+                       for term_id, similarity in self.fuzzy_terms(token)]
+        return matches
+
+    def search(self, query, k=10):
+        """Top-k documents, ranked by query tokens matched and then by score"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        scores = defaultdict(float)
+        matched = Counter()
+        for token in tokens:
+            token_scores = {}
+            for term_id, factor in self.matching_terms(token):
+                for doc, weight in self.postings[term_id]:
+                    score = weight * factor
+                    if score > token_scores.get(doc, 0):
+                        token_scores[doc] = score
+            for doc, score in token_scores.items():
+                scores[doc] += score
+                matched[doc] += 1
+
+        top = heapq.nlargest(k, scores, key=lambda doc: (matched[doc], scores[doc], -doc))
+        return [dict(self.docs[doc], score=round(scores[doc], 3)) for doc in top]
+
+
+def build_search_index(data_dir=None):
+    """Write data/bundle/sd_gov_search.<hash>.json and register it in the manifest"""
+
+    if data_dir is None:
+        data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
+    bundle_dir = os.path.join(data_dir, 'bundle')
+
+    _, entities = read_rows(os.path.join(data_dir, 'sd_gov_entities_complete.csv'))
+
+    index = SearchIndex.build(entities)
+    payload = json.dumps(index.to_artifact(), separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    index_path = write_hashed_artifact(bundle_dir, SEARCH_INDEX_PREFIX, payload)
+    update_manifest(bundle_dir, 'search_index', index_path)
+
+    print(f"Generated search index: {index_path}")
+    print(f"Documents: {len(index.docs)}, terms: {len(index.terms)}, "
+          f"trigrams: {len(index.trigram_index)}, size: {len(payload) / 1024:.1f} KB")
+
+    return index_path
+
+
+if __name__ == "__main__":
+    build_search_index()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Write pre-compressed .gz (and .br when brotli is installed) siblings
+for the static files served by server.py --production
+"""
+
+import glob
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip alone is still served
+    brotli = None
+
+# Text assets worth compressing, relative to the project root
+ASSET_PATTERNS = [
+    '*.html',
+    '*.js',
+    '*.css',
+    'data/*.csv',
+    'data/bundle/*.json'
+]
+
+# Tiny files gain nothing from compression
+MIN_SIZE = 256
+
+
+def write_if_stale(source_path, variant_path, compress):
+    """Compress source into variant unless the variant is already up to date"""
+    if os.path.exists(variant_path) and os.stat(variant_path).st_mtime >= os.stat(source_path).st_mtime:
+        return False
+    with open(source_path, 'rb') as f:
+        data = f.read()
+    tmp_path = f"{variant_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(compress(data))
+    os.replace(tmp_path, variant_path)
+    return True
+
+
+def compress_assets(root_dir=None):
+    """Compress every servable text asset; returns the number of files written"""
+
+    if root_dir is None:
+        root_dir = os.path.join(os.path.dirname(__file__), '..')
+
+    compressors = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        compressors.append(('.br', lambda data: brotli.compress(data, quality=11)))
+    else:
+        print("brotli not installed - writing .gz variants only")
+
+    written = 0
+    for pattern in ASSET_PATTERNS:
+        for source_path in sorted(glob.glob(os.path.join(root_dir, pattern))):
+            if os.path.getsize(source_path) < MIN_SIZE:
+                continue
+            for suffix, compress in compressors:
+                if write_if_stale(source_path, source_path + suffix, compress):
+                    written += 1
+
+    print(f"Compressed assets written: {written}")
+    return written
+
+
+if __name__ == "__main__":
+    compress_assets()
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Versioned snapshots of the master files and row-level deltas between them
+Each build that changes the data records a new version (the snapshot's content
+hash) and a delta from the previous one, so clients holding an older copy can
+fetch a small patch instead of the full CSVs
+"""
+
+import datetime
+import glob
+import hashlib
+import json
+import os
+import re
+import threading
+
+from build_manifest import file_lock
+from datastore import load_table
+
+SNAPSHOT_FORMAT = 'sd_gov_snapshot'
+DELTA_FORMAT = 'sd_gov_delta'
+
+# table name -> (master file, key column)
+VERSIONED_TABLES = {
+    'entities': ('sd_gov_entities_complete.csv', 'id'),
+    'relationships': ('sd_gov_relationships_complete.csv', 'relationship_id'),
+}
+
+# Versions (and deltas) kept; clients further behind get a full snapshot
+MAX_VERSIONS = 50
+# A combined delta touching more than this share of the current rows is sent as a full snapshot
+MAX_DELTA_FRACTION = 0.5
+
+# What snapshot_version() returns; anything else a client sends is an unknown version
+VERSION_ID = re.compile(r'^[0-9a-f]{12}$')
+
+
+def default_versions_dir(data_dir):
+    return os.path.join(data_dir, 'versions')
+
+
+def read_snapshot(data_dir):
+    """Current master rows as {table: {'key', 'fields', 'rows'}}; rows are value lists"""
+    tables = {}
+    for table_name, (filename, key_field) in VERSIONED_TABLES.items():
+        table = load_table(os.path.join(data_dir, filename))
+        fields = list(table.fieldnames)
+        tables[table_name] = {
+            'key': key_field,
+            'fields': fields,
+            'rows': [[row.get(field) or '' for field in fields] for row in table.rows()]
+        }
+    return tables
+
+
+def snapshot_version(tables):
+    """Content hash of a snapshot's tables, used as its version id"""
+    canonical = json.dumps(tables, separators=(',', ':'), ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:12]
+
+
+def keyed_rows(table):
+    key_index = table['fields'].index(table['key'])
+    return {row[key_index]: row for row in table['rows']}
+
+
+def diff_tables(old, new):
+    """Rows added, changed and removed (by key) between two versions of a table"""
+    old_rows = keyed_rows(old)
+    new_rows = keyed_rows(new)
+    return {
+        'added': [row for key, row in new_rows.items() if key not in old_rows],
+        'changed': [row for key, row in new_rows.items() if key in old_rows and old_rows[key] != row],
+        'removed': [key for key in old_rows if key not in new_rows]
+    }
+
+
+def diff_snapshots(old_version, old_tables, new_version, new_tables):
+    """Delta between two snapshots, or None when a table's columns changed"""
+    if any(old_tables[name]['fields'] != new_tables[name]['fields'] for name in VERSIONED_TABLES):
+        return None
+    return {
+        'format': DELTA_FORMAT,
+        'from': old_version,
+        'to': new_version,
+        'tables': {
+            name: {'key': new_tables[name]['key'], 'fields': new_tables[name]['fields'],
+                   **diff_tables(old_tables[name], new_tables[name])}
+            for name in VERSIONED_TABLES
+        }
+    }
+
+
+def compose_deltas(deltas):
+    """Fold consecutive deltas into one delta from the first 'from' to the last 'to'"""
+    tables = {}
+    for delta in deltas:
+        for name, change in delta['tables'].items():
+            key_index = change['fields'].index(change['key'])
+            state = tables.setdefault(name, {'key': change['key'], 'fields': change['fields'], 'ops': {}})
+            ops = state['ops']
+            for row in change['added']:
+                # Removed earlier in the chain and re-added: the client still has the old row
+                ops[row[key_index]] = ('changed' if ops.get(row[key_index], ('',))[0] == 'removed'
+                                       else 'added', row)
+            for row in change['changed']:
+                previous = ops.get(row[key_index], ('changed',))[0]
+                ops[row[key_index]] = (previous, row)
+            for key in change['removed']:
+                if ops.get(key, ('',))[0] == 'added':
+                    del ops[key]  # Added and removed within the chain: the client never saw it
+                else:
+                    ops[key] = ('removed', None)
+
+    return {
+        'format': DELTA_FORMAT,
+        'from': deltas[0]['from'],
+        'to': deltas[-1]['to'],
+        'tables': {
+            name: {
+                'key': state['key'],
+                'fields': state['fields'],
+                'added': [row for op, row in state['ops'].values() if op == 'added'],
+                'changed': [row for op, row in state['ops'].values() if op == 'changed'],
+                'removed': [key for key, (op, _) in state['ops'].items() if op == 'removed']
+            }
+            for name, state in tables.items()
+        }
+    }
+
+
+def delta_size(delta):
+    return sum(len(change['added']) + len(change['changed']) + len(change['removed'])
+               for change in delta['tables'].values())
+
+
+def write_json(path, payload):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, separators=(',', ':'), ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_history(versions_dir):
+    path = os.path.join(versions_dir, 'history.json')
+    if not os.path.exists(path):
+        return {'current': None, 'versions': []}
+    return read_json(path)
+
+
+def record_version(data_dir=None, versions_dir=None):
+    """Snapshot the master files; if they changed, record a new version and its delta
+
+    Only the current snapshot is kept on disk; older versions live on as the
+    chain of deltas leading to it. Returns the path of history.json.
+    """
+
+    if data_dir is None:
+        data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
+    if versions_dir is None:
+        versions_dir = default_versions_dir(data_dir)
+    os.makedirs(versions_dir, exist_ok=True)
+    history_path = os.path.join(versions_dir, 'history.json')
+
+    tables = read_snapshot(data_dir)
+    version = snapshot_version(tables)
+
+    with file_lock(history_path):
+        history = load_history(versions_dir)
+        if history['current'] == version:
+            print(f"Data version {version} unchanged ({len(history['versions'])} versions kept)")
+            return history_path
+
+        previous = history['current']
+        previous_path = os.path.join(versions_dir, f"snapshot.{previous}.json") if previous else None
+        delta = None
+        if previous_path and os.path.exists(previous_path):
+            delta = diff_snapshots(previous, read_json(previous_path)['tables'], version, tables)
+            if delta is not None:
+                write_json(os.path.join(versions_dir, f"delta.{previous}.{version}.json"), delta)
+
+        write_json(os.path.join(versions_dir, f"snapshot.{version}.json"),
+                   {'format': SNAPSHOT_FORMAT, 'version': version, 'tables': tables})
+        history['versions'].append({
+            'version': version,
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'rows': {name: len(table['rows']) for name, table in tables.items()},
+            # False when there is no usable delta from the previous version (first
+            # version, missing snapshot or changed columns): clients before it start over
+            'delta': delta is not None
+        })
+        history['versions'] = history['versions'][-MAX_VERSIONS:]
+        history['current'] = version
+        write_json(history_path, history)
+
+        # Keep only the current snapshot and the deltas still reachable from history
+        kept = {f"snapshot.{version}.json"}
+        versions = [entry['version'] for entry in history['versions']]
+        kept.update(f"delta.{old}.{new}.json" for old, new in zip(versions, versions[1:]))
+        for path in glob.glob(os.path.join(versions_dir, '*.json')):
+            name = os.path.basename(path)
+            if name != 'history.json' and name not in kept:
+                os.remove(path)
+
+    if delta is None:
+        print(f"Recorded data version {version} (full snapshot only)")
+    else:
+        print(f"Recorded data version {version}: {delta_size(delta)} row changes since {previous}")
+    return history_path
+
+
+class DeltaFeed:
+    """Answers "what changed since version X" from a versions directory
+
+    history.json is re-read when it changes on disk; deltas are read on demand.
+    Until a version is recorded the current version is None.
+    """
+
+    def __init__(self, versions_dir):
+        self.versions_dir = versions_dir
+        self.history_path = os.path.join(versions_dir, 'history.json')
+        self._lock = threading.Lock()
+        self._signature = None
+        self._history = None
+        self._snapshot = None
+
+    def _refresh(self, retries=2):
+        while True:
+            try:
+                stat = os.stat(self.history_path)
+            except FileNotFoundError:
+                return {'current': None, 'versions': []}, None  # Nothing recorded yet
+            signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            with self._lock:
+                if signature == self._signature:
+                    return self._history, self._snapshot
+                history = read_json(self.history_path)
+                snapshot_path = os.path.join(self.versions_dir, f"snapshot.{history['current']}.json")
+                try:
+                    snapshot = read_json(snapshot_path)
+                except FileNotFoundError:
+                    # A newer version may have replaced it after history.json was read;
+                    # retried outside the lock, from a fresh stat
+                    if not retries:
+                        raise
+                else:
+                    self._history, self._snapshot, self._signature = history, snapshot, signature
+                    return history, snapshot
+            retries -= 1
+
+    def current_version(self):
+        return self._refresh()[0]['current']
+
+    def changes_since(self, since):
+        """A delta from since to the current version, or the full snapshot when the
+        client is unknown, too far behind, or the combined delta is too large"""
+        history, snapshot = self._refresh()
+        current = history['current']
+        if since == current:
+            return {'format': DELTA_FORMAT, 'from': current, 'to': current, 'tables': {}}
+
+        versions = [entry['version'] for entry in history['versions']]
+        if not since or since not in versions:
+            return snapshot
+        chain = history['versions'][versions.index(since) + 1:]
+        if not all(entry['delta'] for entry in chain):
+            return snapshot
+
+        deltas = []
+        previous = since
+        for entry in chain:
+            path = os.path.join(self.versions_dir, f"delta.{previous}.{entry['version']}.json")
+            if not os.path.exists(path):
+                return snapshot
+            deltas.append(read_json(path))
+            previous = entry['version']
+
+        delta = compose_deltas(deltas)
+        total_rows = sum(len(table['rows']) for table in snapshot['tables'].values())
+        if delta_size(delta) > MAX_DELTA_FRACTION * total_rows:
+            return snapshot
+        return delta
+
+
+if __name__ == "__main__":
+    record_version()
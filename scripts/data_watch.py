@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Watch mode for server.py: rebuild after edits in data/ and tell open pages
+The data directory is polled for changes to any pipeline input; the pipeline
+then reruns in a warm worker process (its stage signatures limit the run to
+the affected stages) and the outcome is pushed over Server-Sent Events
+"""
+
+import fnmatch
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_POLL_INTERVAL = 0.25  # seconds between scans of the watched files
+SETTLE_INTERVAL = 0.05  # rescan delay while a save is still being written
+KEEPALIVE_INTERVAL = 15.0  # seconds of silence before an event stream gets a comment line
+
+# Live website checks are slow and unrelated to an edit (quality_report waits on them)
+WATCH_SKIP = ('url_checks',)
+# Slow stages built in a second pass, after the rest of the edit has been pushed:
+# a structural edit re-solves the network layout, which takes over a second
+DEFERRED_STAGES = ('layout',)
+
+
+def warm_up(server_pid):
+    """Worker initializer: import every stage's modules once, not on each build"""
+    from pipeline import STAGES
+    for stage in STAGES.values():
+        for module_name in stage.code:
+            __import__(module_name)
+
+    # A server killed outright (SIGTERM, SIGKILL) never shuts the pool down
+    def exit_with_server():
+        while os.getppid() == server_pid:
+            time.sleep(1.0)
+        os._exit(0)
+    threading.Thread(target=exit_with_server, name='server-watch', daemon=True).start()
+
+
+def run_watch_build(data_dir, skip):
+    """Worker entry point: one incremental pipeline run; returns its summary"""
+    from pipeline import DEFAULT_SUMMARY_FILE, run_pipeline, write_summary
+    # Already off the server process and warm: the stages run right here
+    summary = run_pipeline(data_dir, workers=0, skip=set(skip))
+    write_summary(summary, DEFAULT_SUMMARY_FILE)
+    return summary
+
+
+def read_manifest(data_dir):
+    try:
+        with open(os.path.join(data_dir, 'bundle', 'manifest.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class DataWatcher:
+    """Polls the pipeline's input files and runs a build after each change
+
+    on_rebuild(change) is called on the watcher thread after every build with
+    the changed files, the stages that ran or failed, the manifest keys whose
+    artifact changed and the build time. The deferred stages (and whatever
+    depends on them) are left out of that first build; when they then have
+    work to do, a second build runs them and on_rebuild is called again with
+    'deferred' set.
+    """
+
+    def __init__(self, data_dir, on_rebuild, interval=DEFAULT_POLL_INTERVAL, skip=WATCH_SKIP,
+                 deferred=DEFERRED_STAGES):
+        # Imported here: the pipeline pulls in the build scripts' dependencies,
+        # which the server only needs in watch mode
+        from pipeline import STAGES
+        self.data_dir = data_dir
+        self.on_rebuild = on_rebuild
+        self.interval = interval
+        self.skip = tuple(skip)
+        self.deferred = tuple(deferred)
+        self.inputs = sorted({pattern for stage in STAGES.values() for pattern in stage.inputs})
+        self.outputs = sorted({pattern for stage in STAGES.values() for pattern in stage.outputs})
+        self._stop = threading.Event()
+        self._thread = None
+        # Spawned, not forked: the server process is full of threads and locks
+        self.pool = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=warm_up, initargs=(os.getpid(),))
+
+    def scan(self):
+        """{data-relative path: (inode, mtime, size)} of every watched file"""
+        from pipeline import matching_files
+        signature = {}
+        for path in matching_files(self.data_dir, self.inputs):
+            try:
+                stat = os.stat(os.path.join(self.data_dir, path))
+            except OSError:
+                continue
+            signature[path] = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        return signature
+
+    def is_output(self, path):
+        return any(fnmatch.fnmatch(path, pattern) for pattern in self.outputs)
+
+    def start(self):
+        self.pool.submit(int)  # Start the worker (and its imports) before the first edit
+        self._thread = threading.Thread(target=self._run, name='data-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self):
+        baseline = self.scan()
+        while not self._stop.wait(self.interval):
+            current = self.scan()
+            if current == baseline:
+                continue
+            # Let a save made of several writes finish before building
+            while not self._stop.wait(SETTLE_INTERVAL):
+                settled = self.scan()
+                if settled == current:
+                    break
+                current = settled
+
+            changed = sorted(path for path in set(baseline) | set(current)
+                             if baseline.get(path) != current.get(path))
+            print(f"👀 Changed: {', '.join(changed)} - rebuilding")
+            change = self.build_and_notify(changed, self.skip + self.deferred)
+            if change is not None and self.deferred and not change['failed'] and not self._stop.is_set():
+                # The same inputs again; everything but the deferred stages is up to date
+                self.build_and_notify(changed, self.skip, deferred=True)
+
+            # The build's own writes are not edits; other files keep their
+            # pre-build state, so an edit made during the build triggers the next one
+            after = self.scan()
+            baseline = {path: signature for path, signature in after.items() if self.is_output(path)}
+            baseline.update((path, signature) for path, signature in current.items()
+                            if not self.is_output(path))
+
+    def build_and_notify(self, changed, skip, deferred=False):
+        try:
+            change = self.rebuild(changed, skip)
+        except Exception as e:
+            print(f"❌ Watch rebuild failed: {e}")
+            return None
+        if deferred:
+            if not change['stages'] and not change['failed']:
+                return change  # Nothing deferred had to run: no second event
+            change['deferred'] = True
+        failed = f" (failed: {', '.join(change['failed'])})" if change['failed'] else ''
+        print(f"{'❌' if change['failed'] else '✅'} {'Deferred stages rebuilt' if deferred else 'Rebuilt'} "
+              f"in {change['seconds']:.2f}s: {', '.join(change['stages']) or 'nothing to do'}{failed}")
+        try:
+            self.on_rebuild(change)
+        except Exception as e:
+            print(f"❌ Watch notification failed: {e}")
+        return change
+
+    def rebuild(self, changed, skip):
+        manifest = read_manifest(self.data_dir)
+        started = time.perf_counter()
+        summary = self.pool.submit(run_watch_build, self.data_dir, skip).result()
+        seconds = time.perf_counter() - started
+        rebuilt = read_manifest(self.data_dir)
+
+        stages = summary['stages']
+        change = {
+            'files': changed,
+            'stages': [name for name, record in stages.items() if record['status'] == 'ran'],
+            'failed': [name for name, record in stages.items() if record['status'] == 'failed'],
+            'artifacts': sorted(key for key in rebuilt if key != 'version' and rebuilt[key] != manifest.get(key)),
+            'seconds': round(seconds, 3)
+        }
+        return change
+
+
+def format_event(event, data, event_id):
+    """One text/event-stream message; the JSON payload has no newlines"""
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class EventBroadcaster:
+    """Fans server-sent events out to the open /events connections
+
+    Each connection holds a server thread for as long as it is open, so
+    subscribers are capped at the slots the server sets aside for them.
+    """
+
+    def __init__(self, max_subscribers):
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._closed = False
+        self.event_id = 0
+
+    def subscribe(self):
+        """A queue receiving formatted messages (None once closed), or None when full"""
+        with self._lock:
+            if self._closed or len(self._subscribers) >= self.max_subscribers:
+                return None
+            subscription = queue.SimpleQueue()
+            self._subscribers.add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event, data):
+        with self._lock:
+            self.event_id += 1
+            message = format_event(event, data, self.event_id)
+            for subscription in self._subscribers:
+                subscription.put(message)
+
+    def close(self):
+        """End every open stream (their handler threads exit)"""
+        with self._lock:
+            self._closed = True
+            for subscription in self._subscribers:
+                subscription.put(None)
+
+
+class EventStreamMixin:
+    """/events for a request handler providing send_json(); the server carries
+    the EventBroadcaster (None outside watch mode) and counts open streams"""
+
+    def handle_events(self):
+        """Server-sent events: a 'rebuild' event after each watch-mode build"""
+        events = self.server.events
+        if events is None:
+            self.send_json(404, {'error': "Watch mode is disabled; start the server with --watch"})
+            return
+        subscription = events.subscribe()
+        if subscription is None:
+            self.send_json(503, {'error': "Too many open event streams"})
+            return
+        self.server.stream_opened()
+        try:
+            self.send_response(200)
+            self.send_header('Content-type', 'text/event-stream; charset=utf-8')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.close_connection = True
+            self.wfile.write(b'retry: 2000\n\n')
+            while True:
+                try:
+                    message = subscription.get(timeout=KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    message = ': keepalive\n\n'  # Also how a closed tab is noticed
+                if message is None:
+                    break
+                self.wfile.write(message.encode('utf-8'))
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            events.unsubscribe(subscription)
+            self.server.stream_opened(-1)
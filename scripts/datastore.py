@@ -0,0 +1,547 @@
+#!/usr/bin/env python3
+"""
+Columnar, typed access to the CSV data files
+Each file is parsed once into per-column storage (dictionary-encoded category
+columns, packed string columns, integer columns) following a declared schema,
+and the parsed form is cached in a memory-mapped file between runs
+"""
+
+import csv
+import fnmatch
+import hashlib
+import io
+import json
+import mmap
+import os
+import struct
+import time
+from array import array
+
+CACHE_FORMAT_VERSION = 2
+CACHE_MAGIC = b'SDGCOL1\n'
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(__file__), '..', '.cache', 'tables')
+# A file modified this close to when it was parsed can be rewritten again at the
+# same size without its mtime moving (timestamp granularity); such "racy" cache
+# entries are confirmed against a content hash before use
+RACY_WINDOW_NS = 2 * 10 ** 9
+
+# Column kinds
+STRING = 'str'        # free text, packed into one UTF-8 buffer plus offsets
+CATEGORY = 'category'  # few distinct values, stored as integer codes
+INT = 'int'           # whole numbers; empty cells are missing
+
+INT_MISSING = -(2 ** 63)
+
+_ENTITY_COMMON = {
+    'id': STRING,
+    'name': STRING,
+    'type': CATEGORY,
+    'jurisdiction': CATEGORY,
+    'parent_entity': CATEGORY,
+    'website_url': STRING,
+    'description': STRING,
+    'legal_source': CATEGORY,
+    'last_verified': CATEGORY,
+    'creation_date': CATEGORY
+}
+
+_DEPARTMENT = dict(_ENTITY_COMMON, budget=INT, staff_count=INT)
+
+_RELATIONSHIP_COMMON = {
+    'relationship_id': STRING,
+    'relationship_type': CATEGORY,
+    'authority_source': CATEGORY,
+    'description': STRING,
+    'last_verified': CATEGORY
+}
+
+# Declared schema per data file (fnmatch patterns); undeclared columns are STRING
+SCHEMAS = {
+    'sd_gov_entities_complete.csv': dict(
+        _ENTITY_COMMON, photo_url=STRING, current_members=STRING, topic_tags=STRING,
+        seat_count=INT, budget=INT),
+    'sd_gov_elected.csv': dict(
+        _ENTITY_COMMON, position=CATEGORY, district=CATEGORY, term_start=CATEGORY,
+        term_end=CATEGORY, election_type=CATEGORY, email=STRING),
+    'sd_gov_city_departments.csv': _DEPARTMENT,
+    'sd_gov_county_departments.csv': _DEPARTMENT,
+    'sd_gov_regional_authorities.csv': dict(_ENTITY_COMMON, member_agencies=STRING, budget=INT),
+    'sd_gov_boards_commissions.csv': dict(
+        _ENTITY_COMMON, members_count=CATEGORY, appointment_authority=CATEGORY,
+        meeting_schedule=CATEGORY),
+    'sd_regional_boards_committees_*.csv': {
+        'id': STRING, 'official_name': STRING, 'parent_organization': CATEGORY,
+        'description_purpose': STRING, 'member_count': CATEGORY,
+        'appointment_authority': CATEGORY, 'meeting_schedule': CATEGORY,
+        'website_url': STRING, 'notes': STRING},
+    'sd_gov_relationships_complete.csv': dict(
+        _RELATIONSHIP_COMMON, source_entity_id=CATEGORY, target_entity_id=STRING,
+        relationship_category=CATEGORY),
+    'sd_gov_relationships_hierarchical.csv': dict(
+        _RELATIONSHIP_COMMON, parent_id=CATEGORY, child_id=STRING),
+    'sd_gov_appointments.csv': dict(
+        _RELATIONSHIP_COMMON, appointment_id=STRING, appointer_id=CATEGORY,
+        appointee_entity_id=STRING, appointment_type=CATEGORY,
+        confirmation_required=CATEGORY, term_length=CATEGORY)
+}
+
+
+def schema_for(csv_file):
+    """Declared column kinds for a data file, matched on its basename"""
+    name = os.path.basename(csv_file)
+    for pattern, schema in SCHEMAS.items():
+        if fnmatch.fnmatch(name, pattern):
+            return schema
+    return {}
+
+
+class StringColumn:
+    """Text values packed into one UTF-8 buffer; value i is blob[offsets[i]:offsets[i + 1]]"""
+
+    kind = STRING
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    @classmethod
+    def from_values(cls, values):
+        offsets = array('Q', [0])
+        encoded = bytearray()
+        for value in values:
+            encoded += value.encode('utf-8')
+            offsets.append(len(encoded))
+        return cls(offsets, bytes(encoded))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], 'utf-8')
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    text = __getitem__
+
+    def buffers(self):
+        return {'offsets': self.offsets, 'blob': self.blob}
+
+    @classmethod
+    def from_buffers(cls, buffers, meta):
+        return cls(buffers['offsets'], buffers['blob'])
+
+
+class CategoryColumn:
+    """Dictionary-encoded values: codes index the shared categories list"""
+
+    kind = CATEGORY
+
+    def __init__(self, codes, categories):
+        self.codes = codes
+        self.categories = categories
+        self._code_of = {value: code for code, value in enumerate(categories)}
+
+    @classmethod
+    def from_values(cls, values):
+        code_of = {}
+        categories = []
+        codes = []
+        for value in values:
+            code = code_of.get(value)
+            if code is None:
+                code = code_of[value] = len(categories)
+                categories.append(value)
+            codes.append(code)
+        return cls(array('H' if len(categories) <= 0xFFFF else 'I', codes), categories)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        return self.categories[self.codes[i]]
+
+    def __iter__(self):
+        categories = self.categories
+        return (categories[code] for code in self.codes)
+
+    text = __getitem__
+
+    def code(self, value):
+        """Integer code for value, or None if it never occurs"""
+        return self._code_of.get(value)
+
+    def positions(self, value):
+        code = self.code(value)
+        if code is None:
+            return []
+        return [i for i, c in enumerate(self.codes) if c == code]
+
+    def counts(self):
+        """Occurrences per category value"""
+        totals = [0] * len(self.categories)
+        for code in self.codes:
+            totals[code] += 1
+        return dict(zip(self.categories, totals))
+
+    def buffers(self):
+        return {'codes': self.codes}
+
+    def metadata(self):
+        return {'categories': self.categories}
+
+    @classmethod
+    def from_buffers(cls, buffers, meta):
+        return cls(buffers['codes'], meta['categories'])
+
+
+class IntColumn:
+    """64-bit integers; INT_MISSING marks empty cells"""
+
+    kind = INT
+
+    def __init__(self, values):
+        self.values = values
+
+    @classmethod
+    def from_values(cls, values):
+        """Parse decimal text; returns None if any cell would not round-trip exactly"""
+        parsed = array('q')
+        for value in values:
+            if value == '':
+                parsed.append(INT_MISSING)
+                continue
+            try:
+                number = int(value)
+            except ValueError:
+                return None
+            if str(number) != value:
+                return None
+            parsed.append(number)
+        return cls(parsed)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, i):
+        value = self.values[i]
+        return None if value == INT_MISSING else value
+
+    def __iter__(self):
+        return (None if value == INT_MISSING else value for value in self.values)
+
+    def text(self, i):
+        value = self.values[i]
+        return '' if value == INT_MISSING else str(value)
+
+    def buffers(self):
+        return {'values': self.values}
+
+    @classmethod
+    def from_buffers(cls, buffers, meta):
+        return cls(buffers['values'])
+
+
+COLUMN_TYPES = {column.kind: column for column in (StringColumn, CategoryColumn, IntColumn)}
+
+
+class EmptyColumn:
+    """Stand-in for a column the file doesn't have: every value is ''"""
+
+    kind = STRING
+
+    def __init__(self, length):
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.length:
+            raise IndexError(i)
+        return ''
+
+    def __iter__(self):
+        return iter([''] * self.length)
+
+    text = __getitem__
+
+
+class Table:
+    """One parsed data file: named columns of equal length"""
+
+    def __init__(self, name, fieldnames, columns, row_count):
+        self.name = name
+        self.fieldnames = fieldnames
+        self.columns = columns
+        self.row_count = row_count
+        self._mmap = None  # keeps a cache file mapping alive while columns view it
+
+    def __len__(self):
+        return self.row_count
+
+    def column(self, name):
+        """Typed column; missing columns read as all-empty text"""
+        if name in self.columns:
+            return self.columns[name]
+        return EmptyColumn(self.row_count)
+
+    def values(self, name):
+        """Column values as the text csv.DictReader would have produced"""
+        column = self.column(name)
+        return [column.text(i) for i in range(self.row_count)]
+
+    def row(self, i):
+        return {name: self.columns[name].text(i) for name in self.fieldnames}
+
+    def rows(self):
+        """Row dicts in file order, for code that still wants csv.DictReader rows"""
+        return (self.row(i) for i in range(self.row_count))
+
+    def where(self, **criteria):
+        """Positions of rows whose columns equal every given value
+
+        A list of values matches any of them.
+        """
+        positions = None
+        for name, value in criteria.items():
+            column = self.column(name)
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            if isinstance(column, CategoryColumn):
+                matches = sorted(i for value in set(values) for i in column.positions(value))
+            else:
+                wanted = set(values)
+                matches = [i for i in range(self.row_count) if column.text(i) in wanted]
+            if positions is None:
+                positions = matches
+            else:
+                allowed = set(matches)
+                positions = [i for i in positions if i in allowed]
+        return positions if positions is not None else list(range(self.row_count))
+
+    def iter_csv(self, fields=None, positions=None, batch_rows=500):
+        """Selected columns of the rows at positions as CSV text, in batches
+
+        The header comes first; rows are written straight from the columns
+        (LF line endings, like the data files), batch_rows at a time.
+        """
+        fields = list(fields or self.fieldnames)
+        columns = [self.column(name) for name in fields]
+        if positions is None:
+            positions = range(self.row_count)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(fields)
+        for n, i in enumerate(positions, 1):
+            writer.writerow([column.text(i) for column in columns])
+            if n % batch_rows == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+
+def parse_csv(csv_file, schema=None):
+    """Parse a CSV into a Table following schema (defaults to the declared one)"""
+    if schema is None:
+        schema = schema_for(csv_file)
+    with open(csv_file, 'r', newline='', encoding='utf-8') as csvfile:
+        reader = csv.reader(csvfile)
+        fieldnames = next(reader, [])
+        width = len(fieldnames)
+        cells = [[] for _ in fieldnames]
+        row_count = 0
+        for record in reader:
+            if not record:
+                continue
+            row_count += 1
+            # Short (ragged) rows read as empty trailing cells, as with DictReader
+            for i in range(width):
+                cells[i].append(record[i] if i < len(record) else '')
+
+    columns = {}
+    for name, values in zip(fieldnames, cells):
+        kind = schema.get(name, STRING)
+        column = COLUMN_TYPES[kind].from_values(values)
+        if column is None:
+            print(f"Warning: {os.path.basename(csv_file)} column {name} is not {kind}; reading it as text")
+            column = StringColumn.from_values(values)
+        columns[name] = column
+    return Table(os.path.basename(csv_file), fieldnames, columns, row_count)
+
+
+def _source_signature(csv_file):
+    stat = os.stat(csv_file)
+    # Inode included: a file swapped in by rename can share size and mtime with the old one
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'ino': stat.st_ino}
+
+
+def _content_hash(csv_file):
+    digest = hashlib.sha256()
+    with open(csv_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _is_racy(signature, parsed_ns):
+    return signature['mtime_ns'] >= parsed_ns - RACY_WINDOW_NS
+
+
+def _cache_path(cache_dir, csv_file):
+    # Keyed by absolute path too, so data directories with the same file names
+    # (scratch copies, benchmark datasets) don't overwrite each other's cache
+    location = hashlib.sha256(os.path.abspath(csv_file).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(cache_dir, f"{os.path.basename(csv_file)}.{location}.col")
+
+
+def write_cache(table, cache_path, source, content_hash=None, parsed_ns=None):
+    """Serialize a Table: magic, JSON header, then 8-byte aligned column buffers
+
+    content_hash and parsed_ns (when the source was read) let read_cache confirm
+    a racy entry.
+    """
+    buffers = []
+    column_meta = []
+    offset = 0
+    for name in table.fieldnames:
+        column = table.columns[name]
+        meta = {'name': name, 'kind': column.kind, 'buffers': {}}
+        if hasattr(column, 'metadata'):
+            meta.update(column.metadata())
+        for key, buffer in column.buffers().items():
+            data = buffer.tobytes() if isinstance(buffer, array) else bytes(buffer)
+            typecode = buffer.typecode if isinstance(buffer, array) else 'B'
+            meta['buffers'][key] = [offset, len(data), typecode]
+            padding = -len(data) % 8
+            buffers.append(data + b'\0' * padding)
+            offset += len(data) + padding
+        column_meta.append(meta)
+
+    header = json.dumps({
+        'version': CACHE_FORMAT_VERSION,
+        'source': source,
+        'sha256': content_hash,
+        'parsed_ns': parsed_ns if parsed_ns is not None else time.time_ns(),
+        'fieldnames': table.fieldnames,
+        'rows': table.row_count,
+        'columns': column_meta
+    }, ensure_ascii=False).encode('utf-8')
+    header += b' ' * (-(len(CACHE_MAGIC) + 8 + len(header)) % 8)
+
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(CACHE_MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        for data in buffers:
+            f.write(data)
+    os.replace(tmp_path, cache_path)
+
+
+def read_cache(cache_path, source, csv_file=None):
+    """Map a cache file back into a Table, or None if it is missing, stale or corrupt
+
+    Column buffers are zero-copy views into the mapping. An entry written while
+    the source was racy is used only inside the racy window and only if csv_file
+    still has the hashed content. After the window it is parsed again once, so
+    the rewritten entry is no longer racy.
+    """
+    try:
+        with open(cache_path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    view = memoryview(mapped)
+    prefix = len(CACHE_MAGIC) + 8
+    try:
+        if bytes(view[:len(CACHE_MAGIC)]) != CACHE_MAGIC:
+            return None
+        header_length, = struct.unpack('<Q', view[len(CACHE_MAGIC):prefix])
+        header = json.loads(bytes(view[prefix:prefix + header_length]))
+        if header['version'] != CACHE_FORMAT_VERSION or header['source'] != source:
+            return None
+        if _is_racy(source, header['parsed_ns']) and (
+                csv_file is None or not _is_racy(source, time.time_ns())
+                or header['sha256'] != _content_hash(csv_file)):
+            return None
+
+        base = prefix + header_length
+        columns = {}
+        for meta in header['columns']:
+            buffers = {}
+            for key, (offset, length, typecode) in meta['buffers'].items():
+                if base + offset + length > len(view):
+                    return None  # Truncated
+                buffers[key] = view[base + offset:base + offset + length].cast(typecode)
+            columns[meta['name']] = COLUMN_TYPES[meta['kind']].from_buffers(buffers, meta)
+    except (ValueError, TypeError, KeyError, struct.error, OSError):
+        # Corrupt or half-written cache (from an older format or a crashed
+        # write): parse the source again and replace it
+        return None
+
+    table = Table(os.path.basename(cache_path)[:-len('.col')], header['fieldnames'],
+                  columns, header['rows'])
+    table._mmap = mapped
+    return table
+
+
+def load_table(csv_file, schema=None, cache_dir=DEFAULT_CACHE_DIR, use_cache=True):
+    """Table for csv_file, from the mmap cache when it matches the file on disk"""
+    if not use_cache:
+        return parse_csv(csv_file, schema)
+
+    source = dict(_source_signature(csv_file), schema=schema or schema_for(csv_file))
+    cache_path = _cache_path(cache_dir, csv_file)
+    table = read_cache(cache_path, source, csv_file)
+    if table is None:
+        parsed_ns = time.time_ns()
+        content_hash = _content_hash(csv_file)
+        table = parse_csv(csv_file, schema)
+        try:
+            write_cache(table, cache_path, source, content_hash, parsed_ns)
+        except OSError as e:
+            print(f"Warning: could not cache {os.path.basename(csv_file)}: {e}")
+    return table
+
+
+class DataStore:
+    """Tables of one data directory, each loaded at most once per process"""
+
+    def __init__(self, data_dir=None, cache_dir=DEFAULT_CACHE_DIR, use_cache=True):
+        if data_dir is None:
+            data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
+        self.data_dir = data_dir
+        self.cache_dir = cache_dir
+        self.use_cache = use_cache
+        self._tables = {}
+
+    def path(self, filename):
+        return os.path.join(self.data_dir, filename)
+
+    def table(self, filename):
+        """Table for a file in the data directory, reloaded if the file changed"""
+        csv_file = self.path(filename)
+        signature = _source_signature(csv_file)
+        cached = self._tables.get(filename)
+        # A racy signature can hide a rewrite; load_table confirms it by content
+        if cached is None or cached[0] != signature or _is_racy(signature, cached[2]):
+            loaded_ns = time.time_ns()
+            table = load_table(csv_file, cache_dir=self.cache_dir, use_cache=self.use_cache)
+            self._tables[filename] = (signature, table, loaded_ns)
+            return table
+        return cached[1]
+
+
+if __name__ == "__main__":
+    store = DataStore()
+    for filename in sorted(os.listdir(store.data_dir)):
+        if filename.endswith('.csv'):
+            table = store.table(filename)
+            kinds = [table.columns[name].kind for name in table.fieldnames]
+            print(f"{filename}: {len(table)} rows, "
+                  f"{kinds.count(CATEGORY)} category / {kinds.count(INT)} int / "
+                  f"{kinds.count(STRING)} text columns")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+External sort/merge helpers for building master files from many source shards
+Records are written to sorted run files of bounded length and merged back
+with heapq.merge, so memory stays flat however large the inputs grow
+"""
+
+import csv
+import heapq
+import json
+import os
+
+# Records held in memory before a sorted run is spilled to disk
+DEFAULT_RUN_ROWS = 20000
+
+
+class _LineRecorder:
+    """Line iterator for csv.reader that remembers the lines of the current record"""
+
+    def __init__(self, f):
+        self.f = f
+        self.lines = []
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = next(self.f)
+        self.lines.append(line)
+        return line
+
+    def take(self):
+        text = ''.join(self.lines)
+        self.lines = []
+        return text
+
+
+def iter_records(csv_file):
+    """Stream a CSV as (header_text, fieldnames) followed by (row, raw_text) pairs
+
+    Like build_manifest.read_records, but one record at a time: raw_text is the
+    record exactly as stored, so unchanged rows can be copied through.
+    """
+    with open(csv_file, 'r', newline='', encoding='utf-8') as f:
+        recorder = _LineRecorder(f)
+        reader = csv.reader(recorder)
+        fieldnames = next(reader, [])
+        yield recorder.take(), fieldnames
+        for values in reader:
+            if not values:
+                recorder.take()  # Blank line: skipped, as csv.DictReader does
+                continue
+            row = dict(zip(fieldnames, values))
+            for field in fieldnames[len(values):]:
+                row[field] = None  # Ragged row: missing trailing cells, as csv.DictReader reports them
+            yield row, recorder.take()
+
+
+class RunWriter:
+    """Collects records and spills each full batch, sorted, to a JSON-lines run file"""
+
+    def __init__(self, run_dir, prefix, run_rows=DEFAULT_RUN_ROWS):
+        self.run_dir = run_dir
+        self.prefix = prefix
+        self.run_rows = run_rows
+        self.buffer = []
+        self.paths = []
+
+    def add(self, record):
+        self.buffer.append(record)
+        if len(self.buffer) >= self.run_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        self.buffer.sort()
+        path = os.path.join(self.run_dir, f"{self.prefix}.{len(self.paths):05d}.jsonl")
+        with open(path, 'w', encoding='utf-8') as f:
+            for record in self.buffer:
+                f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+                f.write('\n')
+        self.paths.append(path)
+        self.buffer = []
+
+    def close(self):
+        """Spill what is left; returns the run file paths"""
+        self.flush()
+        return self.paths
+
+
+def read_run(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def merge_runs(paths):
+    """All records of the sorted run files, in order (holds one record per run)"""
+    return heapq.merge(*(read_run(path) for path in paths))
@@ -4,90 +4,284 @@ Generate master entity list combining all San Diego government entities
 Similar to SF CivLab methodology for comprehensive government mapping
 """
 
+import argparse
 import csv
+import glob
+import hashlib
+import io
+import itertools
+import json
 import os
-from datetime import datetime
+import tempfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 
-def combine_entity_files():
-    """Combine all entity CSV files into master list"""
-    
-    data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
+from build_manifest import BuildManifest, file_hash, record_values
+from external_merge import DEFAULT_RUN_ROWS, RunWriter, iter_records, merge_runs
+
+# Master entity structure
+MASTER_HEADERS = [
+    'id', 'name', 'type', 'jurisdiction', 'parent_entity', 
+    'website_url', 'description', 'legal_source', 'last_verified'
+]
+
+OUTPUT_FILE = 'sd_gov_entities_complete.csv'
+
+# Source file patterns, in output order, and the breakdown label each counts toward.
+# A data/entity_sources.json list of {"pattern", "label"} objects replaces these.
+ENTITY_SOURCES = [
+    ('*_elected.csv', 'Elected officials'),
+    ('*_city_departments.csv', 'City departments'),
+    ('*_county_departments.csv', 'County departments'),
+    ('*_regional_authorities.csv', 'Regional authorities'),
+    ('*_boards_commissions.csv', 'Boards and commissions'),
+    ('*_special_districts.csv', 'Special districts')
+]
+ENTITY_SOURCES_FILE = 'entity_sources.json'
+
+# Duplicate ids listed in the report; the rest are only counted
+MAX_REPORTED_DUPLICATES = 20
+
+# Below this much source data, shards are normalized in-process (a pool costs more)
+PARALLEL_MIN_BYTES = 4 * 1024 * 1024
+
+def normalize_entity(row):
+    """Standardize fields across different entity types"""
+    return {
+        'id': row.get('id', ''),
+        'name': row.get('name', ''),
+        'type': row.get('type', row.get('position', '')),
+        'jurisdiction': row.get('jurisdiction', 'San Diego County'),
+        'parent_entity': row.get('parent_entity', ''),
+        'website_url': row.get('website_url', ''),
+        'description': row.get('description', ''),
+        'legal_source': row.get('legal_source', ''),
+        # Left blank rather than stamped with today's date so output stays reproducible
+        'last_verified': row.get('last_verified', '')
+    }
+
+def discover_sources(data_dir):
+    """[(path, label)] for every source file, in output order"""
+    patterns = ENTITY_SOURCES
+    manifest_path = os.path.join(data_dir, ENTITY_SOURCES_FILE)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            patterns = [(entry['pattern'], entry['label']) for entry in json.load(f)]
+
+    sources = []
+    seen = {os.path.join(data_dir, OUTPUT_FILE)}
+    for pattern, label in patterns:
+        for path in sorted(glob.glob(os.path.join(data_dir, pattern))):
+            if path not in seen:
+                seen.add(path)
+                sources.append((path, label))
+    return sources
+
+def normalize_shard(shard, path, run_dir, run_rows=DEFAULT_RUN_ROWS):
+    """Normalize one source file into id-sorted runs of [id, shard, position, values]
+
+    Runs in a worker process; returns (row count, run file paths).
+    """
+    runs = RunWriter(run_dir, f"shard{shard:05d}", run_rows)
+    records = iter_records(path)
+    next(records)  # header
+    count = 0
+    for position, (source_row, _) in enumerate(records):
+        row = normalize_entity(source_row)
+        runs.add([row['id'], shard, position, [row[field] for field in MASTER_HEADERS]])
+        count += 1
+    return count, runs.close()
+
+def spill_existing(output_path, run_dir, run_rows=DEFAULT_RUN_ROWS):
+    """Current master rows as id-sorted runs of [id, -1, position, [raw_text, row]];
+    returns (header_text, fieldnames, run paths)"""
+    if not os.path.exists(output_path):
+        return None, [], []
+    runs = RunWriter(run_dir, 'existing', run_rows)
+    records = iter_records(output_path)
+    header_text, fieldnames = next(records)
+    for position, (row, raw_text) in enumerate(records):
+        runs.add([row['id'], -1, position, [raw_text, row]])
+    return header_text, fieldnames, runs.close()
+
+def csv_line(values):
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerow(values)
+    return buffer.getvalue()
+
+def merged_text(row, existing, fieldnames):
+    """Output text for a source row, given the master row it replaces (if any)
+
+    Columns the sources don't manage (e.g. photo_url) are kept from the master
+    row, and a row whose values didn't change keeps its exact text.
+    """
+    min_fields = len(MASTER_HEADERS)
+    if existing is None:
+        return csv_line(record_values(fieldnames, row, min_fields))
+    raw_text, existing_row = existing
+    updated = {field: value for field, value in existing_row.items() if value is not None}
+    for field in MASTER_HEADERS:
+        value = row.get(field) or ''
+        if field == 'last_verified' and not value:
+            value = existing_row.get(field) or ''
+        updated[field] = value
+    if all((existing_row.get(field) or '') == updated.get(field, '') for field in fieldnames):
+        return raw_text if raw_text.endswith('\n') else raw_text + '\n'
+    return csv_line(record_values(fieldnames, updated, min_fields))
+
+def merge_sources(sources, output_path, run_dir, workers=None, run_rows=DEFAULT_RUN_ROWS):
+    """Sharded normalize + k-way merge by id
+
+    Returns (rows per source, (duplicate count, first duplicates), changed, output hash).
+
+    1. Each source file is normalized into id-sorted runs, in a process pool when
+       the input is large.
+    2. Those runs and the current master file are merged by id. Ids are unique in
+       the master file: the first source row of an id wins, later ones are dropped
+       and reported as duplicates. Each winner is joined with its current master
+       row, and the winners are spilled to runs sorted by source position.
+    3. Merging those runs writes the master file in source order, so an unchanged
+       input reproduces it byte for byte.
+    Only one record per run is in memory at a time.
+    """
+    if workers is None:
+        total_bytes = sum(os.path.getsize(path) for path, _ in sources)
+        workers = min(len(sources), os.cpu_count() or 1) if total_bytes >= PARALLEL_MIN_BYTES else 1
+
+    shard_paths = []
+    shard_counts = []
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(normalize_shard, shard, path, run_dir, run_rows)
+                       for shard, (path, _) in enumerate(sources)]
+            results = [future.result() for future in futures]
+    else:
+        results = [normalize_shard(shard, path, run_dir, run_rows)
+                   for shard, (path, _) in enumerate(sources)]
+    for count, paths in results:
+        shard_counts.append(count)
+        shard_paths.extend(paths)
+
+    header_text, existing_headers, existing_paths = spill_existing(output_path, run_dir, run_rows)
+    fieldnames = list(MASTER_HEADERS) + [h for h in existing_headers if h not in MASTER_HEADERS]
+    if fieldnames != existing_headers:
+        header_text = None
+
+    counts = Counter()
+    duplicates = []
+    duplicate_count = 0
+    positioned = RunWriter(run_dir, 'merged', run_rows)
+    for entity_id, group in itertools.groupby(merge_runs(existing_paths + shard_paths),
+                                              key=lambda record: record[0]):
+        existing = None
+        winner = None
+        for record in group:
+            if record[1] < 0:
+                existing = existing or record[3]
+            elif winner is None:
+                winner = record
+            else:
+                duplicate_count += 1
+                if len(duplicates) < MAX_REPORTED_DUPLICATES:
+                    duplicates.append((entity_id, sources[winner[1]][0], sources[record[1]][0]))
+        if winner is None:
+            continue  # No longer in any source
+        counts[winner[1]] += 1
+        row = dict(zip(MASTER_HEADERS, winner[3]))
+        positioned.add([winner[1], winner[2], merged_text(row, existing, fieldnames)])
+
+    digest = hashlib.sha256()
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+        for text in itertools.chain([header_text or csv_line(fieldnames)],
+                                    (record[2] for record in merge_runs(positioned.close()))):
+            f.write(text)
+            digest.update(text.encode('utf-8'))
+
+    changed = not os.path.exists(output_path) or file_hash(output_path) != digest.hexdigest()
+    if changed:
+        os.replace(tmp_path, output_path)
+    else:
+        os.remove(tmp_path)
+
+    rows_by_source = {path: counts[shard] for shard, (path, _) in enumerate(sources)}
+    return rows_by_source, (duplicate_count, duplicates), changed, digest.hexdigest()
+
+def regenerate_master_entities(data_dir=None, force=False, workers=None, manifest=None):
+    """Incrementally rebuild sd_gov_entities_complete.csv; returns (total, changed)"""
     
-    # Input files
-    input_files = [
-        'sd_gov_elected.csv',
-        'sd_gov_city_departments.csv', 
-        'sd_gov_county_departments.csv',
-        'sd_gov_regional_authorities.csv',
-        'sd_gov_boards_commissions.csv'
-    ]
+    if data_dir is None:
+        data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
+    if manifest is None:
+        manifest = BuildManifest()
     
     # Output file
-    output_file = os.path.join(data_dir, 'sd_gov_entities_complete.csv')
-    
-    # Master entity structure
-    master_headers = [
-        'id', 'name', 'type', 'jurisdiction', 'parent_entity', 
-        'website_url', 'description', 'legal_source', 'last_verified'
-    ]
-    
-    all_entities = []
-    entity_count = {'elected': 0, 'city_dept': 0, 'county_dept': 0, 'regional': 0, 'boards': 0}
-    
-    for filename in input_files:
-        file_path = os.path.join(data_dir, filename)
-        
-        if not os.path.exists(file_path):
-            print(f"Warning: {filename} not found")
-            continue
-            
-        with open(file_path, 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            
-            for row in reader:
-                # Standardize fields across different entity types
-                entity = {
-                    'id': row.get('id', ''),
-                    'name': row.get('name', ''),
-                    'type': row.get('type', row.get('position', '')),
-                    'jurisdiction': row.get('jurisdiction', 'San Diego County'),
-                    'parent_entity': row.get('parent_entity', ''),
-                    'website_url': row.get('website_url', ''),
-                    'description': row.get('description', ''),
-                    'legal_source': row.get('legal_source', ''),
-                    'last_verified': row.get('last_verified', datetime.now().strftime('%Y-%m-%d'))
-                }
-                
-                all_entities.append(entity)
-                
-                # Count by type
-                if 'elected' in filename:
-                    entity_count['elected'] += 1
-                elif 'city_departments' in filename:
-                    entity_count['city_dept'] += 1
-                elif 'county_departments' in filename:
-                    entity_count['county_dept'] += 1
-                elif 'regional' in filename:
-                    entity_count['regional'] += 1
-                elif 'boards' in filename:
-                    entity_count['boards'] += 1
+    output_file = os.path.join(data_dir, OUTPUT_FILE)
     
-    # Write master file
-    with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=master_headers)
-        writer.writeheader()
-        writer.writerows(all_entities)
+    sources = discover_sources(data_dir)
+    source_hashes = {path: file_hash(path) for path, _ in sources}
+    previous = manifest.get('entities', output_file) or {}
+    previous_sources = previous.get('sources', {})
+
+    # Nothing changed on either side: no reads, no writes. The duplicates found
+    # by the last merge are still in the sources, so they are reported again
+    if not force and os.path.exists(output_file) and file_hash(output_file) == previous.get('output_hash') \
+            and source_hashes == {path: entry['hash'] for path, entry in previous_sources.items()} \
+            and all('count' in entry for entry in previous_sources.values()) and 'duplicates' in previous:
+        counts = {path: entry['count'] for path, entry in previous_sources.items()}
+        duplicates = (previous['duplicates']['count'],
+                      [tuple(duplicate) for duplicate in previous['duplicates']['first']])
+        changed = False
+    else:
+        with tempfile.TemporaryDirectory(prefix='sd_gov_merge_') as run_dir:
+            counts, duplicates, changed, output_hash = merge_sources(sources, output_file, run_dir,
+                                                                     workers=workers)
+        manifest.record('entities', output_file, {
+            'sources': {path: {'hash': source_hashes[path], 'count': counts[path]} for path, _ in sources},
+            'duplicates': {'count': duplicates[0], 'first': [list(duplicate) for duplicate in duplicates[1]]},
+            'output_hash': output_hash
+        })
+        manifest.save()
+    total = sum(counts.values())
     
-    print(f"Generated master entity list: {output_file}")
-    print(f"Total entities: {len(all_entities)}")
+    if changed:
+        print(f"Generated master entity list: {output_file}")
+    else:
+        print(f"Master entity list unchanged: {output_file}")
+    print(f"Total entities: {total}")
     print(f"Breakdown:")
-    print(f"  Elected officials: {entity_count['elected']}")
-    print(f"  City departments: {entity_count['city_dept']}")
-    print(f"  County departments: {entity_count['county_dept']}")
-    print(f"  Regional authorities: {entity_count['regional']}")
-    print(f"  Boards and commissions: {entity_count['boards']}")
+    breakdown = Counter()
+    for path, label in sources:
+        breakdown[label] += counts.get(path, 0)
+    for label, count in breakdown.items():
+        print(f"  {label}: {count}")
+    duplicate_count, first_duplicates = duplicates
+    for entity_id, kept, dropped in first_duplicates:
+        print(f"⚠️  Duplicate id {entity_id!r} in {os.path.basename(dropped)} "
+              f"(dropped; kept the row from {os.path.basename(kept)})")
+    if duplicate_count > len(first_duplicates):
+        print(f"⚠️  ... and {duplicate_count - len(first_duplicates)} more duplicate ids")
     
-    return len(all_entities)
+    return total, changed
+
+def combine_entity_files(data_dir=None, force=False):
+    """Combine all entity CSV files into master list"""
+    total, _ = regenerate_master_entities(data_dir, force=force)
+    return total
 
 if __name__ == "__main__":
-    combine_entity_files()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generate the master entity list")
+    parser.add_argument('--force', action='store_true', help="ignore the build manifest and re-merge every source")
+    parser.add_argument('--workers', type=int,
+                        help="processes normalizing source files (default: one per file for large inputs)")
+    args = parser.parse_args()
+    
+    total, changed = regenerate_master_entities(force=args.force, workers=args.workers)
+    if changed:
+        # Everything built from the master file (bundle artifacts, sqlite, versions,
+        # snapshots) is rebuilt by the pipeline, which skips the stages still up to date
+        from pipeline import DEFAULT_SUMMARY_FILE, run_pipeline, write_summary
+        summary = run_pipeline(skip={'url_checks'})
+        write_summary(summary, DEFAULT_SUMMARY_FILE)
+        print(f"Rebuilt downstream artifacts in {summary['seconds']:.2f}s: "
+              + ', '.join(f"{count} {status}" for status, count in sorted(summary['counts'].items())))
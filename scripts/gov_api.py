@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+In-memory query indexes over the master entity and relationship files,
+backing the read-only JSON API in server.py
+"""
+
+import os
+from collections import defaultdict, deque
+
+from build_data_bundle import get_entity_type, get_jurisdiction, read_rows
+from build_search_index import SearchIndex
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+MAX_SUBGRAPH_DEPTH = 6
+MAX_SEARCH_RESULTS = 50
+
+
+class QueryError(ValueError):
+    """Bad query parameters; server.py reports these as HTTP 400"""
+
+
+class NotFoundError(KeyError):
+    """Unknown entity; server.py reports these as HTTP 404"""
+
+
+class UnavailableError(QueryError):
+    """The data behind a query is missing; server.py reports these as HTTP 503"""
+
+
+def paginate(items, offset=0, limit=DEFAULT_PAGE_SIZE):
+    """Slice a result list into one page with totals and the next offset"""
+    if offset < 0 or limit < 1:
+        raise QueryError("offset must be >= 0 and limit >= 1")
+    limit = min(limit, MAX_PAGE_SIZE)
+    page = items[offset:offset + limit]
+    next_offset = offset + limit if offset + limit < len(items) else None
+    return {
+        'total': len(items),
+        'offset': offset,
+        'limit': limit,
+        'next_offset': next_offset,
+        'items': page
+    }
+
+
+class GovIndex:
+    """Entities and relationships with lookup indexes built once at load time"""
+
+    def __init__(self, entities, relationships):
+        self.entities = []
+        self.by_id = {}
+        self.by_jurisdiction = defaultdict(list)
+        self.by_entity_type = defaultdict(list)
+        self.by_parent = defaultdict(list)
+        self.by_topic = defaultdict(list)
+
+        for row in entities:
+            entity = dict(row)
+            entity['jurisdiction_bucket'] = get_jurisdiction(row.get('jurisdiction') or '')
+            entity['entity_type_bucket'] = get_entity_type(row.get('type') or '')
+            position = len(self.entities)
+            self.entities.append(entity)
+            self.by_id[entity['id']] = position
+            self.by_jurisdiction[entity['jurisdiction_bucket']].append(position)
+            self.by_entity_type[entity['entity_type_bucket']].append(position)
+            self.by_parent[entity.get('parent_entity') or ''].append(position)
+            for topic in (entity.get('topic_tags') or '').split(';'):
+                if topic.strip():
+                    self.by_topic[topic.strip().lower()].append(position)
+
+        self.relationships = [dict(row) for row in relationships]
+        self.by_category = defaultdict(list)
+        self.by_relationship_type = defaultdict(list)
+        self.outgoing = defaultdict(list)
+        self.incoming = defaultdict(list)
+        for position, rel in enumerate(self.relationships):
+            self.by_category[rel['relationship_category']].append(position)
+            self.by_relationship_type[rel['relationship_type']].append(position)
+            self.outgoing[rel['source_entity_id']].append(position)
+            self.incoming[rel['target_entity_id']].append(position)
+
+        self.search_index = SearchIndex.build(self.entities)
+
+    @classmethod
+    def from_csv(cls, data_dir=None):
+        """Build the index from sd_gov_entities_complete.csv and sd_gov_relationships_complete.csv"""
+        if data_dir is None:
+            data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
+        _, entities = read_rows(os.path.join(data_dir, 'sd_gov_entities_complete.csv'))
+        _, relationships = read_rows(os.path.join(data_dir, 'sd_gov_relationships_complete.csv'))
+        return cls(entities, relationships)
+
+    def entity(self, entity_id):
+        if entity_id not in self.by_id:
+            raise NotFoundError(entity_id)
+        return self.entities[self.by_id[entity_id]]
+
+    @staticmethod
+    def _intersect(*position_lists):
+        """Intersect sorted position lists, keeping file order; None means unrestricted"""
+        selected = [positions for positions in position_lists if positions is not None]
+        if not selected:
+            return None
+        selected.sort(key=len)
+        result = selected[0]
+        for positions in selected[1:]:
+            allowed = set(positions)
+            result = [p for p in result if p in allowed]
+        return result
+
+    def query_entities(self, jurisdiction=None, entity_type=None, parent=None, topic=None,
+                       offset=0, limit=DEFAULT_PAGE_SIZE):
+        """Entities filtered by jurisdiction bucket, entity-type bucket, parent_entity and/or topic tag"""
+        positions = self._intersect(
+            self.by_jurisdiction.get(jurisdiction, []) if jurisdiction else None,
+            self.by_entity_type.get(entity_type, []) if entity_type else None,
+            self.by_parent.get(parent, []) if parent else None,
+            self.by_topic.get(topic.lower(), []) if topic else None
+        )
+        if positions is None:
+            items = self.entities
+        else:
+            items = [self.entities[p] for p in positions]
+        return paginate(items, offset, limit)
+
+    def query_relationships(self, category=None, relationship_type=None, entity_id=None,
+                            offset=0, limit=DEFAULT_PAGE_SIZE):
+        """Relationships filtered by category, type and/or an endpoint entity"""
+        touching = None
+        if entity_id:
+            touching = sorted(set(self.outgoing.get(entity_id, [])) | set(self.incoming.get(entity_id, [])))
+        positions = self._intersect(
+            self.by_category.get(category, []) if category else None,
+            self.by_relationship_type.get(relationship_type, []) if relationship_type else None,
+            touching
+        )
+        if positions is None:
+            items = self.relationships
+        else:
+            items = [self.relationships[p] for p in positions]
+        return paginate(items, offset, limit)
+
+    def search(self, query, k=10):
+        """Ranked full-text search; see build_search_index.SearchIndex"""
+        if not query.strip():
+            raise QueryError("q is required")
+        if k < 1:
+            raise QueryError("limit must be >= 1")
+        results = self.search_index.search(query, min(k, MAX_SEARCH_RESULTS))
+        return {'query': query, 'items': results}
+
+    def subgraph(self, root, depth=1, category=None, direction='out'):
+        """Breadth-first neighbourhood of root, following edges out, in or both ways"""
+        if root not in self.by_id:
+            raise NotFoundError(root)
+        if depth < 0 or depth > MAX_SUBGRAPH_DEPTH:
+            raise QueryError(f"depth must be between 0 and {MAX_SUBGRAPH_DEPTH}")
+        if direction not in ('out', 'in', 'both'):
+            raise QueryError("direction must be out, in or both")
+
+        distances = {root: 0}
+        edge_positions = set()
+        queue = deque([root])
+        while queue:
+            node = queue.popleft()
+            if distances[node] == depth:
+                continue
+            candidates = []
+            if direction in ('out', 'both'):
+                candidates.extend((p, 'target_entity_id') for p in self.outgoing.get(node, []))
+            if direction in ('in', 'both'):
+                candidates.extend((p, 'source_entity_id') for p in self.incoming.get(node, []))
+            for position, other_end in candidates:
+                rel = self.relationships[position]
+                if category and rel['relationship_category'] != category:
+                    continue
+                edge_positions.add(position)
+                neighbor = rel[other_end]
+                if neighbor not in distances:
+                    distances[neighbor] = distances[node] + 1
+                    queue.append(neighbor)
+
+        nodes = []
+        for entity_id, distance in distances.items():
+            if entity_id in self.by_id:
+                nodes.append(dict(self.entities[self.by_id[entity_id]], depth=distance))
+        return {
+            'root': root,
+            'depth': depth,
+            'direction': direction,
+            'nodes': nodes,
+            'edges': [self.relationships[p] for p in sorted(edge_positions)]
+        }
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Compile the entity, relationship and appointment CSVs into one indexed
+SQLite file (with FTS5 search), and query it read-only
+The CSVs stay the source of truth; the database is a rebuildable artifact
+that server.py --backend sqlite and the scripts can use instead of rescanning
+"""
+
+import os
+import sqlite3
+import threading
+from collections import deque
+
+from build_data_bundle import get_entity_type, get_jurisdiction, read_rows
+from build_manifest import file_hash
+from build_search_index import tokenize
+from gov_api import (DEFAULT_PAGE_SIZE, MAX_SEARCH_RESULTS, MAX_SUBGRAPH_DEPTH, NotFoundError,
+                     QueryError, paginate)
+
+DATABASE_FORMAT_VERSION = 1
+DATABASE_FILE = 'sd_gov.sqlite'
+
+# Table name -> source CSV; columns follow the CSV header
+SOURCE_TABLES = {
+    'entities': 'sd_gov_entities_complete.csv',
+    'relationships': 'sd_gov_relationships_complete.csv',
+    'appointments': 'sd_gov_appointments.csv'
+}
+
+INDEXES = {
+    'entities': [('id',), ('parent_entity',), ('jurisdiction',),
+                 ('jurisdiction_bucket', 'entity_type_bucket'), ('entity_type_bucket',)],
+    'relationships': [('source_entity_id',), ('target_entity_id',), ('relationship_category',),
+                      ('relationship_type',)],
+    'appointments': [('appointer_id',), ('appointee_entity_id',)]
+}
+
+# Full-text columns and their bm25 weights, mirroring build_search_index.FIELD_WEIGHTS
+FTS_COLUMNS = [('name', 5), ('current_members', 3), ('type', 2), ('topic_tags', 2), ('description', 1)]
+
+TOPIC_SEPARATOR = ';'
+
+
+def default_database_path(data_dir=None):
+    if data_dir is None:
+        data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
+    return os.path.join(data_dir, DATABASE_FILE)
+
+
+def quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def create_table(db, name, columns, rows):
+    """Create a table whose rowid is the row's position in the CSV, and fill it"""
+    column_sql = ', '.join(f"{quote(column)} TEXT NOT NULL DEFAULT ''" for column in columns)
+    db.execute(f"CREATE TABLE {quote(name)} (position INTEGER PRIMARY KEY, {column_sql})")
+    placeholders = ', '.join('?' for _ in range(len(columns) + 1))
+    db.executemany(
+        f"INSERT INTO {quote(name)} VALUES ({placeholders})",
+        ([position] + [row.get(column) or '' for column in columns] for position, row in enumerate(rows))
+    )
+
+
+def build_database(data_dir=None, db_path=None):
+    """Write data/sd_gov.sqlite from the CSVs; the new file replaces the old one in a single rename"""
+
+    if data_dir is None:
+        data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
+    if db_path is None:
+        db_path = default_database_path(data_dir)
+
+    tmp_path = f"{db_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    db = sqlite3.connect(tmp_path)
+    try:
+        db.execute("PRAGMA journal_mode = OFF")
+        db.execute("PRAGMA synchronous = OFF")
+        counts = {}
+        for table, filename in SOURCE_TABLES.items():
+            columns, rows = read_rows(os.path.join(data_dir, filename))
+            if table == 'entities':
+                # Same buckets as the frontends and the in-memory API
+                columns = list(columns) + ['jurisdiction_bucket', 'entity_type_bucket']
+                rows = [dict(row, jurisdiction_bucket=get_jurisdiction(row.get('jurisdiction') or ''),
+                             entity_type_bucket=get_entity_type(row.get('type') or ''))
+                        for row in rows]
+                db.execute("CREATE TABLE entity_topics (entity_id TEXT NOT NULL, topic TEXT NOT NULL)")
+                db.executemany("INSERT INTO entity_topics VALUES (?, ?)", (
+                    (row['id'], topic.strip().lower())
+                    for row in rows
+                    for topic in (row.get('topic_tags') or '').split(TOPIC_SEPARATOR) if topic.strip()
+                ))
+                db.execute("CREATE INDEX entity_topics_topic ON entity_topics (topic, entity_id)")
+            create_table(db, table, columns, rows)
+            for index_columns in INDEXES[table]:
+                if all(column in columns for column in index_columns):
+                    db.execute(f"CREATE INDEX {quote(table + '_' + '_'.join(index_columns))} "
+                               f"ON {quote(table)} ({', '.join(map(quote, index_columns))})")
+            counts[table] = len(rows)
+
+        fts_columns = [column for column, _ in FTS_COLUMNS]
+        db.execute(f"CREATE VIRTUAL TABLE entities_fts USING fts5("
+                   f"{', '.join(fts_columns)}, content='entities', content_rowid='position', "
+                   f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')")
+        db.execute(f"INSERT INTO entities_fts (rowid, {', '.join(fts_columns)}) "
+                   f"SELECT position, {', '.join(map(quote, fts_columns))} FROM entities")
+        db.execute("INSERT INTO entities_fts (entities_fts) VALUES ('optimize')")
+
+        db.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        db.executemany("INSERT INTO meta VALUES (?, ?)", [('version', str(DATABASE_FORMAT_VERSION))] + [
+            (f"source:{filename}", file_hash(os.path.join(data_dir, filename)))
+            for filename in SOURCE_TABLES.values()
+        ])
+        db.execute("ANALYZE")
+        db.commit()
+    finally:
+        db.close()
+    os.replace(tmp_path, db_path)
+
+    print(f"Generated SQLite database: {db_path}")
+    print(', '.join(f"{table}: {count}" for table, count in counts.items())
+          + f", size: {os.path.getsize(db_path) / 1024:.1f} KB")
+    return db_path
+
+
+def fts_query(text):
+    """FTS5 MATCH expression: every token as a quoted prefix, any of them may match"""
+    tokens = list(dict.fromkeys(tokenize(text)))
+    return ' OR '.join(f'"{token}"*' for token in tokens)
+
+
+class GovDatabase:
+    """Read-only queries over sd_gov.sqlite, with the same results as gov_api.GovIndex
+
+    One connection per thread, opened with mode=ro. Rebuilding swaps the file
+    by rename, so open connections keep reading the old snapshot; reopen (or let
+    server.py's holder reopen) to see the new one.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or default_database_path()
+        if not os.path.exists(self.db_path):
+            raise FileNotFoundError(f"{self.db_path} not found - run scripts/gov_db.py to build it")
+        self._local = threading.local()
+        db = self._db()
+        self.columns = {
+            table: [row[1] for row in db.execute(f"PRAGMA table_info({quote(table)})") if row[1] != 'position']
+            for table in SOURCE_TABLES
+        }
+
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            uri = 'file:' + os.path.abspath(self.db_path).replace('?', '%3f').replace('#', '%23') + '?mode=ro'
+            db = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            db.row_factory = sqlite3.Row
+            self._local.db = db
+        return db
+
+    def _select(self, table, where='', params=(), order='position', limit=None, offset=0):
+        columns = ', '.join(map(quote, self.columns[table]))
+        sql = f"SELECT {columns} FROM {quote(table)}"
+        if where:
+            sql += f" WHERE {where}"
+        sql += f" ORDER BY {order}"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params = tuple(params) + (limit, offset)
+        return [dict(row) for row in self._db().execute(sql, params)]
+
+    def _page(self, table, where, params, offset, limit):
+        """One page in paginate()'s format, counted and sliced in SQL"""
+        if offset < 0 or limit < 1:
+            raise QueryError("offset must be >= 0 and limit >= 1")
+        total = self._db().execute(
+            f"SELECT COUNT(*) FROM {quote(table)}" + (f" WHERE {where}" if where else ''), params
+        ).fetchone()[0]
+        result = paginate(range(total), offset, limit)
+        result['items'] = self._select(table, where, params, limit=result['limit'], offset=offset)
+        return result
+
+    @staticmethod
+    def _where(conditions):
+        clauses = [clause for clause, _ in conditions]
+        params = [param for _, values in conditions for param in values]
+        return ' AND '.join(clauses), params
+
+    def entity(self, entity_id):
+        rows = self._select('entities', 'id = ?', (entity_id,), limit=1)
+        if not rows:
+            raise NotFoundError(entity_id)
+        return rows[0]
+
+    def query_entities(self, jurisdiction=None, entity_type=None, parent=None, topic=None,
+                       offset=0, limit=DEFAULT_PAGE_SIZE):
+        """Entities filtered by bucket, parent_entity and/or topic tag"""
+        conditions = []
+        if jurisdiction:
+            conditions.append(('jurisdiction_bucket = ?', [jurisdiction]))
+        if entity_type:
+            conditions.append(('entity_type_bucket = ?', [entity_type]))
+        if parent:
+            conditions.append(('parent_entity = ?', [parent]))
+        if topic:
+            conditions.append(('id IN (SELECT entity_id FROM entity_topics WHERE topic = ?)', [topic.lower()]))
+        where, params = self._where(conditions)
+        return self._page('entities', where, params, offset, limit)
+
+    def query_relationships(self, category=None, relationship_type=None, entity_id=None,
+                            offset=0, limit=DEFAULT_PAGE_SIZE):
+        """Relationships filtered by category, type and/or an endpoint entity"""
+        conditions = []
+        if category:
+            conditions.append(('relationship_category = ?', [category]))
+        if relationship_type:
+            conditions.append(('relationship_type = ?', [relationship_type]))
+        if entity_id:
+            conditions.append(('(source_entity_id = ? OR target_entity_id = ?)', [entity_id, entity_id]))
+        where, params = self._where(conditions)
+        return self._page('relationships', where, params, offset, limit)
+
+    def appointments(self, appointer_id=None, appointee_id=None):
+        """Rows of sd_gov_appointments.csv by appointer and/or appointee"""
+        conditions = []
+        if appointer_id:
+            conditions.append(('appointer_id = ?', [appointer_id]))
+        if appointee_id:
+            conditions.append(('appointee_entity_id = ?', [appointee_id]))
+        where, params = self._where(conditions)
+        return self._select('appointments', where, params)
+
+    def search(self, query, k=10):
+        """Ranked FTS5 search (bm25, prefix matching; no fuzzy matching)"""
+        if not query.strip():
+            raise QueryError("q is required")
+        if k < 1:
+            raise QueryError("limit must be >= 1")
+        match = fts_query(query)
+        if not match:
+            return {'query': query, 'items': []}
+        weights = ', '.join(str(weight) for _, weight in FTS_COLUMNS)
+        rows = self._db().execute(
+            f"SELECT e.id, e.name, e.type, e.jurisdiction_bucket, bm25(entities_fts, {weights}) AS rank "
+            f"FROM entities_fts JOIN entities e ON e.position = entities_fts.rowid "
+            f"WHERE entities_fts MATCH ? ORDER BY rank, e.position LIMIT ?",
+            (match, min(k, MAX_SEARCH_RESULTS))
+        )
+        return {'query': query, 'items': [{
+            'id': row['id'], 'name': row['name'], 'type': row['type'],
+            'jurisdiction': row['jurisdiction_bucket'], 'score': round(-row['rank'], 3)
+        } for row in rows]}
+
+    def subgraph(self, root, depth=1, category=None, direction='out'):
+        """Breadth-first neighbourhood of root, one indexed lookup per visited node"""
+        self.entity(root)
+        if depth < 0 or depth > MAX_SUBGRAPH_DEPTH:
+            raise QueryError(f"depth must be between 0 and {MAX_SUBGRAPH_DEPTH}")
+        if direction not in ('out', 'in', 'both'):
+            raise QueryError("direction must be out, in or both")
+
+        ends = []
+        if direction in ('out', 'both'):
+            ends.append(('source_entity_id', 'target_entity_id'))
+        if direction in ('in', 'both'):
+            ends.append(('target_entity_id', 'source_entity_id'))
+        relationship_columns = ', '.join(map(quote, self.columns['relationships']))
+
+        distances = {root: 0}
+        edges = {}
+        queue = deque([root])
+        while queue:
+            node = queue.popleft()
+            if distances[node] == depth:
+                continue
+            for near_end, other_end in ends:
+                sql = f"SELECT position, {relationship_columns} FROM relationships WHERE {near_end} = ?"
+                params = [node]
+                if category:
+                    sql += " AND relationship_category = ?"
+                    params.append(category)
+                for row in self._db().execute(sql + " ORDER BY position", params):
+                    rel = dict(row)
+                    edges[rel.pop('position')] = rel
+                    neighbor = rel[other_end]
+                    if neighbor not in distances:
+                        distances[neighbor] = distances[node] + 1
+                        queue.append(neighbor)
+
+        placeholders = ', '.join('?' for _ in distances)
+        entities = {row['id']: row for row in self._select('entities', f"id IN ({placeholders})", list(distances))}
+        return {
+            'root': root,
+            'depth': depth,
+            'direction': direction,
+            'nodes': [dict(entities[entity_id], depth=distance)
+                      for entity_id, distance in distances.items() if entity_id in entities],
+            'edges': [edges[position] for position in sorted(edges)]
+        }
+
+    def close(self):
+        db = getattr(self._local, 'db', None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+
+if __name__ == "__main__":
+    build_database()
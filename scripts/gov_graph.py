@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Graph analytics over the master relationship file
+Integer-indexed CSR adjacency per relationship category, with linear-time
+appointer chains, oversight chains, degree rankings and connected components
+"""
+
+import json
+import os
+from array import array
+from collections import deque
+
+from build_data_bundle import read_rows, update_manifest, write_hashed_artifact
+
+GRAPH_FORMAT_VERSION = 1
+GRAPH_PREFIX = 'sd_gov_graph'
+
+CATEGORIES = ('hierarchical', 'appointment')
+TOP_RANKED = 25
+
+
+class CSRGraph:
+    """Compressed sparse row adjacency: neighbors of node i are
+    targets[offsets[i]:offsets[i + 1]], reached via edges[...] (relationship rows)"""
+
+    def __init__(self, offsets, targets, edges):
+        self.offsets = offsets
+        self.targets = targets
+        self.edges = edges
+
+    @classmethod
+    def from_edges(cls, node_count, edge_list):
+        """Counting-sort (source, target, edge) triples into CSR arrays"""
+        counts = [0] * (node_count + 1)
+        for source, _, _ in edge_list:
+            counts[source + 1] += 1
+        for i in range(node_count):
+            counts[i + 1] += counts[i]
+        offsets = array('i', counts)
+
+        cursor = list(counts[:-1])
+        targets = array('i', bytes(4 * len(edge_list)))
+        edges = array('i', bytes(4 * len(edge_list)))
+        for source, target, edge in edge_list:
+            slot = cursor[source]
+            targets[slot] = target
+            edges[slot] = edge
+            cursor[source] += 1
+        return cls(offsets, targets, edges)
+
+    @property
+    def node_count(self):
+        return len(self.offsets) - 1
+
+    def neighbors(self, node):
+        return self.targets[self.offsets[node]:self.offsets[node + 1]]
+
+    def degree(self, node):
+        return self.offsets[node + 1] - self.offsets[node]
+
+    def transpose(self):
+        edge_list = [(self.targets[slot], node, self.edges[slot])
+                     for node in range(self.node_count)
+                     for slot in range(self.offsets[node], self.offsets[node + 1])]
+        return CSRGraph.from_edges(self.node_count, edge_list)
+
+    def to_artifact(self):
+        return {
+            'offsets': self.offsets.tolist(),
+            'targets': self.targets.tolist(),
+            'edges': self.edges.tolist()
+        }
+
+
+class GovGraph:
+    """Entities as integer nodes; one downward CSR graph per relationship category
+
+    Hierarchical edges (oversees and reports_to) point from parent to child,
+    appointment edges from appointer to appointee, as in the master file.
+    """
+
+    def __init__(self, entity_ids, relationships):
+        self.ids = list(entity_ids)
+        self.index = {entity_id: i for i, entity_id in enumerate(self.ids)}
+        self.relationship_ids = [rel['relationship_id'] for rel in relationships]
+
+        edge_lists = {category: [] for category in CATEGORIES}
+        self.dangling = []
+        for position, rel in enumerate(relationships):
+            category = rel['relationship_category']
+            source = self.index.get(rel['source_entity_id'])
+            target = self.index.get(rel['target_entity_id'])
+            if category not in edge_lists:
+                continue
+            if source is None or target is None:
+                self.dangling.append(rel['relationship_id'])
+                continue
+            edge_lists[category].append((source, target, position))
+
+        node_count = len(self.ids)
+        self.down = {category: CSRGraph.from_edges(node_count, edge_lists[category])
+                     for category in CATEGORIES}
+        self.up = {category: graph.transpose() for category, graph in self.down.items()}
+
+    @classmethod
+    def from_csv(cls, data_dir=None):
+        """Load sd_gov_entities_complete.csv and sd_gov_relationships_complete.csv"""
+        if data_dir is None:
+            data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
+        _, entities = read_rows(os.path.join(data_dir, 'sd_gov_entities_complete.csv'))
+        _, relationships = read_rows(os.path.join(data_dir, 'sd_gov_relationships_complete.csv'))
+        return cls((row['id'] for row in entities), relationships)
+
+    def node(self, entity_id):
+        if entity_id not in self.index:
+            raise KeyError(entity_id)
+        return self.index[entity_id]
+
+    def _bfs(self, start_nodes, graphs):
+        """Distances from start_nodes following any of graphs; O(V + E)"""
+        distance = {node: 0 for node in start_nodes}
+        queue = deque(start_nodes)
+        while queue:
+            node = queue.popleft()
+            for graph in graphs:
+                for neighbor in graph.neighbors(node):
+                    if neighbor not in distance:
+                        distance[neighbor] = distance[node] + 1
+                        queue.append(neighbor)
+        return distance
+
+    def appointer_chain(self, entity_id):
+        """Who (transitively) appoints members of entity_id
+
+        Returns (chain, ultimate): chain is [(appointer_id, depth)] nearest first;
+        ultimate are the appointers nobody appoints in turn.
+        """
+        up = self.up['appointment']
+        start = self.node(entity_id)
+        distance = self._bfs([start], [up])
+        del distance[start]
+        chain = sorted(distance.items(), key=lambda item: (item[1], item[0]))
+        ultimate = [self.ids[node] for node, _ in chain if up.degree(node) == 0]
+        return [(self.ids[node], depth) for node, depth in chain], ultimate
+
+    def oversight_chain(self, entity_id):
+        """Every entity above entity_id in the hierarchy, as [(overseer_id, depth)] nearest first"""
+        start = self.node(entity_id)
+        distance = self._bfs([start], [self.up['hierarchical']])
+        del distance[start]
+        return [(self.ids[node], depth)
+                for node, depth in sorted(distance.items(), key=lambda item: (item[1], item[0]))]
+
+    def degrees(self, category=None):
+        """Per-node (in, out) degree for one category, or summed over all of them"""
+        categories = [category] if category else CATEGORIES
+        in_degree = [0] * len(self.ids)
+        out_degree = [0] * len(self.ids)
+        for name in categories:
+            for node in range(len(self.ids)):
+                out_degree[node] += self.down[name].degree(node)
+                in_degree[node] += self.up[name].degree(node)
+        return in_degree, out_degree
+
+    def degree_ranking(self, category=None, k=TOP_RANKED):
+        """Top-k entities by total degree, with normalized degree centrality"""
+        in_degree, out_degree = self.degrees(category)
+        scale = max(len(self.ids) - 1, 1)
+        ranked = sorted(range(len(self.ids)), key=lambda node: (-(in_degree[node] + out_degree[node]), node))
+        return [{
+            'id': self.ids[node],
+            'in': in_degree[node],
+            'out': out_degree[node],
+            'centrality': round((in_degree[node] + out_degree[node]) / scale, 4)
+        } for node in ranked[:k]]
+
+    def components(self):
+        """Weakly connected component label per node, largest component first"""
+        graphs = [self.down[name] for name in CATEGORIES] + [self.up[name] for name in CATEGORIES]
+        label = [-1] * len(self.ids)
+        groups = []
+        for start in range(len(self.ids)):
+            if label[start] != -1:
+                continue
+            members = list(self._bfs([start], graphs))
+            for node in members:
+                label[node] = len(groups)
+            groups.append(members)
+
+        # Relabel so component 0 is the largest
+        order = sorted(range(len(groups)), key=lambda g: (-len(groups[g]), g))
+        relabel = {old: new for new, old in enumerate(order)}
+        return [relabel[g] for g in label], [len(groups[g]) for g in order]
+
+    def to_artifact(self):
+        """JSON-ready analytics; node references are indices into 'nodes'"""
+        component_labels, component_sizes = self.components()
+
+        appointers = {}
+        oversight = {}
+        for entity_id in self.ids:
+            chain, ultimate = self.appointer_chain(entity_id)
+            if chain:
+                appointers[entity_id] = {
+                    'chain': [[self.index[a], depth] for a, depth in chain],
+                    'ultimate': [self.index[a] for a in ultimate]
+                }
+            overseers = self.oversight_chain(entity_id)
+            if overseers:
+                oversight[entity_id] = [[self.index[o], depth] for o, depth in overseers]
+
+        in_degree, out_degree = self.degrees()
+        return {
+            'format': GRAPH_PREFIX,
+            'version': GRAPH_FORMAT_VERSION,
+            'nodes': self.ids,
+            'relationships': self.relationship_ids,
+            'adjacency': {category: graph.to_artifact() for category, graph in self.down.items()},
+            'degree': {'in': in_degree, 'out': out_degree},
+            'rankings': {category or 'all': self.degree_ranking(category)
+                         for category in (None,) + CATEGORIES},
+            'components': {'labels': component_labels, 'sizes': component_sizes},
+            'appointer_chains': appointers,
+            'oversight_chains': oversight
+        }
+
+
+def build_graph_analytics(data_dir=None):
+    """Write data/bundle/sd_gov_graph.<hash>.json and register it in the manifest"""
+
+    if data_dir is None:
+        data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
+    bundle_dir = os.path.join(data_dir, 'bundle')
+
+    graph = GovGraph.from_csv(data_dir)
+    artifact = graph.to_artifact()
+    payload = json.dumps(artifact, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    graph_path = write_hashed_artifact(bundle_dir, GRAPH_PREFIX, payload)
+    update_manifest(bundle_dir, 'graph', graph_path)
+
+    sizes = artifact['components']['sizes']
+    print(f"Generated graph analytics: {graph_path}")
+    print(f"Nodes: {len(graph.ids)}, components: {len(sizes)} (largest {sizes[0] if sizes else 0}), "
+          f"size: {len(payload) / 1024:.1f} KB")
+    for category in CATEGORIES:
+        print(f"  {category} edges: {len(graph.down[category].targets)}")
+    if graph.dangling:
+        print(f"⚠️  Skipped {len(graph.dangling)} relationships with unknown endpoints")
+    print("Most connected:")
+    for entry in artifact['rankings']['all'][:5]:
+        print(f"  {entry['id']}: {entry['in']} in, {entry['out']} out")
+
+    return graph_path
+
+
+if __name__ == "__main__":
+    build_graph_analytics()
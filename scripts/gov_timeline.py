@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Point-in-time queries over terms of office, entity lifetimes and verification dates
+Intervals live in a static interval tree (sorted by start, with each implicit
+subtree's latest end), and verification dates in a sorted array, so "as of"
+and "not verified since" lookups stay logarithmic as historical rows pile up
+"""
+
+import argparse
+import bisect
+import calendar
+import datetime
+import json
+import os
+from array import array
+
+from build_data_bundle import read_rows, update_manifest, write_hashed_artifact
+
+TIMELINE_FORMAT_VERSION = 1
+TIMELINE_PREFIX = 'sd_gov_timeline'
+
+# Open ends: entities with no known creation date, terms with no end date
+OPEN_START = datetime.date.min.toordinal()
+OPEN_END = datetime.date.max.toordinal()
+
+# Source files carrying creation_date for the master entities
+ENTITY_SOURCE_FILES = ['sd_gov_boards_commissions.csv', 'sd_gov_city_departments.csv',
+                       'sd_gov_county_departments.csv', 'sd_gov_regional_authorities.csv']
+
+# file -> (key column, label column) for last_verified
+VERIFIED_FILES = {
+    'sd_gov_entities_complete.csv': ('id', 'name'),
+    'sd_gov_relationships_complete.csv': ('relationship_id', 'description'),
+    'sd_gov_appointments.csv': ('appointment_id', 'description'),
+}
+
+DEFAULT_STALE_MONTHS = 12
+
+
+def parse_date(value, end=False):
+    """Ordinal of an ISO date, year-month or year ('1968'); partial dates take the
+    first day of the period, or the last one when end is True. None if unparseable"""
+    value = (value or '').strip()
+    try:
+        if len(value) == 4:
+            return datetime.date(int(value), 12 if end else 1, 31 if end else 1).toordinal()
+        if len(value) == 7:
+            year, month = int(value[:4]), int(value[5:])
+            day = calendar.monthrange(year, month)[1] if end else 1
+            return datetime.date(year, month, day).toordinal()
+        return datetime.date.fromisoformat(value[:10]).toordinal()
+    except ValueError:
+        return None
+
+
+def format_date(ordinal):
+    """ISO date for an ordinal; '' for an open end"""
+    if ordinal in (OPEN_START, OPEN_END):
+        return ''
+    return datetime.date.fromordinal(ordinal).isoformat()
+
+
+def months_before(date, months):
+    """Same day of the month, months earlier (clamped to the month's last day)"""
+    year, month = divmod(date.year * 12 + date.month - 1 - months, 12)
+    month += 1
+    return datetime.date(year, month, min(date.day, calendar.monthrange(year, month)[1]))
+
+
+class IntervalIndex:
+    """Static interval tree over closed [start, end] ordinals
+
+    Intervals are sorted by start; the implicit balanced tree over that order
+    (node = midpoint of a range) stores the latest end in each subtree, so a
+    query skips every subtree ending before it: O(log n + k) for k matches.
+    """
+
+    def __init__(self, starts, ends):
+        order = sorted(range(len(starts)), key=lambda i: (starts[i], ends[i]))
+        self.order = array('i', order)  # sorted position -> caller's position
+        self.starts = array('q', (starts[i] for i in order))
+        self.ends = array('q', (ends[i] for i in order))
+        self.max_end = array('q', self.ends)
+        self._build(0, len(order))
+
+    def __len__(self):
+        return len(self.order)
+
+    def _build(self, lo, hi):
+        if lo >= hi:
+            return OPEN_START
+        mid = (lo + hi) // 2
+        latest = max(self.ends[mid], self._build(lo, mid), self._build(mid + 1, hi))
+        self.max_end[mid] = latest
+        return latest
+
+    def overlapping(self, start, end):
+        """Caller positions of intervals sharing at least one day with [start, end], by start"""
+        found = []
+        # Explicit stack of (lo, hi) ranges; depth stays O(log n)
+        stack = [(0, len(self.order))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            if self.max_end[mid] < start:
+                continue  # Everything in this subtree ended before the window
+            stack.append((lo, mid))
+            if self.starts[mid] <= end:
+                if self.ends[mid] >= start:
+                    found.append(mid)
+                stack.append((mid + 1, hi))
+        return [self.order[i] for i in sorted(found)]
+
+    def at(self, point):
+        """Caller positions of intervals containing point"""
+        return self.overlapping(point, point)
+
+
+class GovTimeline:
+    """Terms of office and entity lifetimes as intervals, plus verification dates"""
+
+    def __init__(self, intervals, verifications):
+        # intervals: [{'kind', 'id', 'label', 'start', 'end'}] with ordinal start/end
+        # verifications: [{'file', 'id', 'label', 'verified'}] with an ordinal, or 0 if never
+        self.intervals = intervals
+        self.interval_index = IntervalIndex([row['start'] for row in intervals],
+                                            [row['end'] for row in intervals])
+        self.verifications = sorted(verifications, key=lambda row: row['verified'])
+        self.verified_dates = array('q', (row['verified'] for row in self.verifications))
+
+    @classmethod
+    def from_csv(cls, data_dir=None):
+        if data_dir is None:
+            data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+        created = {}
+        for filename in ENTITY_SOURCE_FILES:
+            path = os.path.join(data_dir, filename)
+            if os.path.exists(path):
+                for row in read_rows(path)[1]:
+                    if row.get('creation_date'):
+                        created[row['id']] = row['creation_date']
+
+        intervals = []
+        _, entities = read_rows(os.path.join(data_dir, 'sd_gov_entities_complete.csv'))
+        for row in entities:
+            start = parse_date(created.get(row['id']))
+            intervals.append({'kind': 'entity', 'id': row['id'], 'label': row.get('name') or '',
+                              'start': start if start is not None else OPEN_START, 'end': OPEN_END})
+
+        # One row per term; earlier holders of a seat are further rows with the same id
+        _, elected = read_rows(os.path.join(data_dir, 'sd_gov_elected.csv'))
+        for row in elected:
+            start = parse_date(row.get('term_start'))
+            end = parse_date(row.get('term_end'), end=True)
+            intervals.append({'kind': 'term', 'id': row['id'],
+                              'label': f"{row.get('name') or ''}, {row.get('position') or ''}",
+                              'start': start if start is not None else OPEN_START,
+                              'end': end if end is not None else OPEN_END})
+
+        verifications = []
+        for filename, (key_field, label_field) in VERIFIED_FILES.items():
+            path = os.path.join(data_dir, filename)
+            if not os.path.exists(path):
+                continue
+            for row in read_rows(path)[1]:
+                verifications.append({'file': filename, 'id': row.get(key_field) or '',
+                                      'label': row.get(label_field) or '',
+                                      'verified': parse_date(row.get('last_verified')) or 0})
+        return cls(intervals, verifications)
+
+    @classmethod
+    def from_artifact(cls, artifact):
+        intervals = artifact['intervals']
+        verifications = artifact['verifications']
+        return cls(
+            [{'kind': kind, 'id': entity_id, 'label': label,
+              'start': parse_date(start) or OPEN_START, 'end': parse_date(end) or OPEN_END}
+             for kind, entity_id, label, start, end in zip(
+                 intervals['kind'], intervals['id'], intervals['label'],
+                 intervals['start'], intervals['end'])],
+            [{'file': filename, 'id': record_id, 'label': label, 'verified': parse_date(verified) or 0}
+             for filename, record_id, label, verified in zip(
+                 verifications['file'], verifications['id'], verifications['label'],
+                 verifications['verified'])])
+
+    @classmethod
+    def load(cls, data_dir=None):
+        """From the timeline artifact named in data/bundle/manifest.json, else from the CSVs"""
+        if data_dir is None:
+            data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
+        manifest_path = os.path.join(data_dir, 'bundle', 'manifest.json')
+        if os.path.exists(manifest_path):
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                artifact_name = json.load(f).get('timeline')
+            artifact_path = os.path.join(data_dir, 'bundle', artifact_name or '')
+            if artifact_name and os.path.exists(artifact_path):
+                with open(artifact_path, 'r', encoding='utf-8') as f:
+                    return cls.from_artifact(json.load(f))
+        return cls.from_csv(data_dir)
+
+    @staticmethod
+    def _interval_dict(row):
+        return {'kind': row['kind'], 'id': row['id'], 'label': row['label'],
+                'start': format_date(row['start']), 'end': format_date(row['end'])}
+
+    def _intervals(self, positions, kind):
+        return [self._interval_dict(self.intervals[i]) for i in positions
+                if kind is None or self.intervals[i]['kind'] == kind]
+
+    def as_of(self, date, kind=None):
+        """Entities in existence and terms in progress on date ('entity' / 'term' filter)"""
+        point = parse_date(date)
+        if point is None:
+            raise ValueError(f"Invalid date: {date}")
+        return self._intervals(self.interval_index.at(point), kind)
+
+    def overlapping(self, start, end, kind=None):
+        """Intervals sharing at least one day with [start, end]; either side may be open"""
+        lo = parse_date(start) if start else OPEN_START
+        hi = parse_date(end, end=True) if end else OPEN_END
+        if lo is None or hi is None:
+            raise ValueError(f"Invalid date range: {start} - {end}")
+        return self._intervals(self.interval_index.overlapping(lo, hi), kind)
+
+    def verified_before(self, date):
+        """Records last verified before date (or never), oldest first"""
+        cutoff = parse_date(date)
+        if cutoff is None:
+            raise ValueError(f"Invalid date: {date}")
+        end = bisect.bisect_left(self.verified_dates, cutoff)
+        return [self._verification_dict(row) for row in self.verifications[:end]]
+
+    def verified_between(self, start, end):
+        """Records last verified within [start, end]"""
+        lo = parse_date(start) if start else 1
+        hi = parse_date(end, end=True) if end else OPEN_END
+        if lo is None or hi is None:
+            raise ValueError(f"Invalid date range: {start} - {end}")
+        first = bisect.bisect_left(self.verified_dates, lo)
+        last = bisect.bisect_right(self.verified_dates, hi)
+        return [self._verification_dict(row) for row in self.verifications[first:last]]
+
+    def stale(self, months=DEFAULT_STALE_MONTHS, as_of=None):
+        """Records not verified in the months before as_of (default: today)"""
+        reference = datetime.date.fromisoformat(as_of) if as_of else datetime.date.today()
+        return self.verified_before(months_before(reference, months).isoformat())
+
+    @staticmethod
+    def _verification_dict(row):
+        return {'file': row['file'], 'id': row['id'], 'label': row['label'],
+                'last_verified': format_date(row['verified']) if row['verified'] else ''}
+
+    def to_artifact(self):
+        """Columns in start / verification order, dates as ISO strings ('' when open)"""
+        intervals = [self.intervals[i] for i in self.interval_index.order]
+        return {
+            'format': TIMELINE_PREFIX,
+            'version': TIMELINE_FORMAT_VERSION,
+            'intervals': {
+                'kind': [row['kind'] for row in intervals],
+                'id': [row['id'] for row in intervals],
+                'label': [row['label'] for row in intervals],
+                'start': [format_date(row['start']) for row in intervals],
+                'end': [format_date(row['end']) for row in intervals]
+            },
+            'verifications': {
+                'file': [row['file'] for row in self.verifications],
+                'id': [row['id'] for row in self.verifications],
+                'label': [row['label'] for row in self.verifications],
+                'verified': [format_date(row['verified']) if row['verified'] else ''
+                             for row in self.verifications]
+            }
+        }
+
+
+def build_timeline(data_dir=None):
+    """Write data/bundle/sd_gov_timeline.<hash>.json and register it in the manifest"""
+
+    if data_dir is None:
+        data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
+    bundle_dir = os.path.join(data_dir, 'bundle')
+
+    timeline = GovTimeline.from_csv(data_dir)
+    artifact = timeline.to_artifact()
+    payload = json.dumps(artifact, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    timeline_path = write_hashed_artifact(bundle_dir, TIMELINE_PREFIX, payload)
+    update_manifest(bundle_dir, 'timeline', timeline_path)
+
+    kinds = artifact['intervals']['kind']
+    print(f"Generated timeline: {timeline_path}")
+    print(f"Entities: {kinds.count('entity')}, terms: {kinds.count('term')}, "
+          f"verification dates: {len(timeline.verifications)}, size: {len(payload) / 1024:.1f} KB")
+
+    return timeline_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the timeline artifact or query it")
+    parser.add_argument('--as-of', help="list entities and terms in effect on this date (YYYY-MM-DD)")
+    parser.add_argument('--stale-months', type=int,
+                        help="list records not verified in this many months")
+    args = parser.parse_args()
+
+    if args.as_of is None and args.stale_months is None:
+        build_timeline()
+    else:
+        timeline = GovTimeline.load()
+        if args.as_of:
+            for row in timeline.as_of(args.as_of):
+                print(f"{row['kind']:<7} {row['id']:<28} {row['start'] or '?':<10} - {row['end'] or 'open':<10} "
+                      f"{row['label']}")
+        if args.stale_months is not None:
+            stale = timeline.stale(args.stale_months)
+            print(f"{len(stale)} records not verified in {args.stale_months} months")
+            for row in stale:
+                print(f"  {row['last_verified'] or 'never':<10} {row['file']}: {row['id']}")
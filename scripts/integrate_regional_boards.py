@@ -3,69 +3,79 @@
 Integrate regional authority boards and committees into main entities
 """
 
-import csv
+import glob
 import os
 
-def integrate_regional_boards():
-    """Add regional boards to main boards and commissions file"""
-    
-    data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
-    
-    # Source file (regional boards/committees)
-    source_file = os.path.join(data_dir, 'sd_regional_boards_committees_2025.csv')
+from build_manifest import upsert_csv
+from datastore import load_table
+
+# Dated source files (2025, 2026, ...); newer files win for ids listed in several
+SOURCE_PATTERN = 'sd_regional_boards_committees_*.csv'
+
+BOARD_FIELDS = ['id', 'name', 'type', 'jurisdiction', 'parent_entity', 'website_url',
+                'description', 'members_count', 'appointment_authority', 'meeting_schedule',
+                'creation_date', 'legal_source', 'last_verified']
+
+def normalize_regional_board(row):
+    """Convert a regional board/committee row to the boards and commissions format"""
+    return {
+        'id': row.get('id', ''),
+        'name': row.get('official_name', ''),
+        'type': 'Board' if 'Board' in row.get('official_name', '') else 'Committee',
+        'jurisdiction': 'Regional',
+        'parent_entity': row.get('parent_organization', ''),
+        'website_url': row.get('website_url', ''),
+        'description': row.get('description_purpose', ''),
+        'members_count': row.get('member_count', ''),
+        'appointment_authority': row.get('appointment_authority', ''),
+        'meeting_schedule': row.get('meeting_schedule', ''),
+        'creation_date': '',
+        'legal_source': 'Regional Authority Governance',
+        'last_verified': '2024-09-03'
+    }
+
+def find_source_files(data_dir):
+    """Regional board source files, oldest first"""
+    return sorted(glob.glob(os.path.join(data_dir, SOURCE_PATTERN)))
+
+def integrate_regional_boards(data_dir=None):
+    """Upsert regional boards into the main boards and commissions file
+
+    Keyed on id, so running it again is a no-op and an edited source row
+    updates its existing entry instead of adding a second one.
+    """
+
+    if data_dir is None:
+        data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
+
     # Target file (main boards and commissions)
     target_file = os.path.join(data_dir, 'sd_gov_boards_commissions.csv')
-    
-    if not os.path.exists(source_file):
-        print(f"Source file not found: {source_file}")
+
+    source_files = find_source_files(data_dir)
+    if not source_files:
+        print(f"No source files matching {SOURCE_PATTERN} in {data_dir}")
         return
-    
-    # Read existing boards/commissions
-    existing_entities = []
-    with open(target_file, 'r', newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        existing_entities = list(reader)
-    
-    # Read regional boards/committees
-    regional_entities = []
-    with open(source_file, 'r', newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            # Convert to standard format
-            entity = {
-                'id': row.get('id', ''),
-                'name': row.get('official_name', ''),
-                'type': 'Board' if 'Board' in row.get('official_name', '') else 'Committee',
-                'jurisdiction': 'Regional',
-                'parent_entity': row.get('parent_organization', ''),
-                'website_url': row.get('website_url', ''),
-                'description': row.get('description_purpose', ''),
-                'members_count': row.get('member_count', ''),
-                'appointment_authority': row.get('appointment_authority', ''),
-                'meeting_schedule': row.get('meeting_schedule', ''),
-                'creation_date': '',
-                'legal_source': 'Regional Authority Governance',
-                'last_verified': '2024-09-03'
-            }
-            regional_entities.append(entity)
-    
-    # Combine all entities
-    all_entities = existing_entities + regional_entities
-    
-    # Write updated file
-    fieldnames = ['id', 'name', 'type', 'jurisdiction', 'parent_entity', 'website_url', 
-                 'description', 'members_count', 'appointment_authority', 'meeting_schedule',
-                 'creation_date', 'legal_source', 'last_verified']
-    
-    with open(target_file, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(all_entities)
-    
-    print(f"Integrated {len(regional_entities)} regional boards/committees")
-    print(f"Total boards/commissions: {len(all_entities)}")
-    
-    return len(all_entities)
+
+    regional_entities = {}
+    for source_file in source_files:
+        for row in load_table(source_file).rows():
+            entity = normalize_regional_board(row)
+            if not entity['id']:
+                print(f"⚠️  Skipping row without id in {os.path.basename(source_file)}: {entity['name']}")
+                continue
+            regional_entities[entity['id']] = entity
+
+    stats = upsert_csv(target_file, regional_entities.values(), 'id', BOARD_FIELDS)
+
+    print(f"Integrated {len(regional_entities)} regional boards/committees "
+          f"from {len(source_files)} file(s)")
+    print(f"  Inserted: {stats['inserted']}, updated: {stats['updated']}, unchanged: {stats['unchanged']}")
+    if stats['deduplicated']:
+        print(f"  Removed {stats['deduplicated']} duplicate rows")
+    print(f"Total boards/commissions: {stats['total']}"
+          f"{'' if stats['written'] else ' (file unchanged)'}")
+
+    return stats['total']
 
 if __name__ == "__main__":
-    integrate_regional_boards()
\ No newline at end of file
+    integrate_regional_boards()
@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the full data build
+Stages form a DAG derived from their declared inputs and outputs; ready stages
+run concurrently in a process pool, stages whose inputs are unchanged are
+skipped, and a JSON timing/results summary is written at the end
+"""
+
+import argparse
+import fnmatch
+import glob
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from contextlib import redirect_stdout
+
+from build_manifest import BuildManifest, file_hash
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATA_DIR = os.path.join(SCRIPTS_DIR, '..', 'data')
+DEFAULT_STATE_FILE = os.path.join(SCRIPTS_DIR, '..', '.cache', 'pipeline_state.json')
+DEFAULT_SUMMARY_FILE = os.path.join(SCRIPTS_DIR, '..', '.cache', 'pipeline_summary.json')
+
+SOURCE_ENTITY_FILES = [
+    'sd_gov_elected.csv',
+    'sd_gov_city_departments.csv',
+    'sd_gov_county_departments.csv',
+    'sd_gov_regional_authorities.csv',
+    'sd_gov_boards_commissions.csv'
+]
+ENTITIES_FILE = 'sd_gov_entities_complete.csv'
+RELATIONSHIPS_FILE = 'sd_gov_relationships_complete.csv'
+RELATIONSHIP_SOURCES = ['sd_gov_relationships_hierarchical.csv', 'sd_gov_appointments.csv']
+MASTER_FILES = [ENTITIES_FILE, RELATIONSHIPS_FILE]
+
+
+class Stage:
+    """One build step
+
+    inputs/outputs are data-directory glob patterns; a stage depends on every
+    stage producing one of its inputs, plus any stage named in after (used when
+    it consumes another stage's results rather than its files). code lists the
+    script modules whose source is part of the skip signature. Volatile stages
+    depend on more than their files (e.g. live websites) and always run.
+    """
+
+    def __init__(self, name, run, inputs=(), outputs=(), after=(), code=(), volatile=False):
+        self.name = name
+        self.run = run
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.after = list(after)
+        self.code = list(code)
+        self.volatile = volatile
+
+
+# Stage functions take (data_dir, upstream_results) and return JSON-ready results.
+# They live at module level so worker processes can look them up by stage name.
+
+def run_integrate_regional_boards(data_dir, upstream):
+    from integrate_regional_boards import integrate_regional_boards
+    return {'boards': integrate_regional_boards(data_dir)}
+
+
+def run_master_entities(data_dir, upstream):
+    from generate_master_list import regenerate_master_entities
+    total, changed = regenerate_master_entities(data_dir)
+    return {'total': total, 'changed': changed}
+
+
+def run_master_relationships(data_dir, upstream):
+    from validate_relationships import generate_master_relationships
+    total, changed = generate_master_relationships(data_dir)
+    return {'total': total, 'changed': changed}
+
+
+def run_relationship_integrity(data_dir, upstream):
+    from validate_relationships import validate_relationship_integrity
+    return {'valid': validate_relationship_integrity(data_dir)}
+
+
+def run_file_quality(data_dir, upstream, filename):
+    from validate_data_quality import CompletenessCheck, DuplicateCheck, scan_file
+    file_path = os.path.join(data_dir, filename)
+    completeness, duplicates = CompletenessCheck(), DuplicateCheck()
+    rows = scan_file(file_path, [completeness, duplicates])
+    percentage = completeness.report(file_path)
+    duplicate_ids, duplicate_names = duplicates.report(file_path)
+    return {
+        'rows': rows,
+        'completeness': round(percentage, 2),
+        'duplicate_ids': duplicate_ids,
+        'duplicate_names': duplicate_names
+    }
+
+
+def run_url_checks(data_dir, upstream):
+    from url_checker import URLCache, URLChecker
+    from validate_data_quality import URLCheck, run_url_checks as resolve_urls, scan_file
+    checks = {}
+    for filename in SOURCE_ENTITY_FILES:
+        file_path = os.path.join(data_dir, filename)
+        if os.path.exists(file_path):
+            checks[filename] = URLCheck()
+            scan_file(file_path, [checks[filename]])
+
+    with URLChecker(cache=URLCache()) as checker:
+        resolve_urls(checks.values(), checker)
+        requests_made = checker.network_requests
+
+    results = {}
+    for filename, check in checks.items():
+        valid, total, invalid = check.report(os.path.join(data_dir, filename))
+        results[filename] = {'valid': valid, 'total': total,
+                             'invalid': [[entity_id, url, error] for entity_id, url, error in invalid]}
+    return {'files': results, 'network_requests': requests_made}
+
+
+def run_quality_report(data_dir, upstream):
+    from validate_data_quality import ENTITY_FILES, calculate_quality_score, quality_status
+    files = [upstream[f'quality:{filename}'] for filename in ENTITY_FILES
+             if f'quality:{filename}' in upstream]
+    url_files = upstream['url_checks']['files'].values()
+
+    avg_completeness = sum(f['completeness'] for f in files) / len(files) if files else 0
+    total_duplicates = sum(f['duplicate_ids'] + f['duplicate_names'] for f in files)
+    total_url_valid = sum(f['valid'] for f in url_files)
+    total_urls = sum(f['total'] for f in url_files)
+    url_success_rate = (total_url_valid / total_urls * 100) if total_urls > 0 else 0
+    quality_score = calculate_quality_score(avg_completeness, url_success_rate, total_duplicates)
+
+    print(f"Average data completeness: {avg_completeness:.1f}%")
+    print(f"URL validation success rate: {total_url_valid}/{total_urls} ({url_success_rate:.1f}%)")
+    print(f"Total duplicates found: {total_duplicates}")
+    print(f"Overall Quality Score: {quality_score:.1f}/100")
+    print(f"Quality Status: {quality_status(quality_score)}")
+    return {
+        'score': round(quality_score, 2),
+        'average_completeness': round(avg_completeness, 2),
+        'url_success_rate': round(url_success_rate, 2),
+        'duplicates': total_duplicates
+    }
+
+
+def run_artifact(data_dir, upstream, builder):
+    module_name, function_name = builder.split(':')
+    path = getattr(__import__(module_name), function_name)(data_dir)
+    return {'artifact': os.path.basename(path) if path else None}
+
+
+def _file_quality(filename):
+    return lambda data_dir, upstream: run_file_quality(data_dir, upstream, filename)
+
+
+def _artifact(builder):
+    return lambda data_dir, upstream: run_artifact(data_dir, upstream, builder)
+
+
+def build_stages():
+    """The data build, in declaration order (also the tie-break order for scheduling)"""
+    from generate_master_list import ENTITY_SOURCES, ENTITY_SOURCES_FILE
+    stages = [
+        Stage('integrate_regional_boards', run_integrate_regional_boards,
+              inputs=['sd_regional_boards_committees_*.csv'],
+              outputs=['sd_gov_boards_commissions.csv'],
+              code=['integrate_regional_boards', 'build_manifest']),
+        Stage('master_entities', run_master_entities,
+              inputs=[pattern for pattern, _ in ENTITY_SOURCES] + [ENTITY_SOURCES_FILE],
+              outputs=[ENTITIES_FILE],
+              code=['generate_master_list', 'external_merge', 'build_manifest']),
+        Stage('master_relationships', run_master_relationships,
+              inputs=RELATIONSHIP_SOURCES, outputs=[RELATIONSHIPS_FILE],
+              code=['validate_relationships', 'build_manifest']),
+        Stage('relationship_integrity', run_relationship_integrity,
+              inputs=[ENTITIES_FILE] + RELATIONSHIP_SOURCES,
+              code=['validate_relationships']),
+    ]
+
+    from validate_data_quality import ENTITY_FILES
+    for filename in ENTITY_FILES:
+        stages.append(Stage(f'quality:{filename}', _file_quality(filename),
+                            inputs=[filename], code=['validate_data_quality']))
+    stages += [
+        Stage('url_checks', run_url_checks,
+              inputs=SOURCE_ENTITY_FILES, code=['validate_data_quality', 'url_checker'],
+              volatile=True),
+        Stage('quality_report', run_quality_report,
+              after=[f'quality:{filename}' for filename in ENTITY_FILES] + ['url_checks'],
+              code=['validate_data_quality']),
+    ]
+
+    artifacts = [
+        ('bundle', 'build_data_bundle:build_data_bundle', 'sd_gov_bundle', MASTER_FILES),
+        ('search_index', 'build_search_index:build_search_index', 'sd_gov_search', [ENTITIES_FILE]),
+        ('hierarchy', 'build_org_hierarchy:build_org_hierarchy', 'sd_gov_hierarchy', MASTER_FILES),
+        ('graph', 'gov_graph:build_graph_analytics', 'sd_gov_graph', MASTER_FILES),
+        ('layout', 'build_network_layout:build_layout_if_available', 'sd_gov_layout', MASTER_FILES),
+        ('timeline', 'gov_timeline:build_timeline', 'sd_gov_timeline',
+         MASTER_FILES + SOURCE_ENTITY_FILES + ['sd_gov_appointments.csv']),
+        ('aggregates', 'build_aggregates:build_aggregates_if_available', 'sd_gov_aggregates',
+         MASTER_FILES + ['sd_gov_appointments.csv']),
+    ]
+    for name, builder, prefix, inputs in artifacts:
+        module_name = builder.split(':')[0]
+        stages.append(Stage(name, _artifact(builder), inputs=inputs,
+                            outputs=[f'bundle/{prefix}.*.json'],
+                            code=[module_name, 'build_data_bundle', 'datastore']))
+    stages.append(Stage('sqlite', _artifact('gov_db:build_database'),
+                        inputs=MASTER_FILES + ['sd_gov_appointments.csv'], outputs=['sd_gov.sqlite'],
+                        code=['gov_db', 'build_data_bundle', 'datastore']))
+    # The pages live next to data/, hence the '../' outputs
+    stages.append(Stage('snapshots', _artifact('render_snapshots:render_snapshots'),
+                        inputs=MASTER_FILES + ['bundle/sd_gov_layout.*.json', 'bundle/sd_gov_hierarchy.*.json'],
+                        outputs=['../index.html', '../orgchart.html'],
+                        code=['render_snapshots', 'build_data_bundle']))
+    stages.append(Stage('versions', _artifact('data_versions:record_version'),
+                        inputs=MASTER_FILES, outputs=['versions/history.json'],
+                        code=['data_versions', 'datastore']))
+    return stages
+
+
+STAGES = {stage.name: stage for stage in build_stages()}
+
+
+def stage_dependencies(stages):
+    """{stage name: set of upstream stage names}; raises ValueError on a cycle"""
+    producers = {}
+    for stage in stages:
+        for pattern in stage.outputs:
+            producers.setdefault(pattern, []).append(stage.name)
+
+    dependencies = {}
+    for stage in stages:
+        upstream = set(stage.after)
+        for pattern in stage.inputs:
+            for output, names in producers.items():
+                if output == pattern or fnmatch.fnmatch(output, pattern):
+                    upstream.update(names)
+        upstream.discard(stage.name)
+        dependencies[stage.name] = upstream
+
+    # Kahn's algorithm only to reject cycles; scheduling itself is dynamic
+    remaining = {name: set(deps) for name, deps in dependencies.items()}
+    while remaining:
+        ready = [name for name, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"Pipeline stages form a cycle: {', '.join(sorted(remaining))}")
+        for name in ready:
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return dependencies
+
+
+def matching_files(data_dir, patterns):
+    """Data-relative paths matching any of the patterns, sorted"""
+    paths = set()
+    for pattern in patterns:
+        for path in glob.glob(os.path.join(data_dir, pattern)):
+            paths.add(os.path.relpath(path, data_dir).replace(os.sep, '/'))
+    return sorted(paths)
+
+
+def stage_signature(stage, data_dir, upstream_results):
+    """Hash of everything a stage's result depends on: input files, code, upstream results"""
+    digest = hashlib.sha256()
+    for path in matching_files(data_dir, stage.inputs):
+        digest.update(f"in:{path}:{file_hash(os.path.join(data_dir, path))}\n".encode('utf-8'))
+    for module_name in stage.code:
+        digest.update(f"code:{module_name}:{file_hash(os.path.join(SCRIPTS_DIR, module_name + '.py'))}\n"
+                      .encode('utf-8'))
+    digest.update(json.dumps(upstream_results, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def output_hashes(stage, data_dir):
+    return {path: file_hash(os.path.join(data_dir, path))
+            for path in matching_files(data_dir, stage.outputs)}
+
+
+def execute_stage(name, data_dir, upstream_results):
+    """Worker entry point: run one stage, capturing its output; returns a result record"""
+    log = io.StringIO()
+    started = time.perf_counter()
+    try:
+        with redirect_stdout(log):
+            result = STAGES[name].run(data_dir, upstream_results)
+        error = None
+    except Exception:
+        result = None
+        error = traceback.format_exc()
+    return {
+        'result': result,
+        'error': error,
+        'seconds': round(time.perf_counter() - started, 3),
+        'log': log.getvalue()
+    }
+
+
+class InlineExecutor:
+    """Executor stand-in for workers=0: runs each stage in this process on submit"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+def run_pipeline(data_dir=None, workers=None, force=False, skip=(), state_file=DEFAULT_STATE_FILE,
+                 verbose=False):
+    """Run every stage, returning the summary dictionary
+
+    workers=0 runs the stages one at a time in this process, which for small
+    incremental builds beats the cost of starting a pool.
+    """
+    if data_dir is None:
+        data_dir = DEFAULT_DATA_DIR
+    stages = list(STAGES.values())
+    dependencies = stage_dependencies(stages)
+    dependents = {name: {other for other, deps in dependencies.items() if name in deps} for name in STAGES}
+    state = BuildManifest(state_file)
+
+    records = {}
+    pending = [stage.name for stage in stages]
+    running = {}
+    started = time.perf_counter()
+
+    def finish(name, record):
+        records[name] = record
+        if record['status'] in ('failed', 'excluded', 'blocked'):
+            # Nothing downstream of a missing result can run
+            for other in dependents[name]:
+                if other in pending:
+                    pending.remove(other)
+                    finish(other, {'status': 'blocked', 'seconds': 0, 'result': None,
+                                   'reason': f"upstream {name} {record['status']}"})
+
+    with (InlineExecutor() if workers == 0 else ProcessPoolExecutor(max_workers=workers)) as pool:
+        while pending or running:
+            for name in list(pending):
+                if name not in pending or not all(dep in records for dep in dependencies[name]):
+                    continue
+                pending.remove(name)
+                stage = STAGES[name]
+                if name in skip:
+                    finish(name, {'status': 'excluded', 'seconds': 0, 'result': None})
+                    continue
+
+                upstream = {dep: records[dep]['result'] for dep in stage.after}
+                signature = stage_signature(stage, data_dir, upstream)
+                previous = state.get(name, data_dir)
+                if not force and not stage.volatile and previous and previous['signature'] == signature and \
+                        previous['outputs'] == output_hashes(stage, data_dir):
+                    finish(name, {'status': 'skipped', 'seconds': 0, 'result': previous['result']})
+                    continue
+                future = pool.submit(execute_stage, name, data_dir, upstream)
+                running[future] = (name, signature)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, signature = running.pop(future)
+                outcome = future.result()
+                if outcome['error']:
+                    print(f"❌ {name} failed after {outcome['seconds']:.2f}s")
+                    print(outcome['log'] + outcome['error'], end='')
+                    finish(name, {'status': 'failed', 'seconds': outcome['seconds'], 'result': None,
+                                  'error': outcome['error'].strip().splitlines()[-1]})
+                    continue
+
+                print(f"✅ {name} ({outcome['seconds']:.2f}s)")
+                if verbose and outcome['log']:
+                    print(outcome['log'], end='')
+                state.record(name, data_dir, {
+                    'signature': signature,
+                    'outputs': output_hashes(STAGES[name], data_dir),
+                    'result': outcome['result']
+                })
+                finish(name, {'status': 'ran', 'seconds': outcome['seconds'], 'result': outcome['result']})
+
+    state.save()
+    counts = {}
+    for record in records.values():
+        counts[record['status']] = counts.get(record['status'], 0) + 1
+    return {
+        'data_dir': os.path.abspath(data_dir),
+        'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'seconds': round(time.perf_counter() - started, 3),
+        'counts': counts,
+        'stages': {name: dict(records[name], depends_on=sorted(dependencies[name])) for name in STAGES}
+    }
+
+
+def write_summary(summary, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+        f.write('\n')
+    os.replace(tmp_path, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the full San Diego government data build")
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help="data directory (default: data/)")
+    parser.add_argument('--workers', type=int, default=None, help="process pool size (default: CPU count; 0 runs stages in this process)")
+    parser.add_argument('--force', action='store_true', help="run every stage even if its inputs are unchanged")
+    parser.add_argument('--skip', action='append', default=[], metavar='STAGE',
+                        help="leave a stage (and everything downstream of it) out, e.g. --skip url_checks")
+    parser.add_argument('--summary', default=DEFAULT_SUMMARY_FILE, help="where to write the JSON summary")
+    parser.add_argument('--list', action='store_true', help="print the stages and their dependencies and exit")
+    parser.add_argument('-v', '--verbose', action='store_true', help="print each stage's output")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, deps in stage_dependencies(list(STAGES.values())).items():
+            print(f"{name}: {', '.join(sorted(deps)) or '-'}")
+        sys.exit(0)
+
+    unknown = [name for name in args.skip if name not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+
+    summary = run_pipeline(args.data_dir, workers=args.workers, force=args.force,
+                           skip=set(args.skip), verbose=args.verbose)
+    write_summary(summary, args.summary)
+
+    print(f"\nPipeline finished in {summary['seconds']:.2f}s: "
+          + ', '.join(f"{count} {status}" for status, count in sorted(summary['counts'].items())))
+    print(f"Summary: {args.summary}")
+    sys.exit(1 if summary['counts'].get('failed') else 0)
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Pre-render the default network and org chart views as static SVG
+The markup is written into index.html and orgchart.html between snapshot
+markers, so the first paint needs no data or JavaScript; script.js and
+orgchart-script.js remove the snapshot when they draw the live chart
+"""
+
+import json
+import os
+import re
+from html import escape
+
+from build_data_bundle import get_entity_type, get_jurisdiction, read_rows
+
+# Nominal viewport the snapshots are laid out for; the inner <svg> scales them to the real one
+NETWORK_SIZE = (1200, 600)
+ORGCHART_SIZE = (1200, 600)
+
+# Mirrors of the constants in script.js / orgchart-script.js
+NETWORK_PADDING = (60, 40)
+NETWORK_LAYOUT = 'all|all-types'
+ORGCHART_MARGIN = 40
+ORGCHART_JURISDICTIONS = [
+    ('city', 'City of San Diego'),
+    ('county', 'County of San Diego'),
+    ('regional', 'Regional Authorities'),
+]
+
+SNAPSHOT_MARKERS = re.compile(
+    r'(?P<indent>[ \t]*)<!-- snapshot:(?P<name>[\w-]+) -->.*?<!-- /snapshot:(?P=name) -->', re.S)
+
+
+def truncate_text(text, max_length):
+    return text[:max_length] + '...' if len(text) > max_length else text
+
+
+def number(value):
+    return f"{value:.1f}".rstrip('0').rstrip('.')
+
+
+def load_artifact(data_dir, key):
+    """An artifact named in data/bundle/manifest.json, or None when it is not built"""
+    manifest_path = os.path.join(data_dir, 'bundle', 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        artifact_name = json.load(f).get(key)
+    artifact_path = os.path.join(data_dir, 'bundle', artifact_name or '')
+    if not artifact_name or not os.path.exists(artifact_path):
+        return None
+    with open(artifact_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def render_network(entities, relationships, layout):
+    """SVG lines for the unfiltered network view (script.js renderPrecomputedLayout)"""
+    width, height = NETWORK_SIZE
+    pad_x, pad_y = NETWORK_PADDING
+    view = layout['layouts'][NETWORK_LAYOUT]
+    positions = {}
+    for i, node in enumerate(view['nodes']):
+        positions[layout['ids'][node]] = (
+            width / 2 + view['xy'][2 * i] * (width / 2 - pad_x),
+            height / 2 + view['xy'][2 * i + 1] * (height / 2 - pad_y)
+        )
+
+    lines = []
+    for rel in relationships:
+        source = positions.get(rel['source_entity_id'])
+        target = positions.get(rel['target_entity_id'])
+        if source is None or target is None:
+            continue
+        lines.append(f'<line class="link {escape(rel.get("relationship_category") or "")}-link" '
+                     f'x1="{number(source[0])}" y1="{number(source[1])}" '
+                     f'x2="{number(target[0])}" y2="{number(target[1])}" '
+                     f'stroke-width="2" stroke-opacity="0.6"/>')
+
+    for row in entities:
+        if row['id'] not in positions:
+            continue
+        x, y = positions[row['id']]
+        entity_type = get_entity_type(row.get('type') or '')
+        radius = {'elected': 12, 'departments': 8}.get(entity_type, 6)
+        node = (f'<g class="node {get_jurisdiction(row.get("jurisdiction") or "")}-node" '
+                f'transform="translate({number(x)},{number(y)})">'
+                f'<circle r="{radius}" stroke="#fff" stroke-width="2"/>')
+        if entity_type == 'elected':
+            node += (f'<text class="label" text-anchor="middle" dy="-15" '
+                     f'style="font-size: 10px; font-weight: bold; fill: #333; pointer-events: none;">'
+                     f'{escape(truncate_text(row.get("name") or "", 20))}</text>')
+        lines.append(node + '</g>')
+    return lines
+
+
+def render_orgchart(hierarchy):
+    """SVG lines for the org chart's initial view: the root and its collapsed jurisdictions"""
+    width, height = ORGCHART_SIZE
+    tree_height = height - 2 * ORGCHART_MARGIN
+    tree_width = width - 2 * ORGCHART_MARGIN - 100
+    jurisdictions = [(jurisdiction, name) for jurisdiction, name in ORGCHART_JURISDICTIONS
+                     if hierarchy['jurisdictions'].get(jurisdiction)]
+
+    # d3.tree for one level of leaves: siblings one unit apart, half a unit of
+    # padding at either end, depth 1 at the full width
+    step = tree_height / len(jurisdictions) if jurisdictions else 0
+    root = (tree_height / 2, 0)
+    children = [((i + 0.5) * step, tree_width) for i in range(len(jurisdictions))]
+
+    lines = [f'<g class="chart-group" transform="translate({ORGCHART_MARGIN}, {ORGCHART_MARGIN})">']
+    for x, y in children:
+        # d3.linkHorizontal: cubic curve with both control points at the midpoint depth
+        middle = (root[1] + y) / 2
+        lines.append(f'    <path class="tree-link" d="M{number(root[1])},{number(root[0])}'
+                     f'C{number(middle)},{number(root[0])},{number(middle)},{number(x)},'
+                     f'{number(y)},{number(x)}"/>')
+
+    nodes = [('all', 'San Diego Government', 0, root, '-' if jurisdictions else None)]
+    nodes += [(jurisdiction, name, 1, position, '+')
+              for (jurisdiction, name), position in zip(jurisdictions, children)]
+    for jurisdiction, name, level, (x, y), indicator in nodes:
+        node = (f'<g class="tree-node {jurisdiction}-node node-level-{level}" '
+                f'transform="translate({number(y)}, {number(x)})">'
+                f'<circle class="node-circle" r="{8 if level == 0 else 12}"/>'
+                f'<text class="node-text node-name" dy="-12">{escape(truncate_text(name, 20))}</text>')
+        if indicator:
+            node += (f'<circle class="expand-indicator" r="8" cy="20"/>'
+                     f'<text class="expand-indicator" y="20" dy="4">{indicator}</text>')
+        lines.append('    ' + node + '</g>')
+    lines.append('</g>')
+    return lines
+
+
+def snapshot_svg(name, size, lines):
+    """Inner <svg> holding a snapshot, scaled to the page's chart"""
+    width, height = size
+    return ([f'<svg class="snapshot snapshot-{name}" viewBox="0 0 {width} {height}" '
+             f'width="100%" height="100%" preserveAspectRatio="xMidYMid meet" aria-hidden="true">']
+            + ['    ' + line for line in lines] + ['</svg>'])
+
+
+def inline_snapshot(page_path, name, lines):
+    """Replace the markup between a page's snapshot markers; returns True if the page changed"""
+    with open(page_path, 'r', encoding='utf-8') as f:
+        html = f.read()
+
+    def replace(match):
+        indent = match.group('indent')
+        body = ''.join(f"{indent}{line}\n" for line in lines)
+        return f"{indent}<!-- snapshot:{name} -->\n{body}{indent}<!-- /snapshot:{name} -->"
+
+    matches = [m for m in SNAPSHOT_MARKERS.finditer(html) if m.group('name') == name]
+    if not matches:
+        raise ValueError(f"{os.path.basename(page_path)} has no <!-- snapshot:{name} --> markers")
+    updated = html[:matches[0].start()] + replace(matches[0]) + html[matches[0].end():]
+    if updated == html:
+        return False
+    tmp_path = f"{page_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(updated)
+    os.replace(tmp_path, page_path)
+    return True
+
+
+def render_snapshots(data_dir=None, pages_dir=None):
+    """Render both snapshots into index.html and orgchart.html; returns index.html's path
+
+    A view whose artifact is not built (the layout needs NumPy) gets an empty
+    snapshot, and the page renders as it did before.
+    """
+
+    if data_dir is None:
+        data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
+    if pages_dir is None:
+        pages_dir = os.path.join(data_dir, '..')
+
+    _, entities = read_rows(os.path.join(data_dir, 'sd_gov_entities_complete.csv'))
+    _, relationships = read_rows(os.path.join(data_dir, 'sd_gov_relationships_complete.csv'))
+
+    layout = load_artifact(data_dir, 'layout')
+    network = []
+    if layout and NETWORK_LAYOUT in layout['layouts']:
+        network = snapshot_svg('network', NETWORK_SIZE, render_network(entities, relationships, layout))
+    else:
+        print("⚠️  No network layout artifact - leaving the network snapshot empty")
+
+    hierarchy = load_artifact(data_dir, 'hierarchy')
+    orgchart = []
+    if hierarchy:
+        orgchart = snapshot_svg('orgchart', ORGCHART_SIZE, render_orgchart(hierarchy))
+    else:
+        print("⚠️  No hierarchy artifact - leaving the org chart snapshot empty")
+
+    index_path = os.path.join(pages_dir, 'index.html')
+    for page, name, lines in [(index_path, 'network', network),
+                              (os.path.join(pages_dir, 'orgchart.html'), 'orgchart', orgchart)]:
+        changed = inline_snapshot(page, name, lines)
+        print(f"{'Rendered' if changed else 'Unchanged'} {name} snapshot in {os.path.basename(page)} "
+              f"({sum(len(line) + 1 for line in lines) / 1024:.1f} KB)")
+
+    return index_path
+
+
+if __name__ == "__main__":
+    render_snapshots()
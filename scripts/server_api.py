@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Read-only JSON API for server.py: the /api/* handlers and the lazily
+reloaded indexes they query
+"""
+
+import os
+import threading
+import time
+import urllib.parse
+
+from build_aggregates import load_aggregates
+from gov_api import GovIndex, NotFoundError, QueryError, UnavailableError
+from gov_db import GovDatabase, default_database_path
+from gov_timeline import DEFAULT_STALE_MONTHS, GovTimeline
+
+INDEX_CHECK_INTERVAL = 1.0  # seconds between API index freshness checks
+
+
+class GovIndexHolder:
+    """Lazily loaded query backend, reloaded when its files change on disk
+
+    The memory backend builds a GovIndex from the master CSVs; the sqlite
+    backend opens data/sd_gov.sqlite read-only, so a rebuild (which swaps the
+    file by rename) is picked up by reopening.
+    """
+
+    # Sources the backend can load without (their signature entry is None)
+    optional_sources = ()
+
+    def __init__(self, data_dir, backend='memory'):
+        self.data_dir = data_dir
+        self.backend = backend
+        if backend == 'sqlite':
+            self.sources = [default_database_path(data_dir)]
+        else:
+            self.sources = [
+                os.path.join(data_dir, 'sd_gov_entities_complete.csv'),
+                os.path.join(data_dir, 'sd_gov_relationships_complete.csv')
+            ]
+        self._lock = threading.Lock()
+        self._index = None
+        self._signature = None
+        self._checked_at = 0.0
+
+    def _current_signature(self):
+        signature = []
+        for path in self.sources:
+            try:
+                stat_result = os.stat(path)
+            except FileNotFoundError:
+                if path in self.optional_sources:
+                    signature.append(None)
+                    continue
+                raise UnavailableError(f"{os.path.basename(path)} is missing; rebuild the data") from None
+            # Inode included: a swapped-in file can share mtime and size with the old one
+            signature.append((stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size))
+        return tuple(signature)
+
+    def _load(self):
+        if self.backend == 'sqlite':
+            return GovDatabase(self.sources[0])
+        return GovIndex.from_csv(self.data_dir)
+
+    def get(self):
+        """Return the current index, rebuilding at most once per check interval"""
+        now = time.monotonic()
+        if self._index is not None and now - self._checked_at < INDEX_CHECK_INTERVAL:
+            return self._index
+        with self._lock:
+            signature = self._current_signature()
+            if self._index is None or signature != self._signature:
+                self._index = self._load()
+                self._signature = signature
+            self._checked_at = now
+            return self._index
+
+
+class TimelineHolder(GovIndexHolder):
+    """GovTimeline, reloaded when its artifact or the CSVs it falls back to change"""
+
+    def __init__(self, data_dir):
+        super().__init__(data_dir)
+        self.sources = [
+            os.path.join(data_dir, 'bundle', 'manifest.json'),
+            os.path.join(data_dir, 'sd_gov_entities_complete.csv'),
+            os.path.join(data_dir, 'sd_gov_elected.csv')
+        ]
+        self.optional_sources = self.sources[:1]
+
+    def _load(self):
+        return GovTimeline.load(self.data_dir)
+
+
+class AggregatesHolder(GovIndexHolder):
+    """Dashboard aggregates, reloaded when the manifest points at a new artifact"""
+
+    def __init__(self, data_dir):
+        super().__init__(data_dir)
+        self.sources = [os.path.join(data_dir, 'bundle', 'manifest.json')]
+        self.optional_sources = self.sources
+
+    def _load(self):
+        return load_aggregates(self.data_dir)
+
+
+class ApiHandlerMixin:
+    """/api/* routes for a request handler providing send_json(); the server
+    carries gov_index, timeline and aggregates holders"""
+
+    API_ROUTES = {
+        '/api/entities': 'api_entities',
+        '/api/relationships': 'api_relationships',
+        '/api/subgraph': 'api_subgraph',
+        '/api/search': 'api_search',
+        '/api/as_of': 'api_as_of',
+        '/api/stale': 'api_stale',
+        '/api/aggregates': 'api_aggregates'
+    }
+
+    def handle_api(self):
+        parsed = urllib.parse.urlsplit(self.path)
+        route = self.API_ROUTES.get(parsed.path.rstrip('/'))
+        if route is None:
+            self.send_json(404, {'error': f"Unknown endpoint: {parsed.path}"})
+            return
+        params = {key: values[-1] for key, values in urllib.parse.parse_qs(parsed.query).items()}
+        try:
+            payload = getattr(self, route)(self.server.gov_index.get(), params)
+        except UnavailableError as e:
+            self.send_json(503, {'error': str(e)})
+        except QueryError as e:
+            self.send_json(400, {'error': str(e)})
+        except NotFoundError as e:
+            self.send_json(404, {'error': f"Unknown entity: {e.args[0]}"})
+        else:
+            self.send_json(200, payload)
+
+    @staticmethod
+    def int_param(params, name, default):
+        try:
+            return int(params.get(name, default))
+        except ValueError as err:
+            raise QueryError(f"{name} must be an integer") from err
+
+    def page_params(self, params):
+        return {
+            'offset': self.int_param(params, 'offset', 0),
+            'limit': self.int_param(params, 'limit', 100)
+        }
+
+    def api_entities(self, index, params):
+        return index.query_entities(jurisdiction=params.get('jurisdiction'),
+                                    entity_type=params.get('type'),
+                                    parent=params.get('parent'),
+                                    topic=params.get('topic'),
+                                    **self.page_params(params))
+
+    def api_relationships(self, index, params):
+        return index.query_relationships(category=params.get('category'),
+                                         relationship_type=params.get('type'),
+                                         entity_id=params.get('entity'),
+                                         **self.page_params(params))
+
+    def api_search(self, index, params):
+        return index.search(params.get('q', ''), k=self.int_param(params, 'limit', 10))
+
+    def api_subgraph(self, index, params):
+        if not params.get('root'):
+            raise QueryError("root is required")
+        return index.subgraph(params['root'],
+                              depth=self.int_param(params, 'depth', 1),
+                              category=params.get('category'),
+                              direction=params.get('direction', 'out'))
+
+    def api_as_of(self, index, params):
+        """Entities and terms in effect on ?date=, or overlapping ?start=&end="""
+        timeline = self.server.timeline.get()
+        kind = params.get('kind')
+        if kind not in (None, 'entity', 'term'):
+            raise QueryError("kind must be 'entity' or 'term'")
+        try:
+            if params.get('date'):
+                results = timeline.as_of(params['date'], kind=kind)
+            elif params.get('start') or params.get('end'):
+                results = timeline.overlapping(params.get('start'), params.get('end'), kind=kind)
+            else:
+                raise QueryError("date, or start and/or end, is required")
+        except ValueError as e:
+            raise QueryError(str(e)) from e
+        return {'total': len(results), 'results': results}
+
+    def api_stale(self, index, params):
+        """Records not verified in ?months= (default 12) before ?as_of= (default today)"""
+        timeline = self.server.timeline.get()
+        try:
+            results = timeline.stale(self.int_param(params, 'months', DEFAULT_STALE_MONTHS),
+                                     as_of=params.get('as_of'))
+        except ValueError as e:
+            raise QueryError(str(e)) from e
+        return {'total': len(results), 'results': results}
+
+    def api_aggregates(self, index, params):
+        """Precomputed dashboard tables: ?table=<name> for one, else the totals and table names"""
+        aggregates = self.server.aggregates.get()
+        if aggregates is None:
+            raise UnavailableError("Aggregates are not built; run scripts/build_aggregates.py (needs numpy)")
+        name = params.get('table')
+        if name is None:
+            return {'totals': aggregates['totals'], 'tables': sorted(aggregates['tables'])}
+        if name not in aggregates['tables']:
+            raise QueryError(f"table must be one of: {', '.join(sorted(aggregates['tables']))}")
+        return dict(aggregates['tables'][name], table=name)
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Request metrics, asynchronous access logging and a sampling profiler for server.py,
+and the request handler mixin that records and serves them
+Metrics are kept in process and rendered in the Prometheus text format at /metrics
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+import urllib.parse
+from collections import Counter, defaultdict
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Distinct path labels kept before further paths are counted as "other"
+MAX_PATH_LABELS = 200
+
+DEFAULT_PROFILE_INTERVAL = 0.01  # seconds between stack samples
+MAX_STACK_DEPTH = 40
+
+ACCESS_LOGGER = 'sd_gov.access'
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+access_log = logging.getLogger(ACCESS_LOGGER)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels) + '}'
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (not thread-safe; RequestMetrics locks)"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += 1
+        self.sum += value
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f"{name}_bucket{format_labels(labels + [('le', repr(bound))])} {cumulative}"
+        yield f"{name}_bucket{format_labels(labels + [('le', '+Inf')])} {self.total}"
+        yield f"{name}_sum{format_labels(labels)} {self.sum:.6f}"
+        yield f"{name}_count{format_labels(labels)} {self.total}"
+
+
+class RequestMetrics:
+    """Thread-safe request counters, latency histograms and gauges"""
+
+    def __init__(self, max_paths=MAX_PATH_LABELS):
+        self.max_paths = max_paths
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self.requests = Counter()           # (path, method, status) -> count
+        self.latency = defaultdict(Histogram)  # path -> Histogram
+        self.bytes_sent = Counter()         # path -> bytes
+        self.conditional = Counter()        # 'requests' / 'not_modified'
+        self.asset_store = Counter()        # 'hit' / 'miss'
+        self.active_connections = 0
+        self._paths = set()
+
+    def path_label(self, path):
+        """Bound label cardinality: new paths past max_paths are reported as 'other'"""
+        with self._lock:
+            if path in self._paths:
+                return path
+            if len(self._paths) < self.max_paths:
+                self._paths.add(path)
+                return path
+        return 'other'
+
+    def connection_opened(self):
+        with self._lock:
+            self.active_connections += 1
+
+    def connection_closed(self):
+        with self._lock:
+            self.active_connections -= 1
+
+    def observe(self, path, method, status, seconds, bytes_sent, conditional=False):
+        with self._lock:
+            self.requests[(path, method, status)] += 1
+            self.latency[path].observe(seconds)
+            self.bytes_sent[path] += bytes_sent
+            if conditional:
+                self.conditional['requests'] += 1
+                if status == 304:
+                    self.conditional['not_modified'] += 1
+
+    def asset_lookup(self, hit):
+        with self._lock:
+            self.asset_store['hit' if hit else 'miss'] += 1
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+
+        with self._lock:
+            metric('sd_gov_http_requests_total', 'counter', 'HTTP requests by path, method and status',
+                   [f"sd_gov_http_requests_total{format_labels([('path', p), ('method', m), ('status', s)])} {n}"
+                    for (p, m, s), n in sorted(self.requests.items())])
+            metric('sd_gov_http_request_duration_seconds', 'histogram', 'Request handling time by path',
+                   [line for path, histogram in sorted(self.latency.items())
+                    for line in histogram.samples('sd_gov_http_request_duration_seconds', [('path', path)])])
+            metric('sd_gov_http_response_bytes_total', 'counter', 'Bytes written to clients by path',
+                   [f"sd_gov_http_response_bytes_total{format_labels([('path', p)])} {n}"
+                    for p, n in sorted(self.bytes_sent.items())])
+            metric('sd_gov_http_conditional_requests_total', 'counter',
+                   'Requests carrying If-None-Match, and how many were answered 304',
+                   [f"sd_gov_http_conditional_requests_total{format_labels([('result', 'all')])} "
+                    f"{self.conditional['requests']}",
+                    f"sd_gov_http_conditional_requests_total{format_labels([('result', 'not_modified')])} "
+                    f"{self.conditional['not_modified']}"])
+            metric('sd_gov_asset_store_lookups_total', 'counter',
+                   'Preloaded asset store lookups (misses fall back to the filesystem or the API)',
+                   [f"sd_gov_asset_store_lookups_total{format_labels([('result', r)])} {self.asset_store[r]}"
+                    for r in ('hit', 'miss')])
+            metric('sd_gov_http_active_connections', 'gauge', 'Open client connections',
+                   [f"sd_gov_http_active_connections {self.active_connections}"])
+            metric('sd_gov_process_uptime_seconds', 'gauge', 'Seconds since the server started',
+                   [f"sd_gov_process_uptime_seconds {time.time() - self.started_at:.3f}"])
+        return '\n'.join(lines) + '\n'
+
+
+class JSONLogFormatter(logging.Formatter):
+    """One JSON object per line from the record's access fields"""
+
+    def format(self, record):
+        entry = {'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'), 'level': record.levelname.lower()}
+        entry.update(getattr(record, 'access', None) or {'message': record.getMessage()})
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def start_access_log(log_format='text', stream=None):
+    """Route the access logger through a queue to a background writer thread
+
+    Request threads only enqueue records, so a slow terminal or pipe never
+    holds up serving. Returns the QueueListener; stop() it to flush on exit.
+    """
+    handler = logging.StreamHandler(stream or sys.stdout)
+    if log_format == 'json':
+        handler.setFormatter(JSONLogFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(message)s'))
+
+    log_queue = queue.SimpleQueue()
+    logger = logging.getLogger(ACCESS_LOGGER)
+    logger.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+    return listener
+
+
+class SamplingProfiler:
+    """Periodically sample every thread's stack and count identical stacks
+
+    Opt-in (server.py --profile). Stacks are kept in collapsed form
+    ("outer;inner;leaf"), which flamegraph tools read directly.
+    """
+
+    def __init__(self, interval=DEFAULT_PROFILE_INTERVAL):
+        self.interval = interval
+        self.samples = Counter()
+        self.sample_count = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stacks.append(';'.join(reversed(stack)))
+            with self._lock:
+                self.samples.update(stacks)
+                self.sample_count += 1
+
+    def reset(self):
+        with self._lock:
+            self.samples.clear()
+            self.sample_count = 0
+
+    def report(self, top=50, include_idle=False):
+        """Hottest collapsed stacks, most frequent first, one 'stack count' per line"""
+        with self._lock:
+            items = self.samples.most_common()
+            sample_count = self.sample_count
+        if not include_idle:
+            # Threads parked in the pool queue or accept loop are not doing work
+            idle_markers = ('_worker (thread.py', 'select (selectors.py', 'dequeue (handlers.py',
+                            'readinto (socket.py', 'wait (threading.py', 'poll (server.py')
+            items = [(stack, count) for stack, count in items
+                     if not stack.rsplit(';', 1)[-1].startswith(idle_markers)]
+        lines = [f"# {sample_count} samples every {self.interval * 1000:g}ms"]
+        lines.extend(f"{stack} {count}" for stack, count in items[:top])
+        return '\n'.join(lines) + '\n'
+
+
+class CountingWriter:
+    """Wraps a handler's wfile and counts the bytes written through it"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.count = 0
+
+    def write(self, data):
+        written = self.raw.write(data)
+        self.count += len(data)
+        return written
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+
+class MetricsHandlerMixin:
+    """Per-request metrics and access logging, /metrics and /debug/profile for a
+    request handler providing send_body() and send_json(); the server carries
+    the RequestMetrics and the profiler (None unless profiling)"""
+
+    def setup(self):
+        super().setup()
+        self.wfile = CountingWriter(self.wfile)
+        self.server.metrics.connection_opened()
+
+    def finish(self):
+        try:
+            super().finish()
+        finally:
+            self.server.metrics.connection_closed()
+
+    def handle_one_request(self):
+        """Handle one request, then record its metrics and access log line"""
+        self.status_code = None
+        started = time.perf_counter()
+        bytes_before = self.wfile.count
+        super().handle_one_request()
+        if self.status_code is None:
+            return  # Connection closed or timed out before a request arrived
+        self.record_request(time.perf_counter() - started, self.wfile.count - bytes_before)
+
+    def send_response(self, code, message=None):
+        self.status_code = code
+        super().send_response(code, message)
+
+    def metrics_path(self):
+        """Path label for metrics: API routes as routed, unknown paths collapsed"""
+        path = urllib.parse.urlsplit(getattr(self, 'path', '')).path
+        if path.startswith('/api/'):
+            path = path.rstrip('/')
+            return path if path in getattr(self, 'API_ROUTES', {}) else '/api/(unknown)'
+        if self.status_code == 404 or not path:
+            return '(not found)'
+        return self.server.metrics.path_label(path)
+
+    def record_request(self, seconds, bytes_sent):
+        method = self.command or '-'
+        self.server.metrics.observe(self.metrics_path(), method, self.status_code, seconds, bytes_sent,
+                                    conditional='If-None-Match' in (getattr(self, 'headers', None) or {}))
+        client = self.address_string()
+        access_log.info('[%s] "%s" %s %s %.1fms', client, self.requestline, self.status_code,
+                        bytes_sent, seconds * 1000, extra={'access': {
+                            'client': client,
+                            'method': method,
+                            'path': getattr(self, 'path', ''),
+                            'status': self.status_code,
+                            'bytes': bytes_sent,
+                            'duration_ms': round(seconds * 1000, 3)
+                        }})
+
+    def handle_metrics(self):
+        self.send_body(200, self.server.metrics.render().encode('utf-8'), PROMETHEUS_CONTENT_TYPE)
+
+    def handle_profile(self):
+        """Hottest sampled stacks (collapsed format); ?top=N, ?reset=1 clears after reading"""
+        profiler = self.server.profiler
+        if profiler is None:
+            self.send_json(404, {'error': "Profiling is disabled; start the server with --profile"})
+            return
+        params = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(self.path).query))
+        try:
+            top = int(params.get('top', 50))
+        except ValueError:
+            self.send_json(400, {'error': "top must be an integer"})
+            return
+        report = profiler.report(top=top, include_idle=params.get('idle') == '1')
+        if params.get('reset') == '1':
+            profiler.reset()
+        self.send_body(200, report.encode('utf-8'), 'text/plain; charset=utf-8')
+
+    def log_request(self, code='-', size='-'):
+        # Requests are logged once handled, with timing (see record_request)
+        pass
+
+    def log_message(self, format, *args):
+        # Errors and timeouts; goes through the same queued logger as access lines
+        access_log.warning(f"[{self.address_string()}] {format % args}")
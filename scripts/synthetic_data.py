@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Generate synthetic scale-up datasets shaped like the real data files
+Replica 0 is the San Diego data unchanged; every further replica copies it
+under another California county's name with suffixed ids, so row counts,
+column shapes and relationship structure grow linearly with the scale
+"""
+
+import argparse
+import csv
+import glob
+import os
+
+# Master files are outputs of the build, so they are not copied
+GENERATED_FILES = {'sd_gov_entities_complete.csv', 'sd_gov_relationships_complete.csv'}
+
+CALIFORNIA_COUNTIES = [
+    'San Diego', 'Alameda', 'Alpine', 'Amador', 'Butte', 'Calaveras', 'Colusa', 'Contra Costa',
+    'Del Norte', 'El Dorado', 'Fresno', 'Glenn', 'Humboldt', 'Imperial', 'Inyo', 'Kern', 'Kings',
+    'Lake', 'Lassen', 'Los Angeles', 'Madera', 'Marin', 'Mariposa', 'Mendocino', 'Merced', 'Modoc',
+    'Mono', 'Monterey', 'Napa', 'Nevada', 'Orange', 'Placer', 'Plumas', 'Riverside', 'Sacramento',
+    'San Benito', 'San Bernardino', 'San Francisco', 'San Joaquin', 'San Luis Obispo', 'San Mateo',
+    'Santa Barbara', 'Santa Clara', 'Santa Cruz', 'Shasta', 'Sierra', 'Siskiyou', 'Solano',
+    'Sonoma', 'Stanislaus', 'Sutter', 'Tehama', 'Trinity', 'Tulare', 'Tuolumne', 'Ventura', 'Yolo',
+    'Yuba'
+]
+
+
+def place_name(replica):
+    """County name for a replica; past 58 replicas the names repeat with a number"""
+    name = CALIFORNIA_COUNTIES[replica % len(CALIFORNIA_COUNTIES)]
+    cycle = replica // len(CALIFORNIA_COUNTIES)
+    return f"{name} {cycle + 1}" if cycle else name
+
+
+def read_source_files(data_dir):
+    """{filename: (fieldnames, rows)} for every non-generated CSV in data_dir"""
+    files = {}
+    for path in sorted(glob.glob(os.path.join(data_dir, '*.csv'))):
+        filename = os.path.basename(path)
+        if filename in GENERATED_FILES:
+            continue
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            fieldnames = next(reader)
+            files[filename] = (fieldnames, list(reader))
+    return files
+
+
+def identifier_values(files):
+    """Every value of an id-like column (id, *_id), i.e. what must be suffixed per replica"""
+    identifiers = set()
+    for fieldnames, rows in files.values():
+        columns = [i for i, name in enumerate(fieldnames) if name == 'id' or name.endswith('_id')]
+        for row in rows:
+            identifiers.update(row[i] for i in columns if i < len(row) and row[i])
+    return identifiers
+
+
+def generate_dataset(output_dir, scale, data_dir=None):
+    """Write scale replicas of the source CSVs into output_dir; returns {filename: rows}"""
+
+    if data_dir is None:
+        data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
+    os.makedirs(output_dir, exist_ok=True)
+
+    files = read_source_files(data_dir)
+    identifiers = identifier_values(files)
+    counts = {}
+    for filename, (fieldnames, rows) in files.items():
+        jurisdiction = fieldnames.index('jurisdiction') if 'jurisdiction' in fieldnames else None
+        with open(os.path.join(output_dir, filename), 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(fieldnames)
+            for replica in range(scale):
+                suffix = f"-r{replica:04d}" if replica else ''
+                place = place_name(replica)
+                for row in rows:
+                    if replica:
+                        row = [value + suffix if value in identifiers else value for value in row]
+                        if jurisdiction is not None and jurisdiction < len(row):
+                            row[jurisdiction] = row[jurisdiction].replace('San Diego', place)
+                    writer.writerow(row)
+        counts[filename] = len(rows) * scale
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic scale-up dataset")
+    parser.add_argument('output_dir', help="directory to write the CSVs into")
+    parser.add_argument('--scale', type=int, default=10, help="number of replicas of the real data (default: 10)")
+    args = parser.parse_args()
+
+    counts = generate_dataset(args.output_dir, args.scale)
+    print(f"Generated {args.scale}x dataset in {args.output_dir}")
+    for filename, rows in counts.items():
+        print(f"  {filename}: {rows} rows")
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Concurrent URL checker for entity website validation
+Bounded thread pool with per-host rate limiting, connection reuse
+and an on-disk result cache with conditional revalidation
+"""
+
+import itertools
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, urlunparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_PER_HOST = 2
+DEFAULT_HOST_INTERVAL = 0.5
+DEFAULT_TIMEOUT = 10
+DEFAULT_CACHE_TTL = 7 * 24 * 3600  # seconds
+DEFAULT_CACHE_FILE = os.path.join(os.path.dirname(__file__), '..', '.cache', 'url_checks.json')
+
+# status is the final HTTP status (None on request failure), final_url is the
+# URL after redirects, error is a short message or None when the URL is valid
+URLResult = namedtuple('URLResult', ['url', 'status', 'final_url', 'error'])
+
+
+def normalize_url(url):
+    """Canonical cache key: lowercase scheme/host, no default port or fragment
+
+    A URL with a malformed port is its own key; check() reports it invalid.
+    """
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or '').lower()
+    try:
+        port = parsed.port
+    except ValueError:
+        return url.strip()
+    if port and (scheme, port) not in (('http', 80), ('https', 443)):
+        host = f"{host}:{port}"
+    return urlunparse((scheme, host, parsed.path or '/', parsed.params, parsed.query, ''))
+
+
+def interleave_by_host(urls):
+    """Order URLs round-robin across their hosts
+
+    Most rows share a handful of hosts; in file order every worker would end up
+    waiting on the same host's rate limit while the other hosts sit idle.
+    """
+    by_host = {}
+    for url in urls:
+        by_host.setdefault(urlparse(url).netloc.lower(), []).append(url)
+    return [url for round_ in itertools.zip_longest(*by_host.values()) for url in round_ if url is not None]
+
+
+class URLCache:
+    """JSON-backed cache of URL check results keyed by normalized URL"""
+
+    def __init__(self, path=DEFAULT_CACHE_FILE, ttl=DEFAULT_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._dirty = False
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+
+    def get(self, url):
+        """Return the cached entry for a URL, or None"""
+        with self._lock:
+            return self._entries.get(normalize_url(url))
+
+    def is_fresh(self, entry):
+        return time.time() - entry.get('checked_at', 0) < self.ttl
+
+    def put(self, url, status, final_url, error, etag=None, last_modified=None):
+        """Store a check result, stamping the current time"""
+        entry = {
+            'status': status,
+            'final_url': final_url,
+            'error': error,
+            'etag': etag,
+            'last_modified': last_modified,
+            'checked_at': time.time()
+        }
+        with self._lock:
+            self._entries[normalize_url(url)] = entry
+            self._dirty = True
+        return entry
+
+    def save(self):
+        """Write the cache to disk if anything changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+
+class HostRateLimiter:
+    """Space out request starts to the same host by a minimum interval"""
+
+    def __init__(self, min_interval=DEFAULT_HOST_INTERVAL):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def wait(self, host):
+        """Block until this host's next request slot is due"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class URLChecker:
+    """Check many URLs concurrently, reusing one connection pool per host"""
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, per_host=DEFAULT_PER_HOST,
+                 host_interval=DEFAULT_HOST_INTERVAL, timeout=DEFAULT_TIMEOUT, cache=None):
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.timeout = timeout
+        self.cache = cache
+        self.rate_limiter = HostRateLimiter(host_interval)
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._host_slots = {}
+        # Results already resolved in this run, shared across files
+        self._run_results = {}
+        self.network_requests = 0
+
+    def _host_state(self, host):
+        """Return the shared session and concurrency semaphore for a host"""
+        with self._lock:
+            if host not in self._sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.per_host)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._sessions[host] = session
+                self._host_slots[host] = threading.Semaphore(self.per_host)
+            return self._sessions[host], self._host_slots[host]
+
+    def request(self, url, method='HEAD', headers=None):
+        """Issue one rate-limited request through the host's session"""
+        host = urlparse(url).netloc.lower()
+        session, slots = self._host_state(host)
+        with slots:
+            self.rate_limiter.wait(host)
+            with self._lock:
+                self.network_requests += 1
+            # stream=True so a conditional GET never downloads the page body
+            response = session.request(method, url, headers=headers, stream=True,
+                                       timeout=self.timeout, allow_redirects=True)
+            if method == 'HEAD' or response.status_code == 304:
+                # No body to download: reading it hands the connection back to the
+                # session's pool, where close() on an unread stream would drop it
+                response.content
+            response.close()
+            return response
+
+    def check(self, url):
+        """Check a single URL and return a URLResult"""
+        parsed = urlparse(url)
+        if not parsed.scheme or not parsed.netloc:
+            return URLResult(url, None, None, 'Invalid URL format')
+        try:
+            parsed.port
+        except ValueError:
+            return URLResult(url, None, None, 'Invalid URL port')
+
+        entry = self.cache.get(url) if self.cache else None
+        if entry and self.cache.is_fresh(entry):
+            return URLResult(url, entry['status'], entry['final_url'], entry['error'])
+
+        try:
+            if entry and (entry.get('etag') or entry.get('last_modified')):
+                # Stale entry with validators: revalidate with a conditional GET
+                headers = {}
+                if entry.get('etag'):
+                    headers['If-None-Match'] = entry['etag']
+                if entry.get('last_modified'):
+                    headers['If-Modified-Since'] = entry['last_modified']
+                response = self.request(url, method='GET', headers=headers)
+                if response.status_code == 304:
+                    self.cache.put(url, entry['status'], entry['final_url'], entry['error'],
+                                   entry.get('etag'), entry.get('last_modified'))
+                    return URLResult(url, entry['status'], entry['final_url'], entry['error'])
+            else:
+                response = self.request(url)
+        except requests.RequestException as e:
+            return URLResult(url, None, None, f'Request error: {str(e)[:50]}')
+        except Exception as e:
+            return URLResult(url, None, None, f'Error: {str(e)[:50]}')
+
+        error = f'HTTP {response.status_code}' if response.status_code >= 400 else None
+        if self.cache:
+            self.cache.put(url, response.status_code, response.url, error,
+                           response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return URLResult(url, response.status_code, response.url, error)
+
+    def check_all(self, urls):
+        """Check every distinct URL concurrently, returning {url: URLResult}"""
+        unique_urls = list(dict.fromkeys(urls))
+        if not unique_urls:
+            return {}
+
+        # Identical URLs (after normalization) are checked once per run, even
+        # when they appear in several files
+        keys = {url: normalize_url(url) for url in unique_urls}
+        to_check = {}
+        with self._lock:
+            for url, key in keys.items():
+                if key not in self._run_results and key not in to_check:
+                    to_check[key] = url
+        to_check = interleave_by_host(to_check.values())
+
+        if to_check:
+            workers = min(self.max_workers, len(to_check))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for url, result in zip(to_check, pool.map(self.check, to_check)):
+                    with self._lock:
+                        self._run_results[keys[url]] = result
+
+        with self._lock:
+            return {url: self._run_results[keys[url]]._replace(url=url) for url in unique_urls}
+
+    def close(self):
+        """Close all pooled host connections and persist the result cache"""
+        if self.cache:
+            self.cache.save()
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._host_slots.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -4,159 +4,230 @@ Data quality validation for San Diego government entities
 Following SF CivLab quality standards
 """
 
+import argparse
 import csv
 import os
-import requests
-import time
 from urllib.parse import urlparse
 
-def validate_urls(csv_file):
-    """Validate all URLs in the CSV file"""
-    print(f"\n=== URL Validation for {os.path.basename(csv_file)} ===")
-    
-    invalid_urls = []
-    valid_count = 0
-    total_count = 0
-    
-    with open(csv_file, 'r', newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        
-        for row in reader:
-            url = row.get('website_url', '').strip()
-            if url:
-                total_count += 1
-                try:
-                    # Basic URL validation
-                    parsed = urlparse(url)
-                    if not parsed.scheme or not parsed.netloc:
-                        invalid_urls.append((row.get('id', ''), url, 'Invalid URL format'))
-                        continue
-                    
-                    # HTTP validation (with timeout)
-                    response = requests.head(url, timeout=10, allow_redirects=True)
-                    if response.status_code >= 400:
-                        invalid_urls.append((row.get('id', ''), url, f'HTTP {response.status_code}'))
-                    else:
-                        valid_count += 1
-                        
-                except requests.RequestException as e:
-                    invalid_urls.append((row.get('id', ''), url, f'Request error: {str(e)[:50]}'))
-                except Exception as e:
-                    invalid_urls.append((row.get('id', ''), url, f'Error: {str(e)[:50]}'))
-                
-                # Rate limiting
-                time.sleep(0.5)
-    
-    print(f"Valid URLs: {valid_count}/{total_count} ({valid_count/total_count*100:.1f}%)")
-    
-    if invalid_urls:
-        print(f"\nInvalid URLs found:")
-        for entity_id, url, error in invalid_urls[:10]:  # Show first 10
-            print(f"  {entity_id}: {url} - {error}")
-        if len(invalid_urls) > 10:
-            print(f"  ... and {len(invalid_urls) - 10} more")
-    
-    return valid_count, total_count, invalid_urls
+from url_checker import DEFAULT_CACHE_TTL, URLCache, URLChecker
 
-def validate_data_completeness(csv_file):
-    """Validate data completeness for required fields"""
-    print(f"\n=== Data Completeness for {os.path.basename(csv_file)} ===")
+REQUIRED_FIELDS = ['id', 'name', 'description', 'website_url', 'legal_source']
+
+ENTITY_FILES = [
+    'sd_gov_elected.csv',
+    'sd_gov_city_departments.csv',
+    'sd_gov_county_departments.csv', 
+    'sd_gov_regional_authorities.csv',
+    'sd_gov_boards_commissions.csv',
+    'sd_gov_entities_complete.csv'
+]
+
+
+class CompletenessCheck:
+    """Count missing values per required field"""
     
-    required_fields = ['id', 'name', 'description', 'website_url', 'legal_source']
-    field_stats = {field: {'total': 0, 'missing': 0} for field in required_fields}
+    def __init__(self, required_fields=REQUIRED_FIELDS, sample_size=5):
+        self.required_fields = required_fields
+        self.sample_size = sample_size
+        self.total = 0
+        self.missing = {field: 0 for field in required_fields}
+        # First few IDs missing each field, kept so no second read is needed
+        self.missing_ids = {field: [] for field in required_fields}
     
-    total_entities = 0
+    def observe(self, row):
+        self.total += 1
+        for field in self.required_fields:
+            if not (row.get(field) or '').strip():
+                self.missing[field] += 1
+                if len(self.missing_ids[field]) < self.sample_size:
+                    self.missing_ids[field].append(row.get('id') or 'unknown')
     
-    with open(csv_file, 'r', newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
+    def report(self, csv_file):
+        """Print field completeness and return the overall percentage"""
+        print(f"\n=== Data Completeness for {os.path.basename(csv_file)} ===")
+        print(f"Total entities: {self.total}")
+        print(f"Field completeness:")
         
-        for row in reader:
-            total_entities += 1
+        overall_completeness = 0
+        for field in self.required_fields:
+            missing = self.missing[field]
+            complete = self.total - missing
+            percentage = complete / self.total * 100 if self.total > 0 else 0
+            overall_completeness += percentage
+            
+            print(f"  {field}: {complete}/{self.total} ({percentage:.1f}%)")
             
-            for field in required_fields:
-                field_stats[field]['total'] += 1
-                if not row.get(field, '').strip():
-                    field_stats[field]['missing'] += 1
-    
-    print(f"Total entities: {total_entities}")
-    print(f"Field completeness:")
-    
-    overall_completeness = 0
-    for field in required_fields:
-        missing = field_stats[field]['missing']
-        total = field_stats[field]['total']
-        complete = total - missing
-        percentage = complete / total * 100 if total > 0 else 0
-        overall_completeness += percentage
-        
-        print(f"  {field}: {complete}/{total} ({percentage:.1f}%)")
-        
-        if missing > 0 and missing <= 5:  # Show specific missing items if few
-            print(f"    Missing in: ", end="")
-            with open(csv_file, 'r', newline='', encoding='utf-8') as csvfile2:
-                reader2 = csv.DictReader(csvfile2)
-                missing_ids = []
-                for row in reader2:
-                    if not row.get(field, '').strip():
-                        missing_ids.append(row.get('id', 'unknown'))
-                        if len(missing_ids) >= 5:
-                            break
-                print(', '.join(missing_ids))
-    
-    overall_percentage = overall_completeness / len(required_fields)
-    print(f"\nOverall completeness: {overall_percentage:.1f}%")
-    
-    return overall_percentage
+            if missing > 0 and missing <= self.sample_size:  # Show specific missing items if few
+                print(f"    Missing in: {', '.join(self.missing_ids[field])}")
+        
+        overall_percentage = overall_completeness / len(self.required_fields)
+        print(f"\nOverall completeness: {overall_percentage:.1f}%")
+        
+        return overall_percentage
 
-def check_duplicates(csv_file):
-    """Check for duplicate entities"""
-    print(f"\n=== Duplicate Check for {os.path.basename(csv_file)} ===")
+
+class DuplicateCheck:
+    """Detect repeated entity IDs and (case-insensitive) names"""
     
-    seen_ids = set()
-    seen_names = set()
-    duplicate_ids = []
-    duplicate_names = []
+    def __init__(self):
+        self.seen_ids = set()
+        self.seen_names = set()
+        self.duplicate_ids = []
+        self.duplicate_names = []
     
-    with open(csv_file, 'r', newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
+    def observe(self, row):
+        entity_id = (row.get('id') or '').strip()
+        name = (row.get('name') or '').strip().lower()
         
-        for row in reader:
-            entity_id = row.get('id', '').strip()
-            name = row.get('name', '').strip().lower()
-            
-            if entity_id in seen_ids:
-                duplicate_ids.append(entity_id)
-            seen_ids.add(entity_id)
+        if entity_id in self.seen_ids:
+            self.duplicate_ids.append(entity_id)
+        self.seen_ids.add(entity_id)
+        
+        if name in self.seen_names and name:
+            self.duplicate_names.append(row.get('name', ''))
+        self.seen_names.add(name)
+    
+    def report(self, csv_file):
+        """Print duplicates and return (duplicate_id_count, duplicate_name_count)"""
+        print(f"\n=== Duplicate Check for {os.path.basename(csv_file)} ===")
+        
+        if self.duplicate_ids:
+            print(f"Duplicate IDs found: {', '.join(self.duplicate_ids)}")
+        else:
+            print("No duplicate IDs found ✓")
             
-            if name in seen_names and name:
-                duplicate_names.append(row.get('name', ''))
-            seen_names.add(name)
+        if self.duplicate_names:
+            print(f"Duplicate names found: {', '.join(self.duplicate_names)}")
+        else:
+            print("No duplicate names found ✓")
+        
+        return len(self.duplicate_ids), len(self.duplicate_names)
+
+
+class URLCheck:
+    """Check URL syntax and collect well-formed URLs for the network pass"""
     
-    if duplicate_ids:
-        print(f"Duplicate IDs found: {', '.join(duplicate_ids)}")
-    else:
-        print("No duplicate IDs found ✓")
+    def __init__(self):
+        self.total = 0
+        self.invalid_urls = []
+        self.pending = []
+        self.results = {}
+    
+    def observe(self, row):
+        url = (row.get('website_url') or '').strip()
+        if not url:
+            return
+        self.total += 1
+        # Basic URL validation before any network work
+        parsed = urlparse(url)
+        if not parsed.scheme or not parsed.netloc:
+            self.invalid_urls.append((row.get('id', ''), url, 'Invalid URL format'))
+        else:
+            self.pending.append((row.get('id', ''), url))
+    
+    def urls(self):
+        return [url for _, url in self.pending]
+    
+    def report(self, csv_file):
+        """Print URL results and return (valid, total, invalid)"""
+        print(f"\n=== URL Validation for {os.path.basename(csv_file)} ===")
+        
+        invalid_urls = list(self.invalid_urls)
+        valid_count = 0
+        for entity_id, url in self.pending:
+            result = self.results[url]
+            if result.error:
+                invalid_urls.append((entity_id, url, result.error))
+            else:
+                valid_count += 1
         
-    if duplicate_names:
-        print(f"Duplicate names found: {', '.join(duplicate_names)}")
+        if self.total:
+            print(f"Valid URLs: {valid_count}/{self.total} ({valid_count/self.total*100:.1f}%)")
+        else:
+            print("Valid URLs: 0/0")
+        
+        if invalid_urls:
+            print(f"\nInvalid URLs found:")
+            for entity_id, url, error in invalid_urls[:10]:  # Show first 10
+                print(f"  {entity_id}: {url} - {error}")
+            if len(invalid_urls) > 10:
+                print(f"  ... and {len(invalid_urls) - 10} more")
+        
+        return valid_count, self.total, invalid_urls
+
+
+def scan_file(csv_file, checks):
+    """Stream a CSV once, feeding every row to each check; returns the row count
+
+    Rows are read one at a time rather than through the column store, so peak
+    memory stays flat as the file grows (only DuplicateCheck keeps per-row state).
+    """
+    row_count = 0
+    with open(csv_file, 'r', newline='', encoding='utf-8') as csvfile:
+        for row in csv.DictReader(csvfile):
+            row_count += 1
+            for check in checks:
+                check.observe(row)
+    return row_count
+
+
+def run_url_checks(url_checks, checker=None):
+    """Resolve the collected URLs of several URLCheck instances in one concurrent batch"""
+    urls = [url for check in url_checks for url in check.urls()]
+    
+    # HTTP validation runs concurrently with per-host rate limiting
+    if checker is None:
+        with URLChecker() as own_checker:
+            results = own_checker.check_all(urls)
     else:
-        print("No duplicate names found ✓")
+        results = checker.check_all(urls)
     
-    return len(duplicate_ids), len(duplicate_names)
+    for check in url_checks:
+        check.results = results
+
 
-def generate_quality_report():
+def validate_urls(csv_file, checker=None):
+    """Validate all URLs in the CSV file"""
+    check = URLCheck()
+    scan_file(csv_file, [check])
+    run_url_checks([check], checker)
+    return check.report(csv_file)
+
+def validate_data_completeness(csv_file):
+    """Validate data completeness for required fields"""
+    check = CompletenessCheck()
+    scan_file(csv_file, [check])
+    return check.report(csv_file)
+
+def check_duplicates(csv_file):
+    """Check for duplicate entities"""
+    check = DuplicateCheck()
+    scan_file(csv_file, [check])
+    return check.report(csv_file)
+
+def calculate_quality_score(avg_completeness, url_success_rate, total_duplicates):
+    """Quality score calculation shared by the report and the pipeline"""
+    quality_score = (avg_completeness + url_success_rate) / 2
+    if total_duplicates == 0:
+        quality_score += 5  # Bonus for no duplicates
+    return quality_score
+
+def quality_status(quality_score):
+    if quality_score >= 90:
+        return "EXCELLENT ✅"
+    elif quality_score >= 80:
+        return "GOOD ✅"
+    elif quality_score >= 70:
+        return "ACCEPTABLE ⚠️"
+    else:
+        return "NEEDS IMPROVEMENT ❌"
+
+def generate_quality_report(url_cache_ttl=DEFAULT_CACHE_TTL, use_url_cache=True):
     """Generate comprehensive quality report for all entity files"""
     
     data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
     
-    entity_files = [
-        'sd_gov_elected.csv',
-        'sd_gov_city_departments.csv',
-        'sd_gov_county_departments.csv', 
-        'sd_gov_regional_authorities.csv',
-        'sd_gov_boards_commissions.csv',
-        'sd_gov_entities_complete.csv'
-    ]
+    entity_files = ENTITY_FILES
     
     print("=" * 60)
     print("SAN DIEGO GOVERNMENT ENTITIES - DATA QUALITY REPORT")
@@ -168,10 +239,33 @@ def generate_quality_report():
     total_urls = 0
     total_duplicates = 0
     
+    # One checker for the whole report so host connections and results are
+    # reused across files; the on-disk cache skips URLs checked recently
+    url_cache = URLCache(ttl=url_cache_ttl) if use_url_cache else None
+    checker = URLChecker(cache=url_cache)
+    
+    # Each file is loaded once into the column store; URL network checks are batched across
+    # all files afterwards so they run concurrently and dedup shared URLs
+    scanned = []
     for filename in entity_files:
         file_path = os.path.join(data_dir, filename)
         
         if not os.path.exists(file_path):
+            scanned.append((filename, file_path, None, None))
+            continue
+        
+        checks = {'completeness': CompletenessCheck(), 'duplicates': DuplicateCheck()}
+        # URL validation (skip master file to avoid double-counting)
+        if filename != 'sd_gov_entities_complete.csv':
+            checks['urls'] = URLCheck()
+        entity_count = scan_file(file_path, checks.values())
+        scanned.append((filename, file_path, entity_count, checks))
+    
+    run_url_checks([checks['urls'] for _, _, _, checks in scanned
+                    if checks and 'urls' in checks], checker)
+    
+    for filename, file_path, entity_count, checks in scanned:
+        if checks is None:
             print(f"\nSkipping {filename} - file not found")
             continue
             
@@ -179,28 +273,24 @@ def generate_quality_report():
         print(f"ANALYZING: {filename.upper()}")
         print("=" * 40)
         
-        # Count entities
-        with open(file_path, 'r', newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile)
-            entity_count = sum(1 for row in reader)
-            total_entities += entity_count
-        
+        total_entities += entity_count
         print(f"Entity count: {entity_count}")
         
         # Data completeness
-        completeness = validate_data_completeness(file_path)
+        completeness = checks['completeness'].report(file_path)
         total_completeness += completeness
         
         # Duplicate check  
-        dup_ids, dup_names = check_duplicates(file_path)
+        dup_ids, dup_names = checks['duplicates'].report(file_path)
         total_duplicates += dup_ids + dup_names
         
-        # URL validation (skip master file to avoid double-counting)
-        if filename != 'sd_gov_entities_complete.csv':
-            valid_urls, total_file_urls, invalid_urls = validate_urls(file_path)
+        if 'urls' in checks:
+            valid_urls, total_file_urls, invalid_urls = checks['urls'].report(file_path)
             total_url_valid += valid_urls
             total_urls += total_file_urls
     
+    checker.close()
+    
     # Overall summary
     print(f"\n" + "=" * 60)
     print("OVERALL QUALITY SUMMARY")
@@ -212,25 +302,22 @@ def generate_quality_report():
     print(f"Total entities cataloged: {total_entities}")
     print(f"Average data completeness: {avg_completeness:.1f}%")
     print(f"URL validation success rate: {total_url_valid}/{total_urls} ({url_success_rate:.1f}%)")
+    print(f"URL network requests this run: {checker.network_requests}")
     print(f"Total duplicates found: {total_duplicates}")
     
-    # Quality score calculation
-    quality_score = (avg_completeness + url_success_rate) / 2
-    if total_duplicates == 0:
-        quality_score += 5  # Bonus for no duplicates
-    
+    quality_score = calculate_quality_score(avg_completeness, url_success_rate, total_duplicates)
     print(f"\nOverall Quality Score: {quality_score:.1f}/100")
-    
-    if quality_score >= 90:
-        print("Quality Status: EXCELLENT ✅")
-    elif quality_score >= 80:
-        print("Quality Status: GOOD ✅") 
-    elif quality_score >= 70:
-        print("Quality Status: ACCEPTABLE ⚠️")
-    else:
-        print("Quality Status: NEEDS IMPROVEMENT ❌")
+    print(f"Quality Status: {quality_status(quality_score)}")
     
     return quality_score
 
 if __name__ == "__main__":
-    generate_quality_report()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="San Diego government data quality report")
+    parser.add_argument('--url-cache-ttl', type=float, default=DEFAULT_CACHE_TTL / 3600,
+                        help="hours before a cached URL check is revalidated (default: 168)")
+    parser.add_argument('--no-url-cache', action='store_true',
+                        help="ignore the on-disk URL check cache")
+    args = parser.parse_args()
+    
+    generate_quality_report(url_cache_ttl=args.url_cache_ttl * 3600,
+                            use_url_cache=not args.no_url_cache)
\ No newline at end of file
@@ -3,41 +3,33 @@
 Validate relationship data quality and generate master relationship file
 """
 
-import csv
+import argparse
 import os
 
-def validate_relationship_integrity():
+from build_manifest import incremental_merge
+from datastore import DataStore
+
+def validate_relationship_integrity(data_dir=None):
     """Validate that all relationship entities exist in master entity list"""
     
-    data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
+    store = DataStore(data_dir)
     
     # Load all valid entity IDs
-    entities_file = os.path.join(data_dir, 'sd_gov_entities_complete.csv')
-    valid_entity_ids = set()
-    
-    with open(entities_file, 'r', newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            valid_entity_ids.add(row['id'])
+    valid_entity_ids = set(store.table('sd_gov_entities_complete.csv').column('id'))
     
     print(f"Loaded {len(valid_entity_ids)} valid entity IDs from master file")
     
     # Validate hierarchical relationships
-    hier_file = os.path.join(data_dir, 'sd_gov_relationships_hierarchical.csv')
+    hier = store.table('sd_gov_relationships_hierarchical.csv')
     hier_errors = []
-    hier_count = 0
-    
-    with open(hier_file, 'r', newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            hier_count += 1
-            parent_id = row['parent_id']
-            child_id = row['child_id']
-            
-            if parent_id not in valid_entity_ids:
-                hier_errors.append(f"Invalid parent_id: {parent_id} in {row['relationship_id']}")
-            if child_id not in valid_entity_ids:
-                hier_errors.append(f"Invalid child_id: {child_id} in {row['relationship_id']}")
+    hier_count = len(hier)
+    
+    for rel_id, parent_id, child_id in zip(hier.column('relationship_id'), hier.column('parent_id'),
+                                           hier.column('child_id')):
+        if parent_id not in valid_entity_ids:
+            hier_errors.append(f"Invalid parent_id: {parent_id} in {rel_id}")
+        if child_id not in valid_entity_ids:
+            hier_errors.append(f"Invalid child_id: {child_id} in {rel_id}")
     
     print(f"\n=== HIERARCHICAL RELATIONSHIPS VALIDATION ===")
     print(f"Total relationships: {hier_count}")
@@ -51,21 +43,16 @@ def validate_relationship_integrity():
         print("✅ All hierarchical relationships valid")
     
     # Validate appointment relationships
-    appt_file = os.path.join(data_dir, 'sd_gov_appointments.csv')
+    appt = store.table('sd_gov_appointments.csv')
     appt_errors = []
-    appt_count = 0
-    
-    with open(appt_file, 'r', newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            appt_count += 1
-            appointer_id = row['appointer_id']
-            appointee_id = row['appointee_entity_id']
-            
-            if appointer_id not in valid_entity_ids:
-                appt_errors.append(f"Invalid appointer_id: {appointer_id} in {row['appointment_id']}")
-            if appointee_id not in valid_entity_ids:
-                appt_errors.append(f"Invalid appointee_entity_id: {appointee_id} in {row['appointment_id']}")
+    appt_count = len(appt)
+    
+    for appt_id, appointer_id, appointee_id in zip(appt.column('appointment_id'), appt.column('appointer_id'),
+                                                  appt.column('appointee_entity_id')):
+        if appointer_id not in valid_entity_ids:
+            appt_errors.append(f"Invalid appointer_id: {appointer_id} in {appt_id}")
+        if appointee_id not in valid_entity_ids:
+            appt_errors.append(f"Invalid appointee_entity_id: {appointee_id} in {appt_id}")
     
     print(f"\n=== APPOINTMENT RELATIONSHIPS VALIDATION ===")
     print(f"Total appointments: {appt_count}")
@@ -93,10 +80,41 @@ def validate_relationship_integrity():
         print("❌ RELATIONSHIPS NEED CORRECTION")
         return False
 
-def generate_master_relationships():
-    """Generate master relationships file combining hierarchical and appointments"""
+def normalize_hierarchical(row):
+    """Map a hierarchical relationship row to the master relationship structure"""
+    return {
+        'relationship_id': row['relationship_id'],
+        'source_entity_id': row['parent_id'],
+        'target_entity_id': row['child_id'],
+        'relationship_type': row['relationship_type'],
+        'relationship_category': 'hierarchical',
+        'authority_source': row['authority_source'],
+        'description': row['description'],
+        'last_verified': row['last_verified']
+    }
+
+def normalize_appointment(row):
+    """Map an appointment row to the master relationship structure"""
+    return {
+        'relationship_id': row['appointment_id'],
+        'source_entity_id': row['appointer_id'],
+        'target_entity_id': row['appointee_entity_id'],
+        'relationship_type': row['appointment_type'],
+        'relationship_category': 'appointment',
+        'authority_source': row['authority_source'],
+        'description': row['description'],
+        'last_verified': row['last_verified']
+    }
+
+def generate_master_relationships(data_dir=None, force=False):
+    """Generate master relationships file combining hierarchical and appointments
+
+    Incremental: unchanged source files are skipped and the output is only
+    rewritten when its bytes change. Returns (total, changed).
+    """
     
-    data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
+    if data_dir is None:
+        data_dir = os.path.join(os.path.dirname(__file__), '..', 'data')
     
     # Output file
     output_file = os.path.join(data_dir, 'sd_gov_relationships_complete.csv')
@@ -107,57 +125,22 @@ def generate_master_relationships():
         'relationship_category', 'authority_source', 'description', 'last_verified'
     ]
     
-    all_relationships = []
-    
-    # Add hierarchical relationships
     hier_file = os.path.join(data_dir, 'sd_gov_relationships_hierarchical.csv')
-    with open(hier_file, 'r', newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            relationship = {
-                'relationship_id': row['relationship_id'],
-                'source_entity_id': row['parent_id'],
-                'target_entity_id': row['child_id'],
-                'relationship_type': row['relationship_type'],
-                'relationship_category': 'hierarchical',
-                'authority_source': row['authority_source'],
-                'description': row['description'],
-                'last_verified': row['last_verified']
-            }
-            all_relationships.append(relationship)
-    
-    # Add appointment relationships
     appt_file = os.path.join(data_dir, 'sd_gov_appointments.csv')
-    with open(appt_file, 'r', newline='', encoding='utf-8') as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            relationship = {
-                'relationship_id': row['appointment_id'],
-                'source_entity_id': row['appointer_id'],
-                'target_entity_id': row['appointee_entity_id'],
-                'relationship_type': row['appointment_type'],
-                'relationship_category': 'appointment',
-                'authority_source': row['authority_source'],
-                'description': row['description'],
-                'last_verified': row['last_verified']
-            }
-            all_relationships.append(relationship)
-    
-    # Write master relationships file
-    with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=master_headers)
-        writer.writeheader()
-        writer.writerows(all_relationships)
-    
-    print(f"\n=== MASTER RELATIONSHIPS FILE GENERATED ===")
+    sources = [(hier_file, normalize_hierarchical), (appt_file, normalize_appointment)]
+    counts, changed = incremental_merge('relationships', sources, 'relationship_id', master_headers,
+                                        output_file, force=force)
+    total = sum(counts.values())
+    
+    print(f"\n=== MASTER RELATIONSHIPS FILE {'GENERATED' if changed else 'UNCHANGED'} ===")
     print(f"File: {output_file}")
-    print(f"Total relationships: {len(all_relationships)}")
-    print(f"Hierarchical relationships: {sum(1 for r in all_relationships if r['relationship_category'] == 'hierarchical')}")
-    print(f"Appointment relationships: {sum(1 for r in all_relationships if r['relationship_category'] == 'appointment')}")
+    print(f"Total relationships: {total}")
+    print(f"Hierarchical relationships: {counts.get(hier_file, 0)}")
+    print(f"Appointment relationships: {counts.get(appt_file, 0)}")
     
-    return len(all_relationships)
+    return total, changed
 
-def generate_structure_report():
+def generate_structure_report(force=False):
     """Generate comprehensive structure phase report"""
     
     print("=" * 60)
@@ -168,7 +151,7 @@ def generate_structure_report():
     is_valid = validate_relationship_integrity()
     
     # Generate master relationships file
-    total_relationships = generate_master_relationships()
+    total_relationships, changed = generate_master_relationships(force=force)
     
     # Final summary
     print(f"\n" + "=" * 60)
@@ -187,7 +170,20 @@ def generate_structure_report():
         print(f"✅ All relationship data validated")
         print(f"✅ Master files generated for D3.js network graphs")
     
-    return is_valid, total_relationships
+    return is_valid, total_relationships, changed
 
 if __name__ == "__main__":
-    generate_structure_report()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Validate relationships and generate the master relationship file")
+    parser.add_argument('--force', action='store_true', help="ignore the build manifest and re-merge every source")
+    args = parser.parse_args()
+    
+    is_valid, total_relationships, changed = generate_structure_report(force=args.force)
+    if changed:
+        # Everything built from the relationship file (bundle artifacts, timeline,
+        # aggregates, sqlite, versions, snapshots) is rebuilt by the pipeline,
+        # which skips the stages still up to date
+        from pipeline import DEFAULT_SUMMARY_FILE, run_pipeline, write_summary
+        summary = run_pipeline(skip={'url_checks'})
+        write_summary(summary, DEFAULT_SUMMARY_FILE)
+        print(f"Rebuilt downstream artifacts in {summary['seconds']:.2f}s: "
+              + ', '.join(f"{count} {status}" for status, count in sorted(summary['counts'].items())))
\ No newline at end of file
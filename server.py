@@ -1,70 +1,808 @@
 #!/usr/bin/env python3
 """
-Simple HTTP server for San Diego Government Chart visualization
-Serves from project root - both dev and production use same paths
+HTTP server for the San Diego Government Chart, serving the project root
+Connections are handled on a bounded thread pool. --production adds pre-compressed
+assets, strong ETags/304s, byte ranges and cache headers; --preload serves the
+assets from memory. Data CSVs also answer column projections (?fields=) and
+/data/delta. The JSON API (scripts/server_api.py), watch-mode /events
+(scripts/data_watch.py) and /metrics with the profiler (scripts/server_metrics.py)
+are mixed into the request handler.
 """
 
+import argparse
+import email.utils
+import glob
+import gzip
+import hashlib
 import http.server
+import json
+import mimetypes
+import re
 import socketserver
 import os
 import sys
 import signal
 import threading
+import time
+import urllib.parse
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 
-def start_server(port=8012):
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+
+from compress_assets import ASSET_PATTERNS, MIN_SIZE, brotli
+from data_versions import VERSION_ID, DeltaFeed, default_versions_dir, record_version
+from data_watch import DEFAULT_POLL_INTERVAL, DataWatcher, EventBroadcaster, EventStreamMixin
+from datastore import DataStore
+from gov_db import build_database, default_database_path
+from server_api import AggregatesHolder, ApiHandlerMixin, GovIndexHolder, TimelineHolder
+from server_metrics import (DEFAULT_PROFILE_INTERVAL, MetricsHandlerMixin, RequestMetrics, SamplingProfiler,
+                            start_access_log)
+
+DEFAULT_WORKERS = 16
+# Seconds an idle keep-alive connection may hold its worker before it is closed
+KEEPALIVE_TIMEOUT = 2
+DEFAULT_WATCH_INTERVAL = 2.0  # seconds between preload change scans
+
+# Preloaded files above this size stay on disk and go out via sendfile
+PRELOAD_MAX_SIZE = 4 * 1024 * 1024
+# Large in-memory bodies are written in memoryview slices of this size
+WRITE_CHUNK = 256 * 1024
+
+# Filenames carrying a content hash (e.g. sd_gov_bundle.708a9e5d5726.json) never change
+HASHED_ASSET = re.compile(r'\.[0-9a-f]{8,}\.\w+$')
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'no-cache'
+
+# Pre-compressed siblings, in order of preference
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+# Data files that accept ?fields= and column filters
+DATA_CSV = re.compile(r'^/data/[\w.-]+\.csv$')
+BYTE_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+class ThreadPoolHTTPServer(socketserver.TCPServer):
+    """TCPServer that handles each connection on a bounded worker pool"""
+
+    allow_reuse_address = True
+
+    def __init__(self, server_address, handler_class, workers=DEFAULT_WORKERS, event_streams=0):
+        # Created first: a failed bind calls server_close() from TCPServer.__init__.
+        # Open /events streams hold a thread for good, so they get their own
+        # slots on top of the request workers
+        self.pool = ThreadPoolExecutor(max_workers=workers + event_streams, thread_name_prefix='http-worker')
+        # Each open connection holds a worker until it closes, idle keep-alive
+        # ones included. Past this many (queued ones counted), responses ask the
+        # client to close, so a quarter of the pool stays free for new clients
+        self.keepalive_limit = max(1, workers - workers // 4)
+        self.connections = 0
+        self.streams = 0
+        self._connections_lock = threading.Lock()
+        self.metrics = RequestMetrics()
+        self.profiler = None
+        self.events = None
+        super().__init__(server_address, handler_class)
+
+    def process_request(self, request, client_address):
+        with self._connections_lock:
+            self.connections += 1
+        self.pool.submit(self._process_request_worker, request, client_address)
+
+    def _process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            with self._connections_lock:
+                self.connections -= 1
+
+    def stream_opened(self, delta=1):
+        """Count an event stream in (delta=-1: out); streams use their own slots"""
+        with self._connections_lock:
+            self.streams += delta
+
+    def keepalive_full(self):
+        return self.connections - self.streams > self.keepalive_limit
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def parse_accept_encoding(header):
+    """Content codings an Accept-Encoding header allows: listed with q > 0, or
+    covered by a '*' with q > 0 and not refused by name"""
+    accepted, refused = set(), set()
+    for token in header.split(','):
+        coding, _, params = token.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0  # Unreadable weight: don't rely on the coding
+        (accepted if quality > 0 else refused).add(coding)
+    if '*' in accepted:
+        accepted |= {encoding for encoding, _ in ENCODINGS} - refused
+    return accepted
+
+
+def variant_etag(etag, encoding):
+    """Strong ETag of an encoded representation: the identity body's tag with a suffix"""
+    return f'{etag[:-1]}-{encoding}"' if encoding else etag
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_byte_range(header, length):
+    """Inclusive (start, end) for a single 'bytes=' range, or None to send the whole body
+
+    Multi-range and malformed headers are ignored, which HTTP allows.
+    """
+    match = BYTE_RANGE.match(header.strip())
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    if match.group(1) == '':
+        # Suffix range: the last N bytes
+        suffix = int(match.group(2))
+        if suffix == 0:
+            raise RangeNotSatisfiable()
+        return max(0, length - suffix), length - 1
+    start = int(match.group(1))
+    end = min(int(match.group(2)), length - 1) if match.group(2) else length - 1
+    if start >= length or end < start:
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+class FileSlice:
+    """Read-only view of count bytes of an open file, for copyfile()"""
+
+    def __init__(self, f, start, count):
+        self.f = f
+        self.remaining = count
+        f.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.f.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.f.close()
+
+
+class CORSRequestHandler(MetricsHandlerMixin, ApiHandlerMixin, EventStreamMixin,
+                         http.server.SimpleHTTPRequestHandler):
+    """Static file handler with CORS headers, the read-only JSON API and /metrics"""
+
+    def end_headers(self):
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        super().end_headers()
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if self.path.startswith('/api/'):
+            self.handle_api()
+        elif self.is_projection():
+            self.handle_projection()
+        elif path == '/data/delta':
+            self.handle_delta()
+        elif path == '/events':
+            self.handle_events()
+        elif path == '/metrics':
+            self.handle_metrics()
+        elif path == '/debug/profile':
+            self.handle_profile()
+        else:
+            super().do_GET()
+
+    def send_body(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def accepted_encodings(self):
+        return parse_accept_encoding(self.headers.get('Accept-Encoding', ''))
+
+    def send_not_modified(self, etag, cache_control=None):
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        if cache_control:
+            self.send_header('Cache-Control', cache_control)
+        self.send_header('Vary', 'Accept-Encoding')
+        self.end_headers()
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_body(status, body, 'application/json; charset=utf-8')
+
+    def is_projection(self):
+        """A data CSV requested with ?fields= and/or a filter on one of its columns
+
+        Any other query string (a cache buster such as ?v=2) gets the file itself.
+        """
+        parsed = urllib.parse.urlsplit(self.path)
+        if not parsed.query or DATA_CSV.match(parsed.path) is None:
+            return False
+        params = urllib.parse.parse_qs(parsed.query, keep_blank_values=True)
+        if 'fields' in params:
+            return True
+        store = self.server.data_store
+        filename = urllib.parse.unquote(parsed.path)[len('/data/'):]
+        if not os.path.isfile(store.path(filename)):
+            return False
+        fieldnames = store.table(filename).fieldnames
+        return any(name in fieldnames for name in params)
+
+    def handle_projection(self):
+        """Stream selected columns of the rows matching every column=value filter
+
+        /data/sd_gov_entities_complete.csv?fields=id,name&jurisdiction=City%20of%20San%20Diego
+        Repeating a filter matches any of its values. Rows come straight from the
+        parsed column store, written out in chunks as they are formatted.
+        """
+        parsed = urllib.parse.urlsplit(self.path)
+        filename = urllib.parse.unquote(parsed.path)[len('/data/'):]
+        store = self.server.data_store
+        if not os.path.isfile(store.path(filename)):
+            self.send_error(404, "File not found")
+            return
+
+        params = urllib.parse.parse_qs(parsed.query, keep_blank_values=True)
+        table = store.table(filename)
+        fields = [name for value in params.pop('fields', []) for name in value.split(',') if name]
+        unknown = [name for name in fields + list(params) if name not in table.fieldnames]
+        if unknown:
+            self.send_json(400, {'error': f"Unknown column(s) in {filename}: {', '.join(unknown)}"})
+            return
+
+        # Same file contents and same projection: same bytes
+        source_etag = file_etag(store.path(filename), os.stat(store.path(filename)))
+        query = urllib.parse.urlencode(sorted(params.items()), doseq=True)
+        etag = '"' + hashlib.sha256(f"{source_etag}|{','.join(fields)}|{query}".encode('utf-8')).hexdigest()[:32] + '"'
+        gzipped = 'gzip' in self.accepted_encodings()
+        etag = variant_etag(etag, 'gzip' if gzipped else None)
+        if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+            self.send_not_modified(etag)
+            return
+
+        positions = table.where(**params) if params else None
+        self.send_stream(table.iter_csv(fields or None, positions), 'text/csv; charset=utf-8', etag, gzipped)
+
+    def send_stream(self, chunks, content_type, etag, gzipped=False):
+        """Send text chunks as they are produced: chunked transfer on HTTP/1.1
+        (otherwise until the connection closes), gzip-encoded when gzipped"""
+        chunked = self.request_version == 'HTTP/1.1' and self.protocol_version == 'HTTP/1.1'
+        encoder = None
+        if gzipped:
+            encoder = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+
+        self.send_response(200)
+        self.send_header('Content-type', content_type)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('ETag', etag)
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoder:
+            self.send_header('Content-Encoding', 'gzip')
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            self.close_connection = True
+        self.end_headers()
+
+        def write(data):
+            if not data:
+                return
+            if chunked:
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+            else:
+                self.wfile.write(data)
+
+        for chunk in chunks:
+            data = chunk.encode('utf-8')
+            write(encoder.compress(data) if encoder else data)
+        if encoder:
+            write(encoder.flush())
+        if chunked:
+            self.wfile.write(b'0\r\n\r\n')
+
+    def handle_delta(self):
+        """Row-level changes since ?since=<version>, or the full snapshot when that
+        version is unknown or too far behind (the payload's format says which)"""
+        params = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(self.path).query))
+        feed = self.server.delta_feed
+        since = params.get('since', '')
+        if not VERSION_ID.match(since):
+            since = ''  # Unknown: the full snapshot (and nothing of it echoed into the ETag)
+        # Clients that accept gzip get gzip whenever the body is large enough, so
+        # their validator is kept apart from the identity one
+        accepts_gzip = 'gzip' in self.accepted_encodings()
+        try:
+            current = feed.current_version()
+            if current is None:
+                self.send_json(503, {'error': "No data version recorded yet; run scripts/pipeline.py"})
+                return
+            etag = variant_etag(f'"{since or "full"}-{current}"', 'gzip' if accepts_gzip else None)
+            if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+                self.send_not_modified(etag)
+                return
+            changes = feed.changes_since(since)
+        except FileNotFoundError:
+            self.send_json(503, {'error': "The current data snapshot is missing; run scripts/pipeline.py"})
+            return
+
+        body = json.dumps(changes, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        gzipped = accepts_gzip and len(body) >= MIN_SIZE
+        if gzipped:
+            body = gzip.compress(body, compresslevel=6)
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('ETag', etag)
+        self.send_header('Vary', 'Accept-Encoding')
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        self.wfile.write(body)
+
+
+_etag_cache = {}
+_etag_lock = threading.Lock()
+
+
+def file_etag(path, stat_result):
+    """Strong ETag from the file's content hash, cached per (mtime, size)"""
+    key = (path, stat_result.st_mtime_ns, stat_result.st_size)
+    with _etag_lock:
+        etag = _etag_cache.get(key)
+    if etag is None:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                digest.update(chunk)
+        etag = f'"{digest.hexdigest()[:32]}"'
+        with _etag_lock:
+            _etag_cache[key] = etag
+    return etag
+
+
+class ProductionRequestHandler(CORSRequestHandler):
+    """Adds pre-compressed variants, strong ETags, 304s and cache headers"""
+
+    protocol_version = 'HTTP/1.1'
+    # Idle keep-alive connections release their worker after this many seconds
+    timeout = KEEPALIVE_TIMEOUT
+
+    def end_headers(self):
+        if not self.close_connection and self.server.keepalive_full():
+            self.send_header('Connection', 'close')  # Also sets close_connection
+        super().end_headers()
+
+    def cache_control(self, path):
+        if HASHED_ASSET.search(os.path.basename(path)):
+            return IMMUTABLE_CACHE
+        return REVALIDATE_CACHE
+
+    def negotiate_encoding(self, path):
+        """Pick a fresh .br/.gz sibling the client accepts; returns (encoding, path)"""
+        accepted = self.accepted_encodings()
+        source_mtime = os.stat(path).st_mtime
+        for encoding, suffix in ENCODINGS:
+            variant = path + suffix
+            if encoding in accepted and os.path.isfile(variant) \
+                    and os.stat(variant).st_mtime >= source_mtime:
+                return encoding, variant
+        return None, path
+
+    def etag_matches(self, etag):
+        if_none_match = self.headers.get('If-None-Match')
+        if not if_none_match:
+            return False
+        candidates = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in candidates or etag in candidates
+
+    def requested_range(self, etag, length):
+        """(start, end) of a resumable download, or None to send the whole body
+
+        The range applies to the representation being sent; If-Range naming an
+        older ETag gets the whole, current body.
+        """
+        header = self.headers.get('Range')
+        if not header or self.command != 'GET':
+            return None
+        if_range = self.headers.get('If-Range')
+        if if_range and if_range.strip() != etag:
+            return None
+        return parse_byte_range(header, length)
+
+    def send_range_not_satisfiable(self, length):
+        self.send_response(416)
+        self.send_header('Content-Range', f'bytes */{length}')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        # Directories (index.html lookup, redirects, listings) and 404s keep the default handling
+        if not os.path.isfile(path):
+            return super().send_head()
+
+        encoding, body_path = self.negotiate_encoding(path)
+        try:
+            f = open(body_path, 'rb')
+        except OSError:
+            self.send_error(404, "File not found")
+            return None
+
+        try:
+            fs = os.fstat(f.fileno())
+            etag = file_etag(body_path, fs)
+            cache_control = self.cache_control(path)
+
+            if self.etag_matches(etag):
+                self.send_not_modified(etag, cache_control)
+                f.close()
+                return None
+
+            try:
+                byte_range = self.requested_range(etag, fs.st_size)
+            except RangeNotSatisfiable:
+                self.send_range_not_satisfiable(fs.st_size)
+                f.close()
+                return None
+
+            if byte_range:
+                start, end = byte_range
+                self.send_response(206)
+                self.send_header('Content-Range', f'bytes {start}-{end}/{fs.st_size}')
+                self.send_header('Content-Length', str(end - start + 1))
+            else:
+                self.send_response(200)
+                self.send_header('Content-Length', str(fs.st_size))
+            self.send_header('Content-type', self.guess_type(path))
+            self.send_header('Last-Modified', email.utils.formatdate(fs.st_mtime, usegmt=True))
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', cache_control)
+            self.send_header('Vary', 'Accept-Encoding')
+            self.send_header('Accept-Ranges', 'bytes')
+            if encoding:
+                self.send_header('Content-Encoding', encoding)
+            self.end_headers()
+            return FileSlice(f, byte_range[0], byte_range[1] - byte_range[0] + 1) if byte_range else f
+        except Exception:
+            f.close()
+            raise
+
+
+class PreloadedAsset:
+    """One servable file held in memory with its variants and fixed headers"""
+
+    def __init__(self, path, cache_control):
+        stat_result = os.stat(path)
+        self.path = path
+        self.cache_control = cache_control
+        self.size = stat_result.st_size
+        # Identifies the file the headers were made from
+        self.stat_key = (stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size)
+        self.in_memory = self.size <= PRELOAD_MAX_SIZE
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        last_modified = email.utils.formatdate(stat_result.st_mtime, usegmt=True)
+
+        # encoding -> (body or None for file-backed, length, etag)
+        self.variants = {}
+        if self.in_memory:
+            with open(path, 'rb') as f:
+                body = f.read()
+            self.variants[None] = (body, len(body), f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+            if len(body) >= MIN_SIZE:
+                compressed = gzip.compress(body, compresslevel=9, mtime=0)
+                self.variants['gzip'] = (compressed, len(compressed), self._etag(compressed))
+                if brotli is not None:
+                    compressed = brotli.compress(body, quality=11)
+                    self.variants['br'] = (compressed, len(compressed), self._etag(compressed))
+        else:
+            self.variants[None] = (None, self.size, file_etag(path, stat_result))
+
+        self.headers = [
+            ('Content-type', content_type),
+            ('Last-Modified', last_modified),
+            ('Cache-Control', cache_control),
+            ('Vary', 'Accept-Encoding')
+        ]
+
+    @staticmethod
+    def _etag(body):
+        return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+class AssetStore:
+    """In-memory copy of the servable tree, swapped atomically on reload"""
+
+    def __init__(self, root_dir):
+        self.root_dir = os.path.abspath(root_dir)
+        self.assets = {}
+        self.signature = None
+        self._reload_lock = threading.Lock()
+        self.reload()
+
+    def scan(self):
+        """Return {url_path: file_path} for every servable file"""
+        found = {}
+        for pattern in ASSET_PATTERNS:
+            for path in glob.glob(os.path.join(self.root_dir, pattern)):
+                url_path = '/' + os.path.relpath(path, self.root_dir).replace(os.sep, '/')
+                found[url_path] = path
+        return found
+
+    def current_signature(self, found=None):
+        """Cheap change fingerprint: (path, mtime, size) of every servable file"""
+        found = self.scan() if found is None else found
+        signature = []
+        for url_path, path in sorted(found.items()):
+            try:
+                stat_result = os.stat(path)
+            except OSError:
+                continue
+            signature.append((url_path, stat_result.st_mtime_ns, stat_result.st_size))
+        return tuple(signature)
+
+    def reload(self):
+        """Rebuild every asset off to the side, then swap the table in one assignment"""
+        with self._reload_lock:
+            found = self.scan()
+            signature = self.current_signature(found)
+            assets = {}
+            for url_path, path in found.items():
+                cache_control = IMMUTABLE_CACHE if HASHED_ASSET.search(url_path) else REVALIDATE_CACHE
+                try:
+                    assets[url_path] = PreloadedAsset(path, cache_control)
+                except OSError:
+                    continue  # File vanished mid-regeneration; the next scan picks it up
+            if '/index.html' in assets:
+                assets['/'] = assets['/index.html']
+            self.assets = assets
+            self.signature = signature
+            total = sum(asset.size for asset in assets.values())
+            print(f"Preloaded {len(found)} assets ({total / 1024:.1f} KB)")
+
+    def reload_if_changed(self):
+        if self.current_signature() != self.signature:
+            self.reload()
+
+    def watch(self, interval):
+        """Poll for changes in a daemon thread so regenerated data goes live"""
+        def poll():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.reload_if_changed()
+                except Exception as e:
+                    print(f"❌ Asset reload failed: {e}")
+        thread = threading.Thread(target=poll, name='asset-watcher', daemon=True)
+        thread.start()
+        return thread
+
+
+class PreloadedRequestHandler(ProductionRequestHandler):
+    """Serves preloaded assets from memory, falling back to the filesystem"""
+
+    def do_GET(self):
+        # Projections are computed per query; the preloaded copy is the whole file
+        if self.is_projection() or not self.send_preloaded(head_only=False):
+            super().do_GET()
+
+    def do_HEAD(self):
+        if not self.send_preloaded(head_only=True):
+            super().do_HEAD()
+
+    def send_preloaded(self, head_only):
+        """Answer from the asset store; returns False when the path is not preloaded"""
+        url_path = urllib.parse.unquote(self.path.split('?', 1)[0].split('#', 1)[0])
+        asset = self.server.asset_store.assets.get(url_path)
+        self.server.metrics.asset_lookup(asset is not None)
+        if asset is None:
+            return False
+
+        accepted = self.accepted_encodings()
+        encoding = next((enc for enc, _ in ENCODINGS if enc in accepted and enc in asset.variants), None)
+        body, length, etag = asset.variants[encoding]
+
+        f = None
+        if body is None:
+            # Large file kept on disk: only serve it with the preloaded headers
+            # while it is still the file they were made from
+            try:
+                f = open(asset.path, 'rb')
+            except OSError:
+                return False
+            fs = os.fstat(f.fileno())
+            if (fs.st_ino, fs.st_mtime_ns, fs.st_size) != asset.stat_key:
+                f.close()
+                return False  # Regenerated since the last reload: the filesystem path serves it
+        try:
+            return self.send_asset(asset, encoding, body, length, etag, f, head_only)
+        finally:
+            if f is not None:
+                f.close()
+
+    def send_asset(self, asset, encoding, body, length, etag, f, head_only):
+        """Send one variant: from memory, or from the open file f when body is None"""
+        if self.etag_matches(etag):
+            self.send_not_modified(etag, asset.cache_control)
+            return True
+
+        try:
+            byte_range = self.requested_range(etag, length)
+        except RangeNotSatisfiable:
+            self.send_range_not_satisfiable(length)
+            return True
+        start, end = byte_range or (0, length - 1)
+
+        self.send_response(206 if byte_range else 200)
+        for name, value in asset.headers:
+            self.send_header(name, value)
+        if byte_range:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{length}')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('ETag', etag)
+        self.send_header('Accept-Ranges', 'bytes')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.end_headers()
+
+        if head_only:
+            return True
+        if body is None:
+            # Zero-copy sendfile straight to the socket, from the file checked above
+            self.connection.sendfile(f, start, end - start + 1)
+            self.wfile.count += end - start + 1
+        else:
+            view = memoryview(body)
+            for offset in range(start, end + 1, WRITE_CHUNK):
+                self.wfile.write(view[offset:min(offset + WRITE_CHUNK, end + 1)])
+        return True
+
+
+def start_server(port=8012, production=False, workers=DEFAULT_WORKERS, preload=False,
+                 watch_interval=DEFAULT_WATCH_INTERVAL, backend='memory', log_format='text',
+                 profile=False, profile_interval=DEFAULT_PROFILE_INTERVAL, watch=False,
+                 watch_poll=DEFAULT_POLL_INTERVAL):
     """Start simple HTTP server for development from project root"""
-    
+
     # Global server reference for signal handler
     httpd = None
-    
+    data_watcher = None
+    # Access lines are queued by request threads and written by a background thread
+    log_listener = start_access_log(log_format)
+
     def signal_handler(sig, frame):
         """Handle Ctrl+C properly"""
         print(f"\n⏹️  Shutting down server...")
+        if data_watcher:
+            data_watcher.stop()
         if httpd:
-            httpd.shutdown()
+            if httpd.events:
+                httpd.events.close()  # Event streams would otherwise hold worker threads open
+            # shutdown() blocks until serve_forever exits, so run it off the main thread
+            threading.Thread(target=httpd.shutdown, daemon=True).start()
             httpd.server_close()
+        log_listener.stop()
         sys.exit(0)
-    
+
     # Register signal handler
     signal.signal(signal.SIGINT, signal_handler)
     if sys.platform == "win32":
         signal.signal(signal.SIGBREAK, signal_handler)  # Windows specific
-    
-    # Set up handler with CORS headers for local development
-    class CORSRequestHandler(http.server.SimpleHTTPRequestHandler):
-        def end_headers(self):
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-            super().end_headers()
-
-        def log_message(self, format, *args):
-            # Cleaner logging
-            print(f"[{self.address_string()}] {format % args}")
+
+    if preload:
+        handler_class = PreloadedRequestHandler
+        production = True
+    else:
+        handler_class = ProductionRequestHandler if production else CORSRequestHandler
 
     try:
-        # Use SO_REUSEADDR to avoid "Address already in use" errors
-        socketserver.TCPServer.allow_reuse_address = True
-        httpd = socketserver.TCPServer(("", port), CORSRequestHandler)
-        
-        print(f"San Diego Government Chart Development Server")
+        # allow_reuse_address (SO_REUSEADDR) avoids "Address already in use" errors
+        # Watch mode: up to half as many /events streams again, on top of the workers
+        event_streams = max(1, workers // 2) if watch else 0
+        httpd = ThreadPoolHTTPServer(("", port), handler_class, workers=workers, event_streams=event_streams)
+
+        data_dir = os.path.join(os.getcwd(), 'data')
+        if backend == 'sqlite' and not os.path.exists(default_database_path(data_dir)):
+            build_database(data_dir)
+        httpd.gov_index = GovIndexHolder(data_dir, backend)
+        # Development servers never write into data/: versions come from the
+        # pipeline's versions stage, and /data/delta answers 503 until there is one
+        if production and not os.path.exists(os.path.join(default_versions_dir(data_dir), 'history.json')):
+            record_version(data_dir)
+        httpd.delta_feed = DeltaFeed(default_versions_dir(data_dir))
+        httpd.data_store = DataStore(data_dir)
+        httpd.timeline = TimelineHolder(data_dir)
+        httpd.aggregates = AggregatesHolder(data_dir)
+
+        if preload:
+            httpd.asset_store = AssetStore(os.getcwd())
+            if watch_interval > 0:
+                httpd.asset_store.watch(watch_interval)
+            if hasattr(signal, 'SIGHUP'):
+                # kill -HUP <pid> reloads immediately; reload runs off the signal frame
+                signal.signal(signal.SIGHUP, lambda sig, frame: threading.Thread(
+                    target=httpd.asset_store.reload, daemon=True).start())
+
+        if watch:
+            # Capped at the stream slots, so open tabs can never starve real requests
+            httpd.events = EventBroadcaster(event_streams)
+            last_version = [httpd.delta_feed.current_version()]
+
+            def on_rebuild(change):
+                if preload:
+                    httpd.asset_store.reload_if_changed()  # Serve the new files before announcing them
+                change['version'] = httpd.delta_feed.current_version()
+                change['data_changed'] = change['version'] != last_version[0] or bool(change['artifacts'])
+                last_version[0] = change['version']
+                httpd.events.publish('rebuild', change)
+
+            data_watcher = DataWatcher(data_dir, on_rebuild, interval=watch_poll).start()
+
+        if profile:
+            httpd.profiler = SamplingProfiler(profile_interval).start()
+            if hasattr(signal, 'SIGUSR1'):
+                # kill -USR1 <pid> dumps the hottest stacks to stderr
+                signal.signal(signal.SIGUSR1, lambda sig, frame: sys.stderr.write(httpd.profiler.report()))
+
+        print(f"San Diego Government Chart {'Production' if production else 'Development'} Server")
         print(f"Serving from: {os.getcwd()}")
         print(f"Available at: http://localhost:{port}")
+        print(f"Worker threads: {workers}{f' (+{event_streams} for event streams)' if event_streams else ''}")
+        print(f"API backend: {backend}")
+        if production:
+            print(f"Compression, ETags and cache headers: enabled")
+        if preload:
+            print(f"In-memory asset store: enabled (reload with SIGHUP"
+                  f"{f' or every {watch_interval:g}s on change' if watch_interval > 0 else ''})")
+        if watch:
+            print(f"Watch mode: rebuilding on data/ changes (polled every {watch_poll * 1000:g}ms), "
+                  f"pushed to pages via /events")
+        if profile:
+            print(f"Sampling profiler: every {profile_interval * 1000:g}ms (/debug/profile or SIGUSR1)")
         print(f"")
         print(f"📊 Network View: http://localhost:{port}")
         print(f"🌳 Org Chart: http://localhost:{port}/orgchart.html")
         print(f"📁 Data files: /data/")
+        print(f"🔎 JSON API: /api/entities, /api/relationships, /api/subgraph, /api/search, "
+              f"/api/as_of, /api/stale, /api/aggregates")
+        print(f"🔁 Data deltas: /data/delta?since=<version>")
+        print(f"📈 Metrics: http://localhost:{port}/metrics")
         print(f"")
         print(f"Press Ctrl+C to stop (or Ctrl+Break on Windows)")
         print(f"PID: {os.getpid()}")
-        
+
         httpd.serve_forever()
-        
+
     except KeyboardInterrupt:
         print(f"\n⏹️  Development server stopped")
+        if data_watcher:
+            data_watcher.stop()
         if httpd:
-            httpd.shutdown()
             httpd.server_close()
+        log_listener.stop()
         sys.exit(0)
     except OSError as e:
         if "Address already in use" in str(e):
@@ -76,12 +814,32 @@ def start_server(port=8012):
         sys.exit(1)
 
 if __name__ == "__main__":
-    port = 8012
-    if len(sys.argv) > 1:
-        try:
-            port = int(sys.argv[1])
-        except ValueError:
-            print("Usage: python3 server.py [port]")
-            sys.exit(1)
-    
-    start_server(port)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="San Diego Government Chart server")
+    parser.add_argument('port', nargs='?', type=int, default=8012)
+    parser.add_argument('--production', action='store_true',
+                        help="serve .br/.gz siblings with strong ETags, 304s and cache headers")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f"request worker threads (default: {DEFAULT_WORKERS})")
+    parser.add_argument('--preload', action='store_true',
+                        help="serve the static tree from memory (implies --production)")
+    parser.add_argument('--watch-interval', type=float, default=DEFAULT_WATCH_INTERVAL,
+                        help="seconds between preload change scans, 0 to disable")
+    parser.add_argument('--backend', choices=['memory', 'sqlite'], default='memory',
+                        help="JSON API backend: in-memory indexes over the CSVs, or data/sd_gov.sqlite")
+    parser.add_argument('--log-format', choices=['text', 'json'], default='text',
+                        help="access log format (default: text)")
+    parser.add_argument('--profile', action='store_true',
+                        help="run the sampling profiler; read it at /debug/profile or with SIGUSR1")
+    parser.add_argument('--watch', action='store_true',
+                        help="rebuild the affected pipeline stages when data/ changes and notify open pages")
+    parser.add_argument('--watch-poll', type=float, default=DEFAULT_POLL_INTERVAL * 1000,
+                        help=f"milliseconds between --watch scans of data/ (default: {DEFAULT_POLL_INTERVAL * 1000:g})")
+    parser.add_argument('--profile-interval', type=float, default=DEFAULT_PROFILE_INTERVAL * 1000,
+                        help="milliseconds between profiler samples (default: 10)")
+    args = parser.parse_args()
+
+    start_server(args.port, production=args.production, workers=args.workers,
+                 preload=args.preload, watch_interval=args.watch_interval, backend=args.backend,
+                 log_format=args.log_format, profile=args.profile,
+                 profile_interval=args.profile_interval / 1000, watch=args.watch,
+                 watch_poll=args.watch_poll / 1000)
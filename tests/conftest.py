@@ -0,0 +1,8 @@
+"""Make the standalone scripts (and server.py) importable the way they import each other"""
+
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+sys.path.insert(0, ROOT)
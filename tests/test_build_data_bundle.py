@@ -0,0 +1,28 @@
+"""Hashed artifact generations in data/bundle/"""
+
+import os
+
+from build_data_bundle import update_manifest, write_hashed_artifact
+
+
+def test_previous_generation_is_kept_until_superseded(tmp_path):
+    bundle_dir = str(tmp_path)
+    names = []
+    for payload in [b'{"v":1}', b'{"v":2}', b'{"v":3}']:
+        path = write_hashed_artifact(bundle_dir, 'sd_gov_test', payload)
+        names.append(os.path.basename(path))
+        with open(path + '.gz', 'wb') as f:
+            f.write(b'')
+        update_manifest(bundle_dir, 'test', path)
+
+    remaining = sorted(name for name in os.listdir(bundle_dir) if name.startswith('sd_gov_test'))
+    # The first generation and its sibling are pruned; the one a loaded page may still hold is kept
+    assert remaining == sorted([names[1], names[1] + '.gz', names[2], names[2] + '.gz'])
+
+
+def test_rewriting_the_current_payload_keeps_it(tmp_path):
+    path = write_hashed_artifact(str(tmp_path), 'sd_gov_test', b'{}')
+    update_manifest(str(tmp_path), 'test', path)
+    assert write_hashed_artifact(str(tmp_path), 'sd_gov_test', b'{}') == path
+    with open(path, 'rb') as f:
+        assert f.read() == b'{}'
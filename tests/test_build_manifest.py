@@ -0,0 +1,91 @@
+"""Incremental master-file regeneration and keyed upserts"""
+
+import os
+
+import pytest
+
+from build_manifest import BuildManifest, incremental_merge, upsert_csv
+
+HEADERS = ['id', 'name', 'last_verified']
+
+
+def normalize(row):
+    return {'id': row['id'], 'name': row['name'], 'last_verified': row.get('last_verified') or ''}
+
+
+@pytest.fixture
+def build(tmp_path):
+    """(sources, output path, merge()) for two source files feeding one master file"""
+    first = tmp_path / 'first.csv'
+    second = tmp_path / 'second.csv'
+    first.write_text('id,name,last_verified\na,Alpha,2024-01-01\nb,Beta,2024-01-01\n')
+    second.write_text('id,name,last_verified\nc,Gamma,2024-01-01\n')
+    sources = [(str(first), normalize), (str(second), normalize)]
+    output = str(tmp_path / 'master.csv')
+    manifest_path = str(tmp_path / 'manifest.json')
+
+    def merge(force=False):
+        return incremental_merge('test', sources, 'id', HEADERS, output,
+                                 manifest=BuildManifest(manifest_path), force=force)
+    return first, second, output, merge
+
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_rerun_is_a_no_op(build):
+    first, second, output, merge = build
+    counts, changed = merge()
+    assert changed and counts == {str(first): 2, str(second): 1}
+    text = read(output)
+    assert text == 'id,name,last_verified\na,Alpha,2024-01-01\nb,Beta,2024-01-01\nc,Gamma,2024-01-01\n'
+
+    mtime = os.stat(output).st_mtime_ns
+    assert merge() == (counts, False)
+    assert merge(force=True) == (counts, False)  # Re-merged from scratch, same bytes: not rewritten
+    assert read(output) == text and os.stat(output).st_mtime_ns == mtime
+
+
+def test_changed_source_keeps_unmanaged_columns(build):
+    first, second, output, merge = build
+    merge()
+    # Hand-enriched column the sources don't carry
+    with open(output, 'w', encoding='utf-8') as f:
+        f.write('id,name,last_verified,photo_url\na,Alpha,2024-01-01,a.jpg\n'
+                'b,Beta,2024-01-01,b.jpg\nc,Gamma,2024-01-01,c.jpg\n')
+    merge()
+
+    first.write_text('id,name,last_verified\na,Alpha Prime,\nb,Beta,2024-01-01\n')
+    counts, changed = merge()
+    assert changed
+    assert read(output) == ('id,name,last_verified,photo_url\na,Alpha Prime,2024-01-01,a.jpg\n'
+                            'b,Beta,2024-01-01,b.jpg\nc,Gamma,2024-01-01,c.jpg\n')
+    assert merge() == (counts, False)
+
+
+def test_upsert_is_idempotent_and_keyed(tmp_path):
+    output = str(tmp_path / 'boards.csv')
+    with open(output, 'w', encoding='utf-8') as f:
+        # b appears twice: left behind by an older append
+        f.write('id,name,website_url\na,Alpha,http://a\nb,Beta,\nc,Gamma,\nb,Beta,\n')
+    rows = [{'id': 'b', 'name': 'Beta Board'}, {'id': 'd', 'name': 'Delta'}]
+
+    stats = upsert_csv(output, rows, 'id', ['id', 'name', 'website_url'])
+    assert stats == {'inserted': 1, 'updated': 1, 'unchanged': 0, 'deduplicated': 1, 'total': 4, 'written': True}
+    expected = 'id,name,website_url\na,Alpha,http://a\nb,Beta Board,\nc,Gamma,\nd,Delta,\n'
+    assert read(output) == expected
+
+    mtime = os.stat(output).st_mtime_ns
+    stats = upsert_csv(output, rows, 'id', ['id', 'name', 'website_url'])
+    assert stats == {'inserted': 0, 'updated': 0, 'unchanged': 2, 'deduplicated': 0, 'total': 4, 'written': False}
+    assert read(output) == expected and os.stat(output).st_mtime_ns == mtime
+
+
+def test_upsert_keeps_columns_the_row_does_not_carry(tmp_path):
+    output = str(tmp_path / 'boards.csv')
+    upsert_csv(output, [{'id': 'a', 'name': 'Alpha', 'website_url': 'http://a'}], 'id',
+               ['id', 'name', 'website_url'])
+    upsert_csv(output, [{'id': 'a', 'name': 'Alpha Board'}], 'id', ['id', 'name', 'website_url'])
+    assert read(output) == 'id,name,website_url\na,Alpha Board,http://a\n'
@@ -0,0 +1,46 @@
+"""Oversight cycles in the precomputed org chart hierarchy"""
+
+from build_org_hierarchy import build_children, build_tree, compile_hierarchy, find_cycles
+
+
+def entity(entity_id):
+    return {'id': entity_id, 'jurisdiction': 'City of San Diego'}
+
+
+def rel(parent, child, relationship_type='oversees'):
+    return {'source_entity_id': parent, 'target_entity_id': child, 'relationship_type': relationship_type}
+
+
+def tree_ids(root):
+    """Ids in depth-first order (iterative: the trees can be deep)"""
+    ids, stack = [], [root]
+    while stack:
+        node = stack.pop()
+        ids.append(node['id'])
+        stack.extend(reversed(node['children']))
+    return ids
+
+
+def test_loop_is_reported_and_each_entity_placed_once():
+    entities = [entity(entity_id) for entity_id in ['mayor', 'a', 'b', 'c', 'x', 'y']]
+    relationships = [rel('mayor', 'a'), rel('a', 'b'), rel('b', 'c', 'reports_to'), rel('c', 'a'),
+                     # A loop nothing outside it oversees: only reachable through the cycle
+                     rel('x', 'y'), rel('y', 'x', 'reports_to')]
+
+    hierarchy = compile_hierarchy(entities, relationships)
+    assert sorted(hierarchy['cycles']) == [['a', 'b', 'c', 'a'], ['x', 'y', 'x']]
+
+    trees = hierarchy['jurisdictions']['city']
+    assert [tree_ids(tree) for tree in trees] == [['mayor', 'a', 'b', 'c'], ['x', 'y']]
+    assert hierarchy['jurisdictions']['county'] == hierarchy['jurisdictions']['regional'] == []
+
+
+def test_deep_chain_and_self_loop():
+    ids = [f'e{i}' for i in range(5000)]
+    children, _ = build_children([rel(parent, child) for parent, child in zip(ids, ids[1:])] + [rel('e0', 'e0')])
+    assert find_cycles(ids, children) == [['e0', 'e0']]
+
+    # Far past the recursion limit: the iterative build still finishes
+    reached = set()
+    tree = build_tree('e0', children, set(ids), reached)
+    assert tree_ids(tree) == ids and reached == set(ids)
@@ -0,0 +1,88 @@
+"""Recorded data versions, delta composition and the delta feed"""
+
+import os
+import threading
+
+import pytest
+
+from data_versions import DELTA_FORMAT, DeltaFeed, compose_deltas, default_versions_dir, record_version
+
+FIELDS = ['id', 'name']
+
+
+def delta(old, new, added=(), changed=(), removed=()):
+    return {'format': DELTA_FORMAT, 'from': old, 'to': new, 'tables': {'entities': {
+        'key': 'id', 'fields': FIELDS, 'added': list(added), 'changed': list(changed), 'removed': list(removed)}}}
+
+
+def test_compose_add_remove_readd():
+    entities = lambda composed: {op: composed['tables']['entities'][op] for op in ('added', 'changed', 'removed')}
+
+    # Added then removed within the chain: the client never saw it
+    composed = compose_deltas([delta('v1', 'v2', added=[['x', 'X']]), delta('v2', 'v3', removed=['x'])])
+    assert (composed['from'], composed['to']) == ('v1', 'v3')
+    assert entities(composed) == {'added': [], 'changed': [], 'removed': []}
+
+    # Removed then re-added: the client still holds the old row, so it changed
+    composed = compose_deltas([delta('v1', 'v2', removed=['a']), delta('v2', 'v3', added=[['a', 'A2']])])
+    assert entities(composed) == {'added': [], 'changed': [['a', 'A2']], 'removed': []}
+
+    # Added, removed, re-added, then edited: one add with the latest row
+    composed = compose_deltas([delta('v1', 'v2', added=[['x', 'X']]), delta('v2', 'v3', removed=['x']),
+                               delta('v3', 'v4', added=[['x', 'X2']]), delta('v4', 'v5', changed=[['x', 'X3']])])
+    assert entities(composed) == {'added': [['x', 'X3']], 'changed': [], 'removed': []}
+
+    # Changed then removed: removed
+    composed = compose_deltas([delta('v1', 'v2', changed=[['a', 'A2']]), delta('v2', 'v3', removed=['a'])])
+    assert entities(composed) == {'added': [], 'changed': [], 'removed': ['a']}
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    (tmp_path / 'sd_gov_relationships_complete.csv').write_text('relationship_id,from\nr1,a\n')
+    return tmp_path
+
+
+def write_entities(data_dir, rows):
+    (data_dir / 'sd_gov_entities_complete.csv').write_text(
+        'id,name\n' + ''.join(f'{key},{name}\n' for key, name in rows))
+
+
+def test_feed_composes_recorded_versions(data_dir):
+    versions = []
+    for rows in [[('a', 'Alpha'), ('b', 'Beta')], [('a', 'Alpha')], [('a', 'Alpha'), ('b', 'Beta 2')]]:
+        write_entities(data_dir, rows)
+        record_version(str(data_dir))
+        feed = DeltaFeed(default_versions_dir(str(data_dir)))
+        versions.append(feed.current_version())
+
+    change = feed.changes_since(versions[0])['tables']['entities']
+    assert (change['added'], change['changed'], change['removed']) == ([], [['b', 'Beta 2']], [])
+    assert feed.changes_since(versions[-1])['tables'] == {}
+    assert feed.changes_since('unknown')['format'] == 'sd_gov_snapshot'
+
+
+def test_missing_snapshot_fails_instead_of_hanging(data_dir):
+    write_entities(data_dir, [('a', 'Alpha')])
+    record_version(str(data_dir))
+    versions_dir = default_versions_dir(str(data_dir))
+    for name in os.listdir(versions_dir):
+        if name.startswith('snapshot.'):
+            os.remove(os.path.join(versions_dir, name))
+
+    outcome = []
+
+    def current_version():
+        try:
+            DeltaFeed(versions_dir).current_version()
+        except FileNotFoundError as e:
+            outcome.append(e)
+    thread = threading.Thread(target=current_version, daemon=True)
+    thread.start()
+    thread.join(5)
+    assert not thread.is_alive() and len(outcome) == 1
+
+
+def test_feed_without_history(tmp_path):
+    feed = DeltaFeed(str(tmp_path / 'versions'))
+    assert feed.current_version() is None
@@ -0,0 +1,61 @@
+"""The column store's memory-mapped parse cache"""
+
+import os
+
+from datastore import DataStore, load_table
+
+
+def write(path, text, mtime_ns=None):
+    path.write_text(text)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def names(table):
+    return list(table.column('name'))
+
+
+def test_same_size_rewrite_with_the_same_mtime_is_not_served_stale(tmp_path):
+    csv_file = tmp_path / 'sd_gov_test.csv'
+    write(csv_file, 'id,name\na,Alpha\n')
+    mtime_ns = os.stat(csv_file).st_mtime_ns
+    cache_dir = str(tmp_path / 'tables')
+    assert names(load_table(str(csv_file), cache_dir=cache_dir)) == ['Alpha']
+
+    # Rewritten in place within the timestamp granularity: same size, same mtime, same inode
+    write(csv_file, 'id,name\na,Alfa!\n', mtime_ns)
+    assert names(load_table(str(csv_file), cache_dir=cache_dir)) == ['Alfa!']
+
+
+def test_old_entries_are_used_without_rehashing(tmp_path, monkeypatch):
+    csv_file = tmp_path / 'sd_gov_test.csv'
+    write(csv_file, 'id,name\na,Alpha\n', 10 ** 9)  # Written long before it was parsed
+    cache_dir = str(tmp_path / 'tables')
+    load_table(str(csv_file), cache_dir=cache_dir)
+
+    monkeypatch.setattr('datastore._content_hash', lambda path: 1 / 0)
+    monkeypatch.setattr('datastore.parse_csv', lambda *args: 1 / 0)
+    assert names(load_table(str(csv_file), cache_dir=cache_dir)) == ['Alpha']
+
+
+def test_corrupt_cache_is_rebuilt(tmp_path):
+    csv_file = tmp_path / 'sd_gov_test.csv'
+    write(csv_file, 'id,name\na,Alpha\nb,Beta\n')
+    os.utime(csv_file, ns=(10 ** 9, 10 ** 9))
+    cache_dir = tmp_path / 'tables'
+    load_table(str(csv_file), cache_dir=str(cache_dir))
+    (cache_path,) = cache_dir.iterdir()
+
+    data = cache_path.read_bytes()
+    for damaged in [data[:len(data) // 2], data[:20], data[:16] + b'{not json' + data[25:], b'']:
+        cache_path.write_bytes(damaged)
+        assert names(load_table(str(csv_file), cache_dir=str(cache_dir))) == ['Alpha', 'Beta']
+
+
+def test_data_store_reloads_a_racy_rewrite(tmp_path):
+    write(tmp_path / 'sd_gov_test.csv', 'id,name\na,Alpha\n')
+    mtime_ns = os.stat(tmp_path / 'sd_gov_test.csv').st_mtime_ns
+    store = DataStore(str(tmp_path), cache_dir=str(tmp_path / 'tables'))
+    assert names(store.table('sd_gov_test.csv')) == ['Alpha']
+    write(tmp_path / 'sd_gov_test.csv', 'id,name\na,Gamma\n', mtime_ns)
+    assert names(store.table('sd_gov_test.csv')) == ['Gamma']
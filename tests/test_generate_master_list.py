@@ -0,0 +1,75 @@
+"""Sharded external merge of the entity sources into the master file"""
+
+import csv
+
+import pytest
+
+from build_manifest import BuildManifest
+from generate_master_list import MASTER_HEADERS, merge_sources, regenerate_master_entities
+
+HEADER = 'id,name,type,jurisdiction\n'
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    (tmp_path / 'sd_gov_elected.csv').write_text(HEADER + 'mayor-001,Mayor,Mayor,City of San Diego\n')
+    (tmp_path / 'sd_gov_city_departments.csv').write_text(
+        HEADER + ''.join(f'dept-{i:03d},Dept {i},Department,City of San Diego\n' for i in (5, 1, 3, 2, 4))
+        + 'mayor-001,Mayor Again,Mayor,City of San Diego\n')
+    (tmp_path / 'sd_gov_boards_commissions.csv').write_text(
+        HEADER + 'board-001,Board,Board,City of San Diego\ndept-003,Shadow Dept,Board,City of San Diego\n')
+    return tmp_path
+
+
+def master_ids(data_dir):
+    with open(data_dir / 'sd_gov_entities_complete.csv', newline='', encoding='utf-8') as f:
+        return [row['id'] for row in csv.DictReader(f)]
+
+
+def test_merge_dedups_and_keeps_source_order(data_dir, tmp_path_factory):
+    sources = [(str(data_dir / name), label) for name, label in [
+        ('sd_gov_elected.csv', 'Elected'), ('sd_gov_city_departments.csv', 'City'),
+        ('sd_gov_boards_commissions.csv', 'Boards')]]
+    output = str(data_dir / 'sd_gov_entities_complete.csv')
+    run_dir = str(tmp_path_factory.mktemp('runs'))
+
+    # Two-row runs: every shard spills several runs for the k-way merge
+    counts, (duplicate_count, duplicates), changed, _ = merge_sources(sources, output, run_dir,
+                                                                      workers=1, run_rows=2)
+    assert changed
+    assert master_ids(data_dir) == ['mayor-001', 'dept-005', 'dept-001', 'dept-003', 'dept-002',
+                                    'dept-004', 'board-001']
+    assert counts == {sources[0][0]: 1, sources[1][0]: 5, sources[2][0]: 1}
+    assert duplicate_count == 2
+    assert sorted((entity_id, kept, dropped) for entity_id, kept, dropped in duplicates) == [
+        ('dept-003', sources[1][0], sources[2][0]), ('mayor-001', sources[0][0], sources[1][0])]
+
+    with open(output, encoding='utf-8') as f:
+        assert f.readline().rstrip('\n').split(',') == MASTER_HEADERS
+
+    # Same input, smaller and larger runs: byte-identical output, not rewritten
+    for run_rows in (1, 1000):
+        assert merge_sources(sources, output, run_dir, workers=1, run_rows=run_rows)[2] is False
+
+
+def test_duplicates_are_reported_on_every_run(data_dir, tmp_path, capsys):
+    manifest = str(tmp_path / 'manifest.json')
+    total, changed = regenerate_master_entities(str(data_dir), manifest=BuildManifest(manifest))
+    first = capsys.readouterr().out
+    assert (total, changed) == (7, True)
+    assert "Duplicate id 'mayor-001' in sd_gov_city_departments.csv" in first
+
+    # No-op rebuild: nothing re-merged, the same warnings
+    total, changed = regenerate_master_entities(str(data_dir), manifest=BuildManifest(manifest))
+    again = capsys.readouterr().out
+    assert (total, changed) == (7, False)
+    warnings = lambda out: [line for line in out.splitlines() if 'Duplicate id' in line]
+    assert warnings(again) == warnings(first) and len(warnings(first)) == 2
+
+
+def test_blank_lines_in_a_source_are_skipped(data_dir, tmp_path):
+    (data_dir / 'sd_gov_elected.csv').write_text(
+        HEADER + 'mayor-001,Mayor,Mayor,City of San Diego\n\ncouncil-001,Council,Council,City of San Diego\n\n')
+    total, changed = regenerate_master_entities(str(data_dir), manifest=BuildManifest(str(tmp_path / 'm.json')))
+    assert (total, changed) == (8, True)
+    assert master_ids(data_dir)[:2] == ['mayor-001', 'council-001']
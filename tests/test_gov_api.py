@@ -0,0 +1,121 @@
+"""GovIndex queries, pagination and their errors, and how server.py reports them"""
+
+import functools
+import http.client
+import json
+import threading
+
+import pytest
+
+from gov_api import MAX_PAGE_SIZE, GovIndex, NotFoundError, QueryError, paginate
+from server import AggregatesHolder, CORSRequestHandler, GovIndexHolder, ThreadPoolHTTPServer
+
+ENTITIES = [
+    {'id': 'mayor-001', 'name': 'Mayor', 'type': 'Mayor', 'jurisdiction': 'City of San Diego',
+     'parent_entity': '', 'topic_tags': 'executive;housing'},
+    {'id': 'dept-001', 'name': 'Planning Department', 'type': 'Department', 'jurisdiction': 'City of San Diego',
+     'parent_entity': 'mayor-001', 'topic_tags': 'housing'},
+    {'id': 'board-001', 'name': 'Airport Authority Board', 'type': 'Board', 'jurisdiction': 'Regional',
+     'parent_entity': '', 'topic_tags': 'transportation'},
+]
+RELATIONSHIPS = [
+    {'relationship_id': 'rel-001', 'source_entity_id': 'mayor-001', 'target_entity_id': 'dept-001',
+     'relationship_type': 'oversees', 'relationship_category': 'hierarchical'},
+    {'relationship_id': 'rel-002', 'source_entity_id': 'mayor-001', 'target_entity_id': 'board-001',
+     'relationship_type': 'appoints', 'relationship_category': 'appointment'},
+]
+
+
+@pytest.fixture
+def index():
+    return GovIndex(ENTITIES, RELATIONSHIPS)
+
+
+def test_paginate():
+    page = paginate(list(range(5)), offset=2, limit=2)
+    assert page == {'total': 5, 'offset': 2, 'limit': 2, 'next_offset': 4, 'items': [2, 3]}
+    assert paginate(list(range(5)), offset=4, limit=2)['next_offset'] is None
+    assert paginate(list(range(1000)), limit=10 ** 6)['limit'] == MAX_PAGE_SIZE
+
+
+@pytest.mark.parametrize('offset, limit', [(-1, 10), (0, 0), (0, -5)])
+def test_paginate_rejects_bad_bounds(offset, limit):
+    with pytest.raises(QueryError):
+        paginate([1, 2, 3], offset=offset, limit=limit)
+
+
+def test_entity_filters_intersect(index):
+    ids = lambda page: [item['id'] for item in page['items']]
+    assert ids(index.query_entities(jurisdiction='city')) == ['mayor-001', 'dept-001']
+    assert ids(index.query_entities(jurisdiction='city', entity_type='departments')) == ['dept-001']
+    assert ids(index.query_entities(topic='HOUSING', parent='mayor-001')) == ['dept-001']
+    assert index.query_entities(jurisdiction='county')['total'] == 0
+    rel_ids = lambda page: [item['relationship_id'] for item in page['items']]
+    assert rel_ids(index.query_relationships(entity_id='board-001')) == ['rel-002']
+    assert rel_ids(index.query_relationships(entity_id='mayor-001', category='hierarchical')) == ['rel-001']
+    assert index.query_relationships(relationship_type='reports_to')['total'] == 0
+
+
+def test_query_errors(index):
+    with pytest.raises(NotFoundError):
+        index.entity('missing')
+    with pytest.raises(NotFoundError):
+        index.subgraph('missing')
+    with pytest.raises(QueryError):
+        index.subgraph('mayor-001', depth=99)
+    with pytest.raises(QueryError):
+        index.subgraph('mayor-001', direction='sideways')
+    with pytest.raises(QueryError):
+        index.search('   ')
+
+
+def test_subgraph(index):
+    result = index.subgraph('dept-001', depth=1, direction='in')
+    assert {node['id']: node['depth'] for node in result['nodes']} == {'dept-001': 0, 'mayor-001': 1}
+    assert [edge['relationship_id'] for edge in result['edges']] == ['rel-001']
+
+
+@pytest.fixture
+def api(tmp_path):
+    (tmp_path / 'sd_gov_entities_complete.csv').write_text(
+        'id,name,type,jurisdiction,parent_entity,topic_tags\nmayor-001,Mayor,Mayor,City of San Diego,,housing\n')
+    handler = functools.partial(CORSRequestHandler, directory=str(tmp_path))
+    server = ThreadPoolHTTPServer(('127.0.0.1', 0), handler, workers=2)
+    server.gov_index = GovIndexHolder(str(tmp_path))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def request_json(server, path):
+    connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=5)
+    connection.request('GET', path)
+    response = connection.getresponse()
+    payload = json.loads(response.read())
+    connection.close()
+    return response.status, payload
+
+
+def test_api_reports_errors_as_json(api, tmp_path):
+    # The relationships master file is missing: the data is unavailable, not the request bad
+    status, payload = request_json(api, '/api/entities')
+    assert status == 503 and 'sd_gov_relationships_complete.csv' in payload['error']
+
+    (tmp_path / 'sd_gov_relationships_complete.csv').write_text(
+        'relationship_id,source_entity_id,target_entity_id,relationship_type,relationship_category\n')
+    api.gov_index._checked_at = 0.0  # Skip the freshness interval
+    assert request_json(api, '/api/entities?limit=1')[1]['total'] == 1
+    assert request_json(api, '/api/entities?limit=ten') == (400, {'error': 'limit must be an integer'})
+    assert request_json(api, '/api/entities?offset=-1')[0] == 400
+    assert request_json(api, '/api/subgraph?root=nobody') == (404, {'error': 'Unknown entity: nobody'})
+    assert request_json(api, '/api/nothing')[0] == 404
+
+
+def test_missing_aggregates_are_unavailable(api, tmp_path, monkeypatch):
+    (tmp_path / 'sd_gov_relationships_complete.csv').write_text(
+        'relationship_id,source_entity_id,target_entity_id,relationship_type,relationship_category\n')
+    monkeypatch.setattr('server_api.load_aggregates', lambda data_dir: None)  # No artifact and no NumPy
+    api.aggregates = AggregatesHolder(str(tmp_path))
+    status, payload = request_json(api, '/api/aggregates')
+    assert status == 503 and 'not built' in payload['error']
@@ -0,0 +1,86 @@
+"""Interval index and as-of / staleness queries"""
+
+import datetime
+import random
+
+import pytest
+
+from gov_timeline import OPEN_END, OPEN_START, GovTimeline, IntervalIndex, months_before, parse_date
+
+
+def test_interval_index_matches_a_linear_scan():
+    rng = random.Random(7)
+    starts, ends = [], []
+    for _ in range(500):
+        start = rng.randrange(0, 1000)
+        starts.append(start)
+        ends.append(start + rng.randrange(0, 200))
+    index = IntervalIndex(starts, ends)
+
+    for _ in range(300):
+        lo = rng.randrange(-50, 1250)
+        hi = lo + rng.randrange(0, 100)
+        expected = sorted((i for i in range(len(starts)) if starts[i] <= hi and ends[i] >= lo),
+                          key=lambda i: (starts[i], ends[i]))
+        assert index.overlapping(lo, hi) == expected
+    assert sorted(index.at(500)) == sorted(i for i in range(len(starts)) if starts[i] <= 500 <= ends[i])
+
+
+def test_interval_index_edges():
+    index = IntervalIndex([10, 20], [15, 20])
+    assert index.at(10) == [0] and index.at(15) == [0] and index.at(16) == []
+    assert index.at(20) == [1]  # Single-day interval, closed at both ends
+    assert IntervalIndex([], []).at(5) == []
+
+
+def test_parse_date_partial_periods():
+    assert parse_date('2020') == datetime.date(2020, 1, 1).toordinal()
+    assert parse_date('2020', end=True) == datetime.date(2020, 12, 31).toordinal()
+    assert parse_date('2024-02', end=True) == datetime.date(2024, 2, 29).toordinal()
+    assert parse_date('2024-06-01T00:00') == datetime.date(2024, 6, 1).toordinal()
+    assert parse_date('soon') is None and parse_date('') is None
+
+
+def interval(kind, entity_id, start, end):
+    return {'kind': kind, 'id': entity_id, 'label': entity_id,
+            'start': parse_date(start) if start else OPEN_START,
+            'end': parse_date(end, end=True) if end else OPEN_END}
+
+
+@pytest.fixture
+def timeline():
+    return GovTimeline(
+        [interval('entity', 'board-001', '1968', None),
+         interval('entity', 'dept-001', None, None),
+         interval('term', 'mayor-001', '2016-12-10', '2020-12-10'),
+         interval('term', 'mayor-001', '2020-12-10', None)],
+        [{'file': 'e.csv', 'id': 'old', 'label': 'old', 'verified': parse_date('2023-01-15')},
+         {'file': 'e.csv', 'id': 'never', 'label': 'never', 'verified': 0},
+         {'file': 'e.csv', 'id': 'fresh', 'label': 'fresh', 'verified': parse_date('2024-09-01')}])
+
+
+def test_as_of(timeline):
+    ids = lambda rows: [(row['kind'], row['id'], row['start']) for row in rows]
+    assert ids(timeline.as_of('1960-01-01')) == [('entity', 'dept-001', '')]
+    assert ids(timeline.as_of('2018-05-01', kind='term')) == [('term', 'mayor-001', '2016-12-10')]
+    # Handover day: both terms are in effect (closed intervals)
+    assert len(timeline.as_of('2020-12-10', kind='term')) == 2
+    assert len(timeline.as_of('2030-01-01')) == 3
+    assert [row['end'] for row in timeline.overlapping('2019', '2019', kind='term')] == ['2020-12-10']
+    with pytest.raises(ValueError):
+        timeline.as_of('not a date')
+
+
+def test_artifact_round_trip(timeline):
+    restored = GovTimeline.from_artifact(timeline.to_artifact())
+    for date in ['1960-01-01', '2018-05-01', '2020-12-10', '2030-01-01']:
+        assert restored.as_of(date) == timeline.as_of(date)
+    assert restored.stale(as_of='2024-10-01') == timeline.stale(as_of='2024-10-01')
+
+
+def test_stale(timeline):
+    assert [row['id'] for row in timeline.stale(12, as_of='2024-10-01')] == ['never', 'old']
+    # Verified exactly on the cutoff day counts as recent
+    assert [row['id'] for row in timeline.stale(1, as_of='2024-10-01')] == ['never', 'old']
+    assert [row['id'] for row in timeline.stale(1, as_of='2024-10-02')] == ['never', 'old', 'fresh']
+    assert months_before(datetime.date(2024, 3, 31), 1) == datetime.date(2024, 2, 29)
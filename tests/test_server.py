@@ -0,0 +1,229 @@
+"""server.py's production handlers against a temporary site root"""
+
+import functools
+import gzip
+import http.client
+import json
+import threading
+
+import pytest
+
+import server as server_module
+from data_versions import DeltaFeed, default_versions_dir, record_version
+from data_watch import EventBroadcaster
+from datastore import DataStore
+from server import (AssetStore, PreloadedRequestHandler, ProductionRequestHandler, ThreadPoolHTTPServer,
+                    parse_accept_encoding)
+
+BODY = b'id,name\n' + b''.join(b'e%d,Entity %d\n' % (i, i) for i in range(200))
+
+
+@pytest.fixture
+def site(tmp_path):
+    (tmp_path / 'data').mkdir()
+    (tmp_path / 'data' / 'entities.csv').write_bytes(BODY)
+    return tmp_path
+
+
+def serve(root, handler_class=ProductionRequestHandler, workers=4, event_streams=0):
+    handler = functools.partial(handler_class, directory=str(root))
+    server = ThreadPoolHTTPServer(('127.0.0.1', 0), handler, workers=workers, event_streams=event_streams)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture
+def server(site):
+    server = serve(site)
+    server.data_store = DataStore(str(site / 'data'), cache_dir=str(site / 'tables'))
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get(server, path, headers=None, method='GET'):
+    connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=5)
+    connection.request(method, path, headers=headers or {})
+    response = connection.getresponse()
+    body = response.read()
+    connection.close()
+    return response, body
+
+
+def test_strong_etag_and_304(server):
+    response, body = get(server, '/data/entities.csv')
+    etag = response.getheader('ETag')
+    assert response.status == 200 and body == BODY
+    assert etag.startswith('"') and not etag.startswith('W/')
+    assert response.getheader('Cache-Control') == 'no-cache'
+
+    response, body = get(server, '/data/entities.csv', {'If-None-Match': f'"other", {etag}'})
+    assert (response.status, body) == (304, b'')
+    assert response.getheader('ETag') == etag
+    assert response.getheader('Vary') == 'Accept-Encoding'
+
+    response, _ = get(server, '/data/entities.csv', {'If-None-Match': '"other"'})
+    assert response.status == 200
+
+
+def test_keepalive_is_refused_when_the_pool_is_nearly_full(site):
+    server = serve(site, workers=4)
+    try:
+        assert server.keepalive_limit == 3
+        connections = []
+        for _ in range(4):
+            connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=5)
+            connection.request('GET', '/data/entities.csv')
+            response = connection.getresponse()
+            response.read()
+            connections.append((connection, response.getheader('Connection')))
+        # The first three stay open (holding their workers); the fourth is asked to close
+        assert [header for _, header in connections] == [None, None, None, 'close']
+        for connection, _ in connections:
+            connection.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_event_streams_have_their_own_slots(site):
+    server = serve(site, workers=4, event_streams=2)
+    server.events = EventBroadcaster(2)
+    connections = []
+    try:
+        for _ in range(2):
+            connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=5)
+            connection.request('GET', '/events')
+            assert connection.getresponse().status == 200
+            connections.append(connection)
+        response, _ = get(server, '/events')
+        assert response.status == 503
+
+        # Two open streams: still three keep-alive connections before the cap
+        headers = []
+        for _ in range(4):
+            connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=5)
+            connection.request('GET', '/data/entities.csv')
+            response = connection.getresponse()
+            response.read()
+            connections.append(connection)
+            headers.append(response.getheader('Connection'))
+        assert headers == [None, None, None, 'close']
+    finally:
+        server.events.close()
+        for connection in connections:
+            connection.close()
+        server.shutdown()
+        server.server_close()
+
+
+def test_preloaded_file_regenerated_on_disk_is_served_as_it_is_now(site, monkeypatch):
+    monkeypatch.setattr(server_module, 'PRELOAD_MAX_SIZE', 1024)  # Keep the CSV file-backed
+    server = serve(site, PreloadedRequestHandler)
+    server.asset_store = AssetStore(str(site))
+    try:
+        assert server.asset_store.assets['/data/entities.csv'].in_memory is False
+        response, body = get(server, '/data/entities.csv')
+        assert body == BODY and response.getheader('Content-Length') == str(len(BODY))
+
+        # Rewritten between asset store reloads: headers and body must still agree
+        regenerated = BODY + b'e200,Entity 200\n'
+        (site / 'data' / 'entities.csv.tmp').write_bytes(regenerated)
+        (site / 'data' / 'entities.csv.tmp').replace(site / 'data' / 'entities.csv')
+        response, body = get(server, '/data/entities.csv')
+        assert body == regenerated
+        assert response.getheader('Content-Length') == str(len(regenerated))
+        assert response.getheader('ETag') != server.asset_store.assets['/data/entities.csv'].variants[None][2]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.parametrize('header, expected', [
+    ('gzip, br', {'gzip', 'br'}),
+    ('gzip;q=0, br;q=0.5', {'br'}),
+    ('GZIP ; Q=0.001', {'gzip'}),
+    ('*', {'gzip', 'br'}),
+    ('*;q=1, br;q=0', {'gzip'}),
+    ('identity', {'identity'}),
+    ('gzip;q=x', set()),
+    ('', set()),
+])
+def test_parse_accept_encoding(header, expected):
+    assert parse_accept_encoding(header) - {'*'} == expected
+
+
+def test_byte_ranges(server):
+    response, body = get(server, '/data/entities.csv', {'Range': 'bytes=8-17'})
+    assert response.status == 206 and body == BODY[8:18]
+    assert response.getheader('Content-Range') == f'bytes 8-17/{len(BODY)}'
+    etag = response.getheader('ETag')
+
+    response, body = get(server, '/data/entities.csv', {'Range': 'bytes=-5'})
+    assert response.status == 206 and body == BODY[-5:]
+    response, body = get(server, '/data/entities.csv', {'Range': f'bytes={len(BODY) - 3}-'})
+    assert response.status == 206 and body == BODY[-3:]
+
+    response, _ = get(server, '/data/entities.csv', {'Range': f'bytes={len(BODY)}-'})
+    assert response.status == 416 and response.getheader('Content-Range') == f'bytes */{len(BODY)}'
+
+    # Resuming against a changed file (If-Range names an older ETag): the whole, current body
+    response, body = get(server, '/data/entities.csv', {'Range': 'bytes=8-17', 'If-Range': '"older"'})
+    assert response.status == 200 and body == BODY
+    response, body = get(server, '/data/entities.csv', {'Range': 'bytes=8-17', 'If-Range': etag})
+    assert response.status == 206
+    # Multi-range requests are answered whole
+    response, body = get(server, '/data/entities.csv', {'Range': 'bytes=0-1,5-6'})
+    assert response.status == 200 and body == BODY
+
+
+def test_projection_variants_have_their_own_etags(server):
+    path = '/data/entities.csv?fields=name&id=e1&id=e2'
+    plain, plain_body = get(server, path)
+    assert plain.status == 200 and plain_body == b'name\nEntity 1\nEntity 2\n'
+    assert plain.getheader('Content-Encoding') is None
+
+    zipped, zipped_body = get(server, path, {'Accept-Encoding': 'gzip'})
+    assert zipped.getheader('Content-Encoding') == 'gzip'
+    assert gzip.decompress(zipped_body) == plain_body
+    assert zipped.getheader('ETag') != plain.getheader('ETag')
+
+    refused, refused_body = get(server, path, {'Accept-Encoding': 'gzip;q=0'})
+    assert refused.getheader('Content-Encoding') is None and refused_body == plain_body
+    assert refused.getheader('ETag') == plain.getheader('ETag')
+
+    for response, headers in [(plain, {}), (zipped, {'Accept-Encoding': 'gzip'})]:
+        not_modified, _ = get(server, path, dict(headers, **{'If-None-Match': response.getheader('ETag')}))
+        assert not_modified.status == 304
+        assert not_modified.getheader('Vary') == 'Accept-Encoding'
+    # The gzip validator does not revalidate the identity body
+    response, _ = get(server, path, {'If-None-Match': zipped.getheader('ETag')})
+    assert response.status == 200
+
+
+def test_delta_since_is_not_echoed_into_headers(server, site):
+    data_dir = site / 'data'
+    (data_dir / 'sd_gov_entities_complete.csv').write_text('id,name\na,Alpha\n')
+    (data_dir / 'sd_gov_relationships_complete.csv').write_text('relationship_id,from\nr1,a\n')
+    record_version(str(data_dir))
+    server.delta_feed = DeltaFeed(default_versions_dir(str(data_dir)))
+
+    response, body = get(server, '/data/delta?since=x%0d%0aX-Injected:%20yes')
+    assert response.status == 200 and response.getheader('X-Injected') is None
+    assert json.loads(body)['format'] == 'sd_gov_snapshot'
+    assert response.getheader('ETag') == get(server, '/data/delta')[0].getheader('ETag')
+
+
+def test_cache_buster_gets_the_file(server):
+    plain, _ = get(server, '/data/entities.csv')
+    response, body = get(server, '/data/entities.csv?v=2')
+    assert (response.status, body) == (200, BODY)
+    assert response.getheader('ETag') == plain.getheader('ETag')
+    response, body = get(server, '/data/entities.csv?v=2', {'Range': 'bytes=0-6'})
+    assert (response.status, body) == (206, BODY[:7])
+
+    # A real column still filters, and an unknown one next to it is still an error
+    response, body = get(server, '/data/entities.csv?id=e1')
+    assert (response.status, body) == (200, b'id,name\ne1,Entity 1\n')
+    response, _ = get(server, '/data/entities.csv?id=e1&v=2')
+    assert response.status == 400
@@ -0,0 +1,105 @@
+"""URL checker against a local stub HTTP server"""
+
+import csv
+import http.server
+import threading
+import time
+
+import pytest
+
+from url_checker import URLChecker, interleave_by_host, normalize_url
+from validate_data_quality import URLCheck, run_url_checks, scan_file
+
+HOST_INTERVAL = 0.05
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    """200 for /ok*, 404 otherwise; records each request's host, time and connection"""
+
+    protocol_version = 'HTTP/1.1'  # Keep-alive, so connection reuse is visible
+
+    def do_HEAD(self):
+        self.server.requests.append((self.headers['Host'], time.monotonic(), self.client_address))
+        self.send_response(200 if self.path.startswith('/ok') else 404)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def write_entities(path, urls):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'name', 'website_url'])
+        for i, url in enumerate(urls):
+            writer.writerow([f'entity-{i}', f'Entity {i}', url])
+
+
+def test_report_returns_valid_total_invalid(stub_server, tmp_path):
+    port = stub_server.server_address[1]
+    csv_file = tmp_path / 'entities.csv'
+    write_entities(csv_file, [
+        f'http://127.0.0.1:{port}/ok/a',
+        f'http://127.0.0.1:{port}/ok/b',
+        f'http://127.0.0.1:{port}/missing',
+        'not a url',
+        ''
+    ])
+
+    check = URLCheck()
+    scan_file(str(csv_file), [check])
+    with URLChecker(host_interval=0) as checker:
+        run_url_checks([check], checker)
+    valid, total, invalid = check.report(str(csv_file))
+
+    assert (valid, total) == (2, 4)
+    assert sorted((entity_id, error) for entity_id, _, error in invalid) == [
+        ('entity-2', 'HTTP 404'), ('entity-3', 'Invalid URL format')]
+
+
+def test_per_host_rate_limit_and_session_reuse(stub_server):
+    port = stub_server.server_address[1]
+    hosts = [f'127.0.0.1:{port}', f'localhost:{port}']
+    urls = [f'http://{host}/ok/{i}' for host in hosts for i in range(6)]
+
+    with URLChecker(max_workers=4, per_host=2, host_interval=HOST_INTERVAL) as checker:
+        results = checker.check_all(urls)
+        assert sorted(checker._sessions) == sorted(hosts)
+
+    assert all(result.error is None for result in results.values())
+    assert checker.network_requests == len(urls)
+    for host in hosts:
+        seen = [(started, client) for name, started, client in stub_server.requests if name == host]
+        assert len(seen) == 6
+        starts = sorted(started for started, _ in seen)
+        # Request starts are spaced by the host interval (timer slack allowed)
+        assert min(b - a for a, b in zip(starts, starts[1:])) >= HOST_INTERVAL * 0.8
+        # Keep-alive connections of the host's one session: at most per_host of them
+        assert len({client for _, client in seen}) <= 2
+
+
+def test_interleave_by_host():
+    urls = ['http://a/1', 'http://a/2', 'http://a/3', 'http://b/1', 'http://c/1', 'http://b/2']
+    assert interleave_by_host(urls) == [
+        'http://a/1', 'http://b/1', 'http://c/1', 'http://a/2', 'http://b/2', 'http://a/3']
+
+
+def test_malformed_port_is_invalid_not_fatal():
+    assert normalize_url('http://h:abc/x') == 'http://h:abc/x'
+    assert normalize_url('HTTP://Example.org:80') == 'http://example.org/'
+    with URLChecker() as checker:
+        results = checker.check_all(['http://h:abc/x'])
+    assert results['http://h:abc/x'].error == 'Invalid URL port'
+    assert checker.network_requests == 0
@@ -0,0 +1,39 @@
+"""Single-pass quality checks"""
+
+import tracemalloc
+
+from validate_data_quality import CompletenessCheck, DuplicateCheck, scan_file
+
+HEADER = 'id,name,description,website_url,legal_source\n'
+
+
+def write_rows(path, count):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(HEADER)
+        for i in range(count):
+            f.write(f'e{i},Entity {i},{"x" * 200 if i % 2 else ""},https://example.org/{i},Code\n')
+
+
+def test_checks_see_every_row(tmp_path):
+    csv_file = tmp_path / 'entities.csv'
+    csv_file.write_text(HEADER + 'a,Alpha,,http://a,Code\nb,alpha,Desc,,Code\na,Gamma,Desc,http://c,\n')
+    completeness, duplicates = CompletenessCheck(), DuplicateCheck()
+    assert scan_file(str(csv_file), [completeness, duplicates]) == 3
+    assert completeness.missing == {'id': 0, 'name': 0, 'description': 1, 'website_url': 1, 'legal_source': 1}
+    assert completeness.missing_ids['description'] == ['a']
+    assert (duplicates.duplicate_ids, duplicates.duplicate_names) == (['a'], ['alpha'])
+
+
+def test_scan_memory_does_not_grow_with_the_file(tmp_path):
+    def peak(count):
+        csv_file = tmp_path / f'rows{count}.csv'
+        write_rows(csv_file, count)
+        tracemalloc.start()
+        try:
+            scan_file(str(csv_file), [CompletenessCheck()])
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    small, large = peak(2000), peak(20000)
+    assert large < small * 2